@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Offline parser/diff regression + timing.
+
+  python bench/bench.py                          # check bench/pages/*.html against *.expected.json and time everything
+  python bench/bench.py --synthetic 200          # also time generated DOM and JSON pages with 200 venues
+  python bench/bench.py --json out/HEAD.json     # write machine-readable results
+  python bench/bench.py --compare out/base.json  # diff against an earlier run; exit 1 on regressions
+
+Saved pages live in bench/pages/<name>.html; <name>.expected.json holds the
+expected [[venue, [times...]], ...] from parse_html. Drop a recorded
+buytickets page in there (expected file optional) to add it to the corpus.
+
+Timed cases (best of --repeat, milliseconds per call):
+  parse_json/<page>, parse_dom/<page>, parse_theatres/<page>   scraper parsers
+  fuzzy/<n>                                                     common.fuzzy over n venue names
+  format_new_shows/<n>                                          scheduler._format_new_shows with n new times
+  diff_full/<page>, diff_fp_hit/<page>                          scheduler._run_monitor seen-diff against a temp state.db,
+                                                                without and with a matching page fingerprint
+"""
+from __future__ import annotations
+import os, sys, json, glob, time, shutil, tempfile, platform, subprocess
+from typing import Callable, Dict, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from scraper import _parse_venues_from_json, _parse_venues_from_dom, parse_html, parse_theatres, PageSnapshot, _BS_FEATURES
+
+PAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pages")
+
+def load_pages(pages_dir: str = PAGES_DIR) -> List[Tuple[str, str, Optional[list]]]:
+    out = []
+    for p in sorted(glob.glob(os.path.join(pages_dir, "*.html"))):
+        name = os.path.basename(p)[:-5]
+        with open(p, encoding="utf-8") as f: html = f.read()
+        exp = None
+        ep = p[:-5] + ".expected.json"
+        if os.path.exists(ep):
+            with open(ep, encoding="utf-8") as f: exp = [(n, list(ts)) for n, ts in json.load(f)]
+        out.append((name, html, exp))
+    return out
+
+def _times(i: int, n: int) -> List[str]:
+    return [f"{(h % 12) + 1:02d}:{m:02d} {'AM' if h < 12 else 'PM'}"
+            for h, m in zip(range(8 + i % 3, 8 + i % 3 + n), (0, 15, 30, 45, 0, 30, 15, 45))]
+
+def synthetic_dom(venues: int, depth: int = 12, times: int = 6) -> str:
+    """Virtualized-list-free page with deeply nested wrappers (worst case for the old div scan)."""
+    rows = []
+    for i in range(venues):
+        pills = "".join(f"<div><div><a>{t}</a></div></div>" for t in _times(i, times))
+        rows.append(f"<div class='row'><div><div><a href='/c/{i}'>Cinema {i}: Mall {i}, Hyderabad</a></div></div>"
+                    f"<div class='times'>{pills}</div></div>")
+    body = "".join(rows)
+    for _ in range(depth):
+        body = f"<div class='wrap'>{body}</div>"
+    return f"<!DOCTYPE html><html><head><title>Buy</title></head><body>{body}</body></html>"
+
+def synthetic_json(venues: int, times: int = 6, pad: int = 2000) -> str:
+    """__INITIAL_STATE__ page with venue cards and bulky unrelated widgets in between."""
+    cards = [{"type": "venue-card", "additionalData": {"venueName": f"Cinema {i}: Mall {i}, Hyderabad", "venueCode": f"C{i}"},
+              "showtimes": [{"title": t, "cta": {"url": f"/s/{i}/{j}"}} for j, t in enumerate(_times(i, times))]}
+             for i in range(venues)]
+    filler = [{"type": "banner", "data": {"blob": "x" * pad}} for _ in range(venues // 4 + 1)]
+    state = {"page": {"widgets": filler + [{"type": "venue-list", "data": cards}]}, "user": None}
+    return ("<!DOCTYPE html><html><head><title>Buy</title></head><body><div id='root'></div>"
+            f"<script>window.__INITIAL_STATE__ = {json.dumps(state, separators=(',', ':'))};</script></body></html>")
+
+def timeit(fn: Callable, arg, repeat: int = 5, number: int = 1) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(number): fn(arg)
+        best = min(best, (time.perf_counter() - t0) / number)
+    return best * 1000
+
+class _SnapDriver:
+    """Just enough driver for parse_theatres: the snapshot is already cached."""
+    def __init__(self, html: str): self._bms_snap = PageSnapshot(html)
+
+# ---------- cases ----------
+def bench_parsers(pages, repeat: int, results: Dict[str, float]) -> int:
+    failures = 0
+    for name, html, exp in pages:
+        got = parse_html(html)
+        status = "-" if exp is None else ("ok" if got == exp else "FAIL")
+        if status == "FAIL":
+            failures += 1
+            print(f"  {name}: expected {exp}\n  {' ' * len(name)}  got      {got}")
+        drv = _SnapDriver(html)
+        results[f"parse_json/{name}"] = timeit(_parse_venues_from_json, html, repeat)
+        results[f"parse_dom/{name}"] = timeit(_parse_venues_from_dom, html, repeat)
+        results[f"parse_theatres/{name}"] = timeit(parse_theatres, drv, repeat)
+        print(f"{name:28s} {status:4s} venues={len(got):3d} size={len(html)/1024:8.1f}KB "
+              f"json={results[f'parse_json/{name}']:8.2f}ms dom={results[f'parse_dom/{name}']:8.2f}ms "
+              f"theatres={results[f'parse_theatres/{name}']:8.2f}ms")
+    return failures
+
+def bench_fuzzy(repeat: int, results: Dict[str, float], n: int = 500):
+    from common import fuzzy
+    names = [f"Cinema {i}: Mall {i}, Hyderabad" for i in range(n)]
+    targets = ["PVR Nexus", "AMB Cinemas Gachibowli", "Prasads Multiplex", "Cinema 42: Mall 42", "INOX GVK One"]
+    results[f"fuzzy/{n}"] = timeit(lambda ns: [fuzzy(x, targets) for x in ns], names, repeat)
+
+def bench_format(repeat: int, results: Dict[str, float], n: int = 300):
+    from scheduler import _format_new_shows
+    row = {"id": "bench", "url": "https://in.bookmyshow.com/buytickets/bench-movie/ET00000000",
+           "interval_min": 5, "theatres": "[]"}
+    found = [(f"Cinema {i % 40}: Mall, Hyderabad", f"202610{20 + i % 5}", t)
+             for i in range(n // 6) for t in _times(i, 6)]
+    results[f"format_new_shows/{len(found)}"] = timeit(lambda f: _format_new_shows(row, f), found, repeat)
+
+def bench_diff(pages, repeat: int, results: Dict[str, float]):
+    """scheduler._run_monitor on an already-baselined monitor: every showtime is seen, nothing alerts."""
+    import store, scheduler
+    tmp = tempfile.mkdtemp(prefix="bms-bench-")
+    old_db, old_send = store.STATE_DB, scheduler.tg_send
+    store.STATE_DB = os.path.join(tmp, "state.db")
+    scheduler.tg_send = lambda *a, **k: None
+    try:
+        for name, html, _ in pages:
+            pairs = parse_html(html)
+            if not pairs: continue
+            dates = ["20261020", "20261021", "20261022"]
+            mid = f"b-{name}"[:40]
+            with store.connect() as conn:
+                conn.execute("""INSERT OR REPLACE INTO monitors(id,url,dates,theatres,interval_min,baseline,state,created_at)
+                                VALUES(?,?,?,?,?,?,?,?)""",
+                             (mid, "https://in.bookmyshow.com/buytickets/bench", ",".join(dates), "[]", 5, 0, "RUNNING", 0))
+                conn.commit()
+                store.bulk_upsert_seen(conn, [(mid, d8, n, t, 0) for d8 in dates for n, ts in pairs for t in ts])
+                row = store.get_monitor(conn, mid)
+
+            class _DM:
+                def theatres_by_date(self, row, dates_, scroll=True): return {d8: pairs for d8 in dates_}
+                def reset(self): pass
+            dm = _DM()
+            eff, scheduler._effective_dates = scheduler._effective_dates, (lambda r: dates)
+            try:
+                def full(_):
+                    with store.connect() as conn:
+                        conn.execute("DELETE FROM fingerprints WHERE monitor_id=?", (mid,)); conn.commit()
+                    scheduler._run_monitor(dm, row, {})
+                results[f"diff_full/{name}"] = timeit(full, None, repeat)
+                scheduler._run_monitor(dm, row, {})
+                results[f"diff_fp_hit/{name}"] = timeit(lambda _: scheduler._run_monitor(dm, row, {}), None, repeat)
+            finally:
+                scheduler._effective_dates = eff
+            print(f"{'diff ' + name:28s} showtimes={sum(len(ts) for _, ts in pairs) * len(dates):5d} "
+                  f"full={results[f'diff_full/{name}']:8.2f}ms fp_hit={results[f'diff_fp_hit/{name}']:8.2f}ms")
+    finally:
+        store.STATE_DB, scheduler.tg_send = old_db, old_send
+        shutil.rmtree(tmp, ignore_errors=True)
+
+# ---------- reporting ----------
+def _git_rev() -> str:
+    try:
+        return subprocess.run(["git", "-C", ROOT, "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, timeout=5).stdout.strip() or "?"
+    except Exception:
+        return "?"
+
+def compare(base: Dict[str, float], cur: Dict[str, float], tolerance: float, floor_ms: float = 0.05) -> int:
+    """Print per-case deltas; count cases slower than base by more than tolerance (and floor_ms)."""
+    regressions = 0
+    for k in sorted(set(base) | set(cur)):
+        b, c = base.get(k), cur.get(k)
+        if b is None or c is None:
+            print(f"  {k:40s} {'-' if b is None else f'{b:9.3f}'} -> {'-' if c is None else f'{c:9.3f}'}")
+            continue
+        ratio = c / b if b else float("inf")
+        bad = ratio > 1 + tolerance and c - b > floor_ms
+        regressions += bad
+        print(f"  {k:40s} {b:9.3f} -> {c:9.3f} ms  x{ratio:5.2f}{'  REGRESSION' if bad else ''}")
+    return regressions
+
+def main(argv=None) -> int:
+    import argparse
+    p = argparse.ArgumentParser("bms-bench")
+    p.add_argument("--pages-dir", default=PAGES_DIR)
+    p.add_argument("--repeat", type=int, default=5)
+    p.add_argument("--synthetic", type=int, default=0, help="Also time generated DOM and JSON pages with N venues")
+    p.add_argument("--only", default="", help="Comma list of groups: parse,fuzzy,format,diff (default all)")
+    p.add_argument("--json", dest="json_out", help="Write results to this JSON file")
+    p.add_argument("--compare", help="Earlier --json output to compare against")
+    p.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown vs --compare before failing")
+    a = p.parse_args(argv)
+    groups = {g.strip() for g in a.only.split(",") if g.strip()} or {"parse", "fuzzy", "format", "diff"}
+
+    print(f"tree builder: {_BS_FEATURES}")
+    pages = load_pages(a.pages_dir)
+    if a.synthetic:
+        pages.append((f"synthetic_dom_{a.synthetic}", synthetic_dom(a.synthetic), None))
+        pages.append((f"synthetic_json_{a.synthetic}", synthetic_json(a.synthetic), None))
+    results: Dict[str, float] = {}
+    failures = 0
+    if "parse" in groups: failures += bench_parsers(pages, a.repeat, results)
+    if "fuzzy" in groups: bench_fuzzy(a.repeat, results)
+    if "format" in groups: bench_format(a.repeat, results)
+    if "diff" in groups: bench_diff(pages, a.repeat, results)
+    for k in sorted(results):
+        if k.split("/")[0] in ("fuzzy", "format_new_shows"):
+            print(f"{k:28s} {results[k]:8.3f}ms")
+
+    if a.json_out:
+        os.makedirs(os.path.dirname(os.path.abspath(a.json_out)), exist_ok=True)
+        doc = {"meta": {"commit": _git_rev(), "ts": int(time.time()), "python": platform.python_version(),
+                        "tree_builder": _BS_FEATURES, "repeat": a.repeat, "synthetic": a.synthetic},
+               "results": {k: round(v, 4) for k, v in sorted(results.items())}}
+        with open(a.json_out, "w", encoding="utf-8") as f: json.dump(doc, f, indent=2)
+        print(f"wrote {a.json_out}")
+    if a.compare:
+        with open(a.compare, encoding="utf-8") as f: base = json.load(f)
+        print(f"compare vs {base.get('meta', {}).get('commit', '?')} (tolerance {a.tolerance:.0%}):")
+        if compare(base.get("results", {}), results, a.tolerance):
+            failures += 1
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
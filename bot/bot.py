@@ -7,13 +7,17 @@ sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 from store import (
     connect, list_monitors, get_monitor, set_state, set_reload, set_dates,
-    set_interval, set_time_window, set_theatres, set_mode,
+    set_interval, set_time_window, set_theatres, set_mode, set_fetch_mode, set_adaptive, run_phases,
+    get_digest, set_digest, chat_monitors,
     get_indexed_theatres, get_ui_session, set_ui_session, clear_ui_session
 )
 from bot.keyboards import kb_main, kb_date_picker, kb_theatre_picker, kb_interval_picker, kb_duration_picker
 from bot.telegram_api import send_text, answer_cbq, get_updates
 from bot.commands import ensure_bot_commands
 from utils import titled, movie_title_from_url
+from common import interval_sec
+from digest import format_digest, next_digest_ts
+import metrics
 
 
 ALLOWED = set([x.strip() for x in os.environ.get("TELEGRAM_ALLOWED_CHAT_IDS","").split(",") if x.strip()])
@@ -47,15 +51,20 @@ def _eta(row) -> str:
     now = int(time.time())
     eta = "—"
     if row and row["last_run_ts"]:
-        left = int(row["last_run_ts"]) + int(row["interval_min"])*60 - now
+        left = int(row["last_run_ts"]) + interval_sec(row) - now
         if left > 0: eta = f"{left//60}m {left%60}s"
     return eta
 
+def _every(r) -> str:
+    if not int(r["adaptive"] or 0): return f"every {r['interval_min']}m"
+    cur = interval_sec(r)
+    return f"adaptive {r['ival_min']}–{r['ival_max']}m (now {cur//60}m{cur%60:02d}s)"
+
 def _monitor_summary(r) -> str:
     th = len(json.loads(r["theatres"]) if r["theatres"] else [])
-    return (f"[{r['id']}] {r['state']} • every {r['interval_min']}m • next ~ {_eta(r)}\n"
+    return (f"[{r['id']}] {r['state']} • {_every(r)} • next ~ {_eta(r)}\n"
             f"Dates: {r['dates']}  |  Theatres: {th}  |  Window: {(r['time_start'] or '—')}–{(r['time_end'] or '—')}\n"
-            f"Mode: {r['mode'] or 'FIXED'} | Rolling: {r['rolling_days']} | Until: {r['end_date'] or '—'}\n"
+            f"Mode: {r['mode'] or 'FIXED'} | Rolling: {r['rolling_days']} | Until: {r['end_date'] or '—'} | Fetch: {r['fetch_mode'] or 'default'}\n"
             f"Last run: {_fmt_ts(r['last_run_ts'])}  |  Last alert: {_fmt_ts(r['last_alert_ts'])}\n"
             f"URL: {r['url']}")
 
@@ -390,6 +399,94 @@ def cmd_timewin(chat_id: str, mid: str, arg: str):
     text = f"[{mid}] Time window set: {s}–{e}"
     send_text(chat_id, titled(r, text) if r else text)
 
+def cmd_fetchmode(chat_id: str, mid: str, arg: str):
+    mode = arg.strip().lower()
+    if mode not in ("auto","http","browser","default"):
+        send_text(chat_id, "Usage: /fetchmode <id> <auto|http|browser|default>"); return
+    with connect() as conn:
+        r = get_monitor(conn, mid)
+        ok = set_fetch_mode(conn, mid, None if mode=="default" else mode)
+    text = f"[{mid}] {'Fetch mode set to '+mode if ok else 'Not found'}"
+    send_text(chat_id, titled(r, text) if r else text)
+
+def cmd_adaptive(chat_id: str, mid: str, arg: str):
+    a = arg.strip().lower()
+    if a == "off":
+        lo = hi = None
+    else:
+        m = re.match(r"^(\d+)\s*-\s*(\d+)$", a)
+        lo, hi = (int(m.group(1)), int(m.group(2))) if m else (0, 0)
+        if not (1 <= lo <= hi):
+            send_text(chat_id, "Usage: /adaptive <id> <min>-<max> (minutes) or 'off'"); return
+    with connect() as conn:
+        r = get_monitor(conn, mid)
+        ok = set_adaptive(conn, mid, lo, hi)
+    if not ok: text = f"[{mid}] Not found"
+    elif lo: text = f"[{mid}] Adaptive interval {lo}–{hi} min: tightens on new shows, relaxes while unchanged, backs off on errors"
+    else: text = f"[{mid}] Adaptive interval off; every {r['interval_min']} min"
+    send_text(chat_id, titled(r, text) if r else text)
+
+def cmd_digest(chat_id: str, arg: str):
+    """/digest HH:MM (daily) | <N>m|<N>h (cadence) | off | now: one summary for all this chat's monitors."""
+    a = arg.strip().lower(); now = int(time.time())
+    with connect() as conn:
+        if a == "now":
+            rows = chat_monitors(conn, chat_id)
+            send_text(chat_id, format_digest(rows, now) if rows else "No monitors."); return
+        if a == "off":
+            cur = get_digest(conn, chat_id)
+            set_digest(conn, chat_id, cur["hhmm"] if cur else None, cur["every_min"] if cur else None, False)
+            send_text(chat_id, "Digest off; monitors send their own heartbeats again (batched per chat)."); return
+        m_t = re.match(r"^([01]?\d|2[0-3]):([0-5]\d)$", a)
+        m_e = re.match(r"^(\d+)\s*([mh])$", a)
+        if m_t:
+            set_digest(conn, chat_id, f"{int(m_t.group(1)):02d}:{m_t.group(2)}", None, True)
+        elif m_e and int(m_e.group(1)) > 0:
+            set_digest(conn, chat_id, None, int(m_e.group(1)) * (60 if m_e.group(2) == "h" else 1), True)
+        else:
+            send_text(chat_id, "Usage: /digest <HH:MM|30m|3h|off|now>"); return
+        cfg = get_digest(conn, chat_id)
+    when = f"daily at {cfg['hhmm']}" if not cfg["every_min"] else f"every {cfg['every_min']}m"
+    send_text(chat_id, f"📋 Digest {when}; per-monitor heartbeats are folded into it. "
+                       f"Next: {_fmt_ts(next_digest_ts(cfg, now))}")
+
+# display order; "total" is wall time, the rest are exclusive slices of it
+PHASES = ("total", "driver", "rate", "nav", "ready", "parse", "fetch", "diff", "db", "telegram")
+
+def _pct(vals: List[int], p: float) -> int:
+    vals = sorted(vals)
+    return vals[min(len(vals)-1, int(round(p * (len(vals)-1))))]
+
+def _p_line(label: str, vals: List[int]) -> str:
+    return f"{label}: p50 {_pct(vals, .5)} • p95 {_pct(vals, .95)} • max {max(vals)} ms"
+
+def cmd_stats(chat_id: str, args: List[str]):
+    """/stats [id] [6h|7d]: per-phase run timings, and per-monitor totals when no id is given."""
+    mid, secs = None, 86400
+    for a in args:
+        m = re.match(r"^(\d+)([hd])$", a.lower())
+        if m: secs = int(m.group(1)) * (3600 if m.group(2) == "h" else 86400)
+        else: mid = a
+    with connect() as conn:
+        rows = run_phases(conn, int(time.time()) - secs, mid)
+    span = f"{secs//3600}h" if secs < 86400*2 else f"{secs//86400}d"
+    runs = [(r["monitor_id"], r["status"], json.loads(r["phases"])) for r in rows if r["phases"]]
+    if not runs:
+        send_text(chat_id, f"No timed runs{' for ['+mid+']' if mid else ''} in the last {span}."); return
+    errs = sum(1 for _, st, _ in runs if st == "error")
+    by_phase = {ph: [p[ph] for _, _, p in runs if ph in p] for ph in PHASES}
+    lines = [f"📊 {'['+mid+'] ' if mid else ''}Last {span}: {len(runs)} run(s), {errs} error(s)"]
+    lines += [_p_line(ph, v) for ph, v in by_phase.items() if v]
+    if not mid:
+        per: dict = {}
+        for m_, _, p in runs: per.setdefault(m_, []).append(p.get("total", 0))
+        lines.append("\nPer monitor (total):")
+        lines += [_p_line(f"[{m_}] x{len(v)}", v) for m_, v in sorted(per.items(), key=lambda kv: -_pct(kv[1], .95))]
+    send_text(chat_id, "\n".join(lines))
+
+_KNOWN = {"/start", "/help", "/list", "/status", "/new", "/pause", "/resume", "/stop", "/restart", "/discover",
+          "/setinterval", "/timewin", "/fetchmode", "/adaptive", "/stats", "/digest"}
+
 HELP = (
 "Commands:\n"
 "/new <url> — start inline creation wizard\n"
@@ -399,6 +496,10 @@ HELP = (
 "/discover <id>\n"
 "/setinterval <id> <minutes>\n"
 "/timewin <id> <HH:MM-HH:MM|clear>\n"
+"/fetchmode <id> <auto|http|browser|default>\n"
+"/adaptive <id> <min>-<max>|off\n"
+"/stats [id] [6h|7d] — run timings p50/p95/max per phase\n"
+"/digest <HH:MM|30m|3h|off|now> — one summary for all your monitors\n"
 "/help"
 )
 
@@ -406,6 +507,7 @@ def handle_command(chat_id: str, text: str):
     parts = text.split()
     cmd = parts[0].lower()
     args = parts[1:]
+    metrics.inc("bms_bot_commands_total", cmd=cmd if cmd in _KNOWN else "other")
     if cmd in ("/start","/help"): send_text(chat_id, HELP); return
     if cmd == "/list":            cmd_list(chat_id); return
     if cmd == "/status" and args: cmd_status(chat_id, args[0]); return
@@ -419,6 +521,12 @@ def handle_command(chat_id: str, text: str):
         cmd_setinterval(chat_id, args[0], args[1]); return
     if cmd == "/timewin" and len(args)>=2: 
         cmd_timewin(chat_id, args[0], args[1]); return
+    if cmd == "/fetchmode" and len(args)>=2:
+        cmd_fetchmode(chat_id, args[0], args[1]); return
+    if cmd == "/adaptive" and len(args)>=2:
+        cmd_adaptive(chat_id, args[0], " ".join(args[1:])); return
+    if cmd == "/stats":           cmd_stats(chat_id, args); return
+    if cmd == "/digest" and args: cmd_digest(chat_id, " ".join(args)); return
     send_text(chat_id, "Unknown or bad usage.\n\n"+HELP)
 
 def handle_callback(upd):
@@ -488,11 +596,13 @@ def main():
         with open(UPD_OFF,"r") as f: offset = int((f.read() or "0").strip())
     except Exception:
         offset = 0
+    metrics.serve()
     while True:
         try:
             resp = get_updates(offset)
             for upd in resp.get("result", []):
                 offset = upd["update_id"]
+                metrics.inc("bms_bot_updates_total", kind="callback" if "callback_query" in upd else "message")
                 if "callback_query" in upd:
                     handle_callback(upd); continue
                 m = upd.get("message") or upd.get("edited_message")
@@ -507,6 +617,7 @@ def main():
                 with open(UPD_OFF,"w") as f: f.write(str(offset))
             except Exception: pass
         except Exception as e:
+            metrics.inc("bms_bot_updates_total", kind="poll_error")
             print("poll error:", e); time.sleep(2)
 
 if __name__ == "__main__":
@@ -13,6 +13,10 @@ COMMANDS=[
     {"command":"discover","description":"Discover theatres (/discover <id>)"},
     {"command":"setinterval","description":"Set interval (/setinterval <id> <m>)"},
     {"command":"timewin","description":"Limit HH:MM-HH:MM or clear (/timewin <id> <win>)"},
+    {"command":"fetchmode","description":"Fetch path auto|http|browser (/fetchmode <id> <m>)"},
+    {"command":"adaptive","description":"Adaptive interval (/adaptive <id> <min>-<max>|off)"},
+    {"command":"stats","description":"Run timings per phase (/stats [id] [6h|7d])"},
+    {"command":"digest","description":"Summary of all monitors (/digest <HH:MM|3h|off|now>)"},
     {"command":"help","description":"Help"},
 ]
 def ensure_bot_commands(scope="all_private_chats"):
@@ -2,11 +2,17 @@
 from __future__ import annotations
 import os, requests
 from typing import Optional, Dict, Any
+import metrics
 BOT_TOKEN=os.environ.get("TELEGRAM_BOT_TOKEN",""); API=f"https://api.telegram.org/bot{BOT_TOKEN}"
 def send_text(chat_id: str, text: str, reply_markup: Optional[Dict[str, Any]]=None):
     payload={"chat_id":chat_id,"text":text}
-    if reply_markup: requests.post(f"{API}/sendMessage", json={**payload,"reply_markup":reply_markup}, timeout=20)
-    else: requests.post(f"{API}/sendMessage", data=payload, timeout=20)
+    try:
+        with metrics.timed("bms_telegram_seconds"):
+            if reply_markup: r=requests.post(f"{API}/sendMessage", json={**payload,"reply_markup":reply_markup}, timeout=20)
+            else: r=requests.post(f"{API}/sendMessage", data=payload, timeout=20)
+    except Exception:
+        metrics.inc("bms_telegram_sends_total", result="exception"); raise
+    metrics.inc("bms_telegram_sends_total", result="ok" if r.status_code<300 else "error")
 def edit_text(chat_id: str, message_id: int, text: str, reply_markup: Optional[Dict[str, Any]]=None):
     payload={"chat_id":chat_id,"message_id":message_id,"text":text}
     if reply_markup: requests.post(f"{API}/editMessageText", json={**payload,"reply_markup":reply_markup}, timeout=20)
@@ -1,14 +1,28 @@
 #!/usr/bin/env python3
 from __future__ import annotations
-import re, time
+import re, time, json, hashlib
 from datetime import datetime, timedelta
 
 def norm(s: str) -> str:
     return re.sub(r"[^a-z0-9]+", "", (s or "").lower())
 
+def compile_targets(targets):
+    """Normalised theatre filter for fuzzy_match; None means 'any'."""
+    if any((t or "").strip().lower() in ("any","*") for t in targets or []): return None
+    return tuple(map(norm, targets or []))
+
+def fuzzy_match(name: str, compiled) -> bool:
+    if compiled is None: return True
+    n = norm(name); return any((tt in n or n in tt) for tt in compiled)
+
 def fuzzy(name: str, targets):
-    if any((t or "").strip().lower() in ("any","*") for t in targets or []): return True
-    n = norm(name); return any((tt in n or n in tt) for tt in map(norm, targets or []))
+    return fuzzy_match(name, compile_targets(targets))
+
+def page_fingerprint(pairs, targets=None) -> str:
+    """Stable hash of a parsed page plus the theatre filter applied to it (order-insensitive)."""
+    canon = sorted((n, sorted(set(ts))) for n, ts in pairs or [])
+    blob = json.dumps([canon, sorted(targets or [])], ensure_ascii=False, separators=(",", ":"))
+    return hashlib.blake2b(blob.encode("utf-8"), digest_size=16).hexdigest()
 
 def to_bms_date(date_str: str) -> str|None:
     s = re.sub(r"\D","", date_str or "")
@@ -27,3 +41,40 @@ def within_time_window(now_ts: int, start_hhmm: str|None, end_hhmm: str|None) ->
     if not (start_hhmm and end_hhmm): return True
     hhmm = time.strftime("%H:%M", time.localtime(now_ts))
     return (start_hhmm <= hhmm <= end_hhmm)
+
+def next_window_open(ts: int, start_hhmm: str|None, end_hhmm: str|None) -> int:
+    """Earliest time >= ts inside the daily [start, end] window (ts itself when there is no window)."""
+    if within_time_window(ts, start_hhmm, end_hhmm): return ts
+    try:
+        h, m = map(int, start_hhmm.split(":"))
+    except Exception:
+        return ts
+    lt = time.localtime(ts)
+    at = datetime(lt.tm_year, lt.tm_mon, lt.tm_mday, h, m)
+    if time.strftime("%H:%M", lt) > start_hhmm: at += timedelta(days=1)
+    return int(at.timestamp())
+
+def interval_sec(row, default_min: int = 5) -> int:
+    """Seconds between checks: the adaptive interval when enabled, else interval_min (never under 60s)."""
+    base = max(60, int((row["interval_min"] if row else None) or default_min) * 60)
+    try:
+        if int(row["adaptive"] or 0) and row["cur_interval_sec"]:
+            return max(60, int(row["cur_interval_sec"]))
+    except (TypeError, IndexError, KeyError):
+        pass
+    return base
+
+def adapt_interval(row, outcome: str):
+    """Next (interval_sec, error_streak) for an adaptive monitor after a run.
+
+    outcome: "new" (new shows alerted) snaps to the floor; "changed" (page differs, nothing new) holds;
+    "same" (page unchanged) relaxes x1.5 toward the ceiling; "error" backs off exponentially from the floor."""
+    lo = max(60, int(row["ival_min"] or row["interval_min"] or 5) * 60)
+    hi = max(lo, int(row["ival_max"] or 0) * 60)
+    cur = min(hi, max(lo, interval_sec(row)))
+    if outcome == "error":
+        errs = int(row["err_streak"] or 0) + 1
+        return min(hi, max(cur, lo * 2 ** min(errs, 10))), errs
+    if outcome == "new": return lo, 0
+    if outcome == "same": return min(hi, int(cur * 1.5)), 0
+    return cur, 0
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Per-chat digests and batched heartbeats.
+
+A chat with an enabled `daily` row gets one message at `hhmm` every day, or every
+`every_min` minutes, listing each of its monitors (state, cadence, last run,
+last alert, next check); its per-monitor heartbeats are folded into that.
+Other chats still get heartbeats, but every monitor of the chat that is due
+within half its heartbeat period goes out in the same message.
+"""
+from __future__ import annotations
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Set
+
+from store import connect, enabled_digests, claim_digest, chat_monitors
+from common import interval_sec
+from utils import movie_title_from_url
+
+def _ago(ts, now: int) -> str:
+    if not ts: return "—"
+    s = max(0, now - int(ts))
+    return f"{s//60}m ago" if s < 3600 else (f"{s//3600}h{(s%3600)//60:02d}m ago" if s < 86400 else f"{s//86400}d ago")
+
+def _next_check(r, now: int) -> str:
+    if r["state"] not in ("RUNNING", "DISCOVER"): return "—"
+    due = r["next_due_ts"] or ((int(r["last_run_ts"]) + interval_sec(r)) if r["last_run_ts"] else now)
+    left = max(0, int(due) - now)
+    return f"~{left//60}m {left%60}s"
+
+def format_monitor(r, now: int) -> str:
+    every = (f"adaptive {interval_sec(r)//60}m" if int(r["adaptive"] or 0) else f"every {r['interval_min']}m")
+    return (f"[{r['id']}] {movie_title_from_url(r['url'] or '')} — {r['state']} • {every}\n"
+            f"   last run {_ago(r['last_run_ts'], now)} • last alert {_ago(r['last_alert_ts'], now)} • next {_next_check(r, now)}")
+
+def format_digest(rows, now: int, header: str = "📋 Digest") -> str:
+    running = sum(1 for r in rows if r["state"] == "RUNNING")
+    head = f"{header} — {len(rows)} monitor(s), {running} running • {time.strftime('%H:%M', time.localtime(now))}"
+    return "\n".join([head] + [format_monitor(r, now) for r in rows])
+
+def next_digest_ts(cfg, now: int) -> int:
+    """When this chat's digest is next due: last send + cadence, or the next hhmm after the last send."""
+    last = int(cfg["last_sent_ts"] or 0)
+    every = int(cfg["every_min"] or 0)
+    if every > 0:
+        return last + every * 60 if last else now
+    try:
+        h, m = map(int, (cfg["hhmm"] or "").split(":"))
+    except ValueError:
+        return now + 86400
+    base = last or now
+    lt = time.localtime(base)
+    at = datetime(lt.tm_year, lt.tm_mon, lt.tm_mday, h, m)
+    if int(at.timestamp()) <= base: at += timedelta(days=1)
+    return int(at.timestamp())
+
+def send_due_digests(send: Callable[[str, str], None], now: int) -> Set[str]:
+    """Send every digest that is due (at most once across processes); returns the chats that have digests on."""
+    with connect() as conn:
+        cfgs = enabled_digests(conn)
+    chats = set()
+    for cfg in cfgs:
+        chat = str(cfg["chat_id"]); chats.add(chat)
+        if next_digest_ts(cfg, now) > now: continue
+        with connect() as conn:
+            if not claim_digest(conn, chat, cfg["last_sent_ts"], now): continue
+            rows = chat_monitors(conn, chat)
+        if rows:
+            send(chat, format_digest(rows, now))
+    return chats
+
+def heartbeat_group(rows: Dict[str, object], mid: str, book: Dict[str, int], now: int) -> List[object]:
+    """Monitors of mid's chat whose heartbeat is due now or within half a period (mid's, if due, comes first)."""
+    row = rows[mid]; chat = str(row["owner_chat_id"] or "")
+    def due_in(r) -> int:
+        return book.get(r["id"], 0) + int(r["heartbeat_minutes"] or 180) * 60 - now
+    if due_in(row) > 0: return []
+    return [row] + [r for m, r in rows.items()
+                    if m != mid and str(r["owner_chat_id"] or "") == chat and due_in(r) <= int(r["heartbeat_minutes"] or 180) * 30]
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Process-local counters/histograms served in Prometheus text format.
+
+Recording is a dict update under one lock, so it stays on even when nothing
+scrapes it; `serve(port)` (BMS_METRICS_PORT / --metrics-port, 0 = off) starts a
+daemon HTTP thread answering GET /metrics. Stdlib only.
+"""
+from __future__ import annotations
+import os, time, threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Tuple
+
+METRICS_PORT = int(os.environ.get("BMS_METRICS_PORT") or 0)
+METRICS_HOST = os.environ.get("BMS_METRICS_HOST") or "127.0.0.1"
+
+# seconds; covers DB lock waits (ms) up to cold Chrome starts and slow page loads
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+_lock = threading.Lock()
+_help: Dict[str, Tuple[str, str]] = {}                       # name -> (type, help)
+_counters: Dict[Tuple[str, Labels], float] = {}
+_hists: Dict[Tuple[str, Labels], List[float]] = {}            # bucket counts..., +Inf count, sum
+_gauges: Dict[str, Tuple[Callable[[], object], str]] = {}
+_gauge_lock = threading.Lock()                                # scrapes run on server threads; gauges one at a time
+
+def _key(labels: Dict[str, object]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def describe(name: str, kind: str, text: str):
+    _help[name] = (kind, text)
+
+def inc(name: str, n: float = 1, **labels):
+    k = (name, _key(labels))
+    with _lock:
+        _counters[k] = _counters.get(k, 0) + n
+
+def observe(name: str, secs: float, **labels):
+    k = (name, _key(labels))
+    with _lock:
+        h = _hists.get(k)
+        if h is None:
+            h = _hists[k] = [0.0] * (len(BUCKETS) + 2)
+        h[bisect_left(BUCKETS, secs)] += 1
+        h[-1] += secs
+
+def gauge(name: str, fn: Callable[[], object], text: str = "", label: str = "kind"):
+    """fn() -> number, or {label value: number}; evaluated on each scrape, never concurrently with another gauge."""
+    _help[name] = ("gauge", text)
+    _gauges[name] = (fn, label)
+
+class timed:
+    """with timed("bms_x_seconds", op="y"): ... observes the block's duration."""
+    __slots__ = ("name", "labels", "t0")
+
+    def __init__(self, name: str, **labels):
+        self.name = name; self.labels = labels
+
+    def __enter__(self):
+        self.t0 = time.perf_counter(); return self
+
+    def __exit__(self, *exc):
+        observe(self.name, time.perf_counter() - self.t0, **self.labels)
+
+def _esc(v: str) -> str:
+    return v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _fmt(labels: Labels, extra: str = "") -> str:
+    parts = [k + '="' + _esc(v) + '"' for k, v in labels]
+    if extra: parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def render() -> str:
+    with _lock:
+        counters = dict(_counters); hists = {k: list(v) for k, v in _hists.items()}
+    gauges: Dict[Tuple[str, Labels], float] = {}
+    with _gauge_lock:
+        for name, (fn, label) in list(_gauges.items()):
+            try:
+                v = fn()
+            except Exception:
+                continue
+            for lv, x in (v.items() if isinstance(v, dict) else [(None, v)]):
+                gauges[(name, () if lv is None else ((label, str(lv)),))] = float(x)
+    out: List[str] = []
+    for kind, series in (("counter", counters), ("gauge", gauges)):
+        for name in sorted({n for n, _ in series}):
+            t, text = _help.get(name, (kind, ""))
+            out += [f"# HELP {name} {text}", f"# TYPE {name} {kind}"]
+            out += [f"{name}{_fmt(lk)} {v:g}" for (n, lk), v in sorted(series.items()) if n == name]
+    for name in sorted({n for n, _ in hists}):
+        out += [f"# HELP {name} {_help.get(name, ('', ''))[1]}", f"# TYPE {name} histogram"]
+        for (n, lk), h in sorted(hists.items()):
+            if n != name: continue
+            acc = 0.0
+            for le, c in zip(BUCKETS, h):
+                acc += c; out.append("%s_bucket%s %g" % (name, _fmt(lk, 'le="%g"' % le), acc))
+            acc += h[len(BUCKETS)]
+            out.append("%s_bucket%s %g" % (name, _fmt(lk, 'le="+Inf"'), acc))
+            out += [f"{name}_sum{_fmt(lk)} {h[-1]:.6f}", f"{name}_count{_fmt(lk)} {acc:g}"]
+    return "\n".join(out) + "\n"
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404); return
+        body = render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *a):
+        pass
+
+def serve(port: int = METRICS_PORT, host: str | None = None):
+    """Start the /metrics endpoint on a daemon thread; no-op for port 0. Binds BMS_METRICS_HOST (default loopback)."""
+    if not port: return None
+    srv = ThreadingHTTPServer((host or METRICS_HOST, int(port)), _Handler)
+    srv.daemon_threads = True
+    threading.Thread(target=srv.serve_forever, name="bms-metrics", daemon=True).start()
+    print(f"[metrics] serving on {srv.server_address[0]}:{port}/metrics", flush=True)
+    return srv
+
+describe("bms_phase_seconds", "histogram", "Exclusive time per run phase (driver, rate, nav, ready, parse, fetch, diff, db, telegram)")
+describe("bms_checks_total", "counter", "Monitor checks by outcome (new/changed/same/error)")
+describe("bms_new_shows_total", "counter", "New showtimes detected")
+describe("bms_telegram_sends_total", "counter", "Telegram sendMessage calls by result")
+describe("bms_driver_starts_total", "counter", "Chrome starts (warm = standby browser, cold = fresh launch)")
+describe("bms_driver_restarts_total", "counter", "Driver resets/recycles by reason")
+describe("bms_db_lock_wait_seconds", "histogram", "Time spent acquiring the state.db write lock (BEGIN IMMEDIATE)")
+describe("bms_telegram_seconds", "histogram", "Bot sendMessage latency")
+describe("bms_bot_updates_total", "counter", "Telegram updates handled by the bot, by kind")
+describe("bms_bot_commands_total", "counter", "Bot commands received")
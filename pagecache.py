@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Short-TTL cache of parsed theatre pages shared by every monitor (and every
+scheduler/worker process on the same state.db).
+
+Monitors watching the same movie on the same date with different theatre
+filters load the identical page; the first fetch in a BMS_PAGE_CACHE_TTL
+window populates an in-process LRU plus the `page_cache` table, later ones
+reuse it. Entries are per fetch mode: a monitor pinned to `browser` never gets
+a page an `http`/`auto` monitor parsed from plain HTTP. Empty results are
+never cached (they are usually blocks).
+"""
+from __future__ import annotations
+import os, json, time, threading
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+from urllib.parse import urlsplit, urlunsplit
+
+from store import connect, get_cached_pages, put_cached_pages, prune_page_cache
+from common import ensure_date_in_url
+from scraper import fetch_theatres_many, normalize_fetch_mode, _dbg
+
+PAGE_CACHE_TTL = int(os.environ.get("BMS_PAGE_CACHE_TTL") or 45)
+PAGE_CACHE_MAX = int(os.environ.get("BMS_PAGE_CACHE_MAX") or 256)
+
+Pairs = List[Tuple[str, List[str]]]
+
+def cache_key(url: str, d8: str, mode: str | None = None) -> str:
+    """Scheme/host case, query, fragment and trailing slash don't change the page; the fetch mode does."""
+    p = urlsplit(url.strip())
+    return "|".join((urlunsplit((p.scheme.lower(), p.netloc.lower(), p.path.rstrip("/"), "", "")), d8,
+                     normalize_fetch_mode(mode)))
+
+class PageCache:
+    def __init__(self, ttl: int = PAGE_CACHE_TTL, max_entries: int = PAGE_CACHE_MAX):
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self._mem: "OrderedDict[str, Tuple[float, bool, Pairs]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_prune = 0.0
+        self.stats = {"hit_mem": 0, "hit_db": 0, "miss": 0, "stored": 0, "evicted": 0}
+
+    def _bump(self, k: str, n: int = 1):
+        with self._lock:
+            self.stats[k] += n
+
+    def _remember(self, key: str, ts: float, scrolled: bool, pairs: Pairs):
+        with self._lock:
+            self._mem[key] = (ts, scrolled, pairs)
+            self._mem.move_to_end(key)
+            while len(self._mem) > self.max_entries:
+                self._mem.popitem(last=False); self.stats["evicted"] += 1
+
+    def get_many(self, keys: List[str], scroll: bool) -> Dict[str, Pairs]:
+        """Fresh entries for keys; an unscrolled fetch never satisfies a scroll=True request."""
+        if self.ttl <= 0: return {}
+        now = time.time(); out: Dict[str, Pairs] = {}
+        with self._lock:
+            for k in keys:
+                hit = self._mem.get(k)
+                if hit and now - hit[0] <= self.ttl and (hit[1] or not scroll):
+                    out[k] = hit[2]; self._mem.move_to_end(k); self.stats["hit_mem"] += 1
+        rest = [k for k in keys if k not in out]
+        if rest:
+            try:
+                with connect() as conn:
+                    rows = get_cached_pages(conn, rest, now - self.ttl, scrolled=scroll)
+            except Exception as e:
+                _dbg(f"page cache read failed: {e}"); rows = {}
+            for k, (pj, ts) in rows.items():
+                pairs = [(n, list(ts_)) for n, ts_ in json.loads(pj)]
+                out[k] = pairs; self._remember(k, ts, scroll, pairs)
+            self._bump("hit_db", len(rows)); self._bump("miss", len(rest) - len(rows))
+        return out
+
+    def put_many(self, pages: Dict[str, Pairs], scroll: bool):
+        if self.ttl <= 0: return
+        now = int(time.time())
+        rows = [(k, json.dumps(v, ensure_ascii=False), 1 if scroll else 0, now) for k, v in pages.items() if v]
+        if not rows: return
+        for k, v in pages.items():
+            if v: self._remember(k, now, scroll, v)
+        try:
+            with connect() as conn:
+                put_cached_pages(conn, rows)
+                if now - self._last_prune > self.ttl:
+                    self._last_prune = now
+                    prune_page_cache(conn, now - self.ttl, self.max_entries)
+        except Exception as e:
+            _dbg(f"page cache write failed: {e}")
+        self._bump("stored", len(rows))
+
+_CACHE = PageCache()
+
+def page_cache_stats() -> Dict[str, int]:
+    with _CACHE._lock:
+        return dict(_CACHE.stats, size=len(_CACHE._mem))
+
+def theatres_for_dates(driver, url: str, dates: List[str], mode: str, debug: bool = False, tabs: int = 1,
+                       scroll: bool = True, cache: PageCache | None = None):
+    """Like fetch_theatres_many over ensure_date_in_url(url, d8), but served from the shared cache where fresh.
+    Returns (driver, {d8: theatres})."""
+    cache = cache or _CACHE
+    keys = {d8: cache_key(url, d8, mode) for d8 in dates}
+    cached = cache.get_many(list(keys.values()), scroll)
+    todo = [d8 for d8 in dates if keys[d8] not in cached]
+    fetched: Dict[str, Pairs] = {}
+    if todo:
+        urls = {d8: ensure_date_in_url(url, d8) for d8 in todo}
+        driver, pages = fetch_theatres_many(driver, list(urls.values()), mode=mode, debug=debug, tabs=tabs, scroll=scroll)
+        fetched = {keys[d8]: pages.get(u, []) for d8, u in urls.items()}
+        cache.put_many(fetched, scroll)
+    if cached:
+        _dbg(f"page cache: {len(cached)}/{len(dates)} date(s) reused for {url}")
+    return driver, {d8: cached.get(keys[d8], fetched.get(keys[d8], [])) for d8 in dates}
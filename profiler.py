@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+On-demand cProfile of monitor runs ("cycles") for the scheduler and worker.
+
+Profiles the first N cycles (--profile / BMS_PROFILE) and/or one in every K
+(--profile-every / BMS_PROFILE_EVERY). Each profiled cycle is dumped to
+<artifacts>/profiles/<ts>-<monitor>.prof, and report.txt there is rewritten with
+the aggregate: key functions (_run_monitor, parse_theatres/parse_html, connect,
+tg_send) by stable module.function label, then the hottest functions overall.
+
+A running process picks up <artifacts>/profiles/PROFILE within a few seconds:
+"N" profiles the next N cycles, "1/K" one in every K, "off" stops. The file is
+consumed on read, so `docker exec ... sh -c 'echo 5 > artifacts/profiles/PROFILE'`
+is enough. Unprofiled cycles cost a counter bump.
+"""
+from __future__ import annotations
+import os, io, time, cProfile, pstats, threading
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+PROFILE_FIRST = int(os.environ.get("BMS_PROFILE") or 0)
+PROFILE_EVERY = int(os.environ.get("BMS_PROFILE_EVERY") or 0)
+PROFILE_KEEP = int(os.environ.get("BMS_PROFILE_KEEP") or 50)
+_TRIGGER_POLL = 5.0
+
+_ROOT = os.path.dirname(os.path.abspath(__file__))
+KEY_FUNCS = ("_run_monitor", "_run_discover", "parse_theatres", "parse_html", "open_and_prepare",
+             "fetch_theatres_many", "connect", "tg_send")
+
+class CycleProfiler:
+    def __init__(self, out_dir: Optional[str] = None, first: int = 0, every: int = 0):
+        self.out_dir = out_dir
+        self.left = max(0, first)
+        self.every = max(0, every)
+        self.cycles = 0
+        self.profiled = 0
+        self.total_s = 0.0
+        self._agg: Optional[pstats.Stats] = None
+        self._lock = threading.Lock()
+        self._polled = 0.0
+
+    def _poll_trigger(self):
+        now = time.time()
+        if not self.out_dir or now - self._polled < _TRIGGER_POLL: return
+        self._polled = now
+        path = os.path.join(self.out_dir, "PROFILE")
+        try:
+            with open(path) as f: spec = f.read().strip().lower()
+            os.remove(path)
+        except OSError:
+            return
+        if spec in ("off", "0"):
+            self.left = self.every = 0
+        elif spec.startswith("1/") and spec[2:].isdigit():
+            self.every = int(spec[2:])
+        else:
+            self.left = int(spec) if spec.isdigit() else 10
+        print(f"[profile] trigger '{spec or '10'}': next={self.left} every={self.every or '—'}", flush=True)
+
+    def _take(self) -> bool:
+        with self._lock:
+            self._poll_trigger()
+            self.cycles += 1
+            if self.left > 0:
+                self.left -= 1; return True
+            return bool(self.every) and self.cycles % self.every == 0
+
+    @contextmanager
+    def cycle(self, label: str):
+        """Profile the enclosed run if it is selected; cProfile is per-thread, so wrap the run on its own thread."""
+        if not self.out_dir or not self._take():
+            yield; return
+        pr = cProfile.Profile(); t0 = time.perf_counter()
+        pr.enable()
+        try:
+            yield
+        finally:
+            pr.disable()
+            try:
+                self._save(pr, label, time.perf_counter() - t0)
+            except Exception as e:
+                print("[profile] save failed:", e, flush=True)
+
+    def _save(self, pr: cProfile.Profile, label: str, secs: float):
+        os.makedirs(self.out_dir, exist_ok=True)
+        safe = "".join(c if c.isalnum() or c in "-_" else "_" for c in label)[:40]
+        now = time.time()
+        pr.dump_stats(os.path.join(self.out_dir, f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(now))}.{int(now*1000)%1000:03d}-{safe}.prof"))
+        with self._lock:
+            self.profiled += 1; self.total_s += secs
+            if self._agg is None: self._agg = pstats.Stats(pr, stream=io.StringIO())
+            else: self._agg.add(pr)
+            report = self._report()
+        with open(os.path.join(self.out_dir, "report.txt"), "w") as f:
+            f.write(report)
+        self._prune()
+        print(f"[profile] [{label}] {secs*1000:.0f}ms profiled ({self.profiled} total)", flush=True)
+
+    def _prune(self):
+        profs = sorted(f for f in os.listdir(self.out_dir) if f.endswith(".prof"))
+        for f in profs[:max(0, len(profs) - PROFILE_KEEP)]:
+            try:
+                os.remove(os.path.join(self.out_dir, f))
+            except OSError:
+                pass
+
+    def _report(self, top: int = 40) -> str:
+        st = self._agg
+        keyed: Dict[str, list] = {}
+        for (path, _line, fn), (_cc, nc, tt, ct, _callers) in st.stats.items():
+            if fn in KEY_FUNCS and os.path.abspath(path).startswith(_ROOT):
+                k = keyed.setdefault(f"{os.path.splitext(os.path.basename(path))[0]}.{fn}", [0, 0.0, 0.0])
+                k[0] += nc; k[1] += tt; k[2] += ct
+        out = io.StringIO()
+        out.write(f"{self.profiled} profiled cycle(s), {self.total_s:.2f}s wall; updated {time.strftime('%Y-%m-%d %H:%M:%S')}\n\n")
+        out.write(f"{'key function':<34}{'calls':>8}{'own s':>10}{'cum s':>10}{'cum ms/cycle':>14}\n")
+        for name, (nc, tt, ct) in sorted(keyed.items(), key=lambda kv: -kv[1][2]):
+            out.write(f"{name:<34}{nc:>8}{tt:>10.3f}{ct:>10.3f}{ct*1000/max(1, self.profiled):>14.1f}\n")
+        for order in ("cumulative", "tottime"):
+            out.write(f"\n---- top {top} by {order} ----\n")
+            st.stream = out
+            st.sort_stats(order).print_stats(top)
+        return out.getvalue()
+
+_PROFILER = CycleProfiler()
+
+def configure(artifacts_dir: str, first: int = PROFILE_FIRST, every: int = PROFILE_EVERY) -> CycleProfiler:
+    """Enable cycle profiling into <artifacts_dir>/profiles (the trigger file works even with first=every=0)."""
+    global _PROFILER
+    _PROFILER = CycleProfiler(os.path.join(artifacts_dir or "./artifacts", "profiles"), first, every)
+    os.makedirs(_PROFILER.out_dir, exist_ok=True)
+    if first or every:
+        print(f"[profile] first {first} cycle(s), every {every or '—'} -> {_PROFILER.out_dir}", flush=True)
+    return _PROFILER
+
+def cycle(label: str):
+    return _PROFILER.cycle(label)
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Global token bucket for outbound in.bookmyshow.com requests.
+
+The bucket lives in state.db (`rate_bucket`), so the scheduler, every worker
+process and every executor thread draw from the same budget: BMS_RATE_PER_MIN
+sustained, BMS_RATE_BURST back-to-back. Inside a process, waiters are served
+round-robin by monitor so one monitor with many dates can't starve the rest.
+scraper calls the installed limiter before every navigation and HTTP fetch.
+Off unless BMS_RATE_PER_MIN (or --rate-per-min) is set; 30/min with a burst of
+4 is a reasonable starting point for a handful of monitors.
+"""
+from __future__ import annotations
+import os, time, threading
+from collections import OrderedDict
+from typing import Dict
+
+from store import connect, take_token
+from scraper import set_rate_limiter, FetchTimeout
+
+RATE_PER_MIN = float(os.environ.get("BMS_RATE_PER_MIN") or 0)
+RATE_BURST = int(os.environ.get("BMS_RATE_BURST") or 4)
+
+class RateLimiter:
+    def __init__(self, per_min: float = RATE_PER_MIN, burst: int = RATE_BURST, name: str = "bms"):
+        self.rate = max(0.0, float(per_min)) / 60.0
+        self.burst = max(1, int(burst))
+        self.name = name
+        self._cv = threading.Condition()
+        self._turns: "OrderedDict[str, int]" = OrderedDict()   # key -> waiting threads; first key holds the turn
+        self._busy = False
+        self.stats = {"acquired": 0, "waited": 0, "wait_ms_sum": 0, "wait_ms_max": 0, "db_errors": 0, "timeouts": 0}
+
+    def _take(self) -> float:
+        # the calling thread's pooled connection; acquire() runs on whichever thread is scraping
+        conn = None
+        try:
+            conn = connect()
+            return take_token(conn, self.name, self.rate, self.burst, time.time())
+        except Exception:
+            # fail open: a locked/broken DB must not stall every scrape
+            self.stats["db_errors"] += 1
+            try:
+                if conn is not None: conn.close()
+            except Exception:
+                pass
+            return 0.0
+
+    def acquire(self, key: str = "-", deadline: float | None = None) -> float:
+        """Block until this caller may make one request; returns seconds waited.
+        Raises FetchTimeout instead of waiting past `deadline` (time.time())."""
+        if self.rate <= 0: return 0.0
+        t0 = time.time(); ok = False
+        with self._cv:
+            self._turns[key] = self._turns.get(key, 0) + 1
+            while self._busy or next(iter(self._turns)) != key:
+                left = None if deadline is None else deadline - time.time()
+                if left is not None and left <= 0:
+                    self._leave(key); self.stats["timeouts"] += 1
+                    raise FetchTimeout("run deadline passed waiting for a rate-limit turn")
+                self._cv.wait(left)
+            self._busy = True
+        try:
+            while True:
+                wait = self._take()
+                if wait <= 0: break
+                if deadline is not None and time.time() + wait > deadline:
+                    raise FetchTimeout(f"run deadline passed before the next rate-limit token ({wait:.1f}s)")
+                time.sleep(min(wait, 1.0))
+            ok = True
+        finally:
+            with self._cv:
+                self._busy = False
+                self._leave(key)   # re-queued at the back: other monitors go first
+                waited = time.time() - t0
+                ms = int(waited * 1000)
+                if ok:
+                    self.stats["acquired"] += 1
+                    self.stats["waited"] += ms >= 50
+                    self.stats["wait_ms_sum"] += ms
+                    self.stats["wait_ms_max"] = max(self.stats["wait_ms_max"], ms)
+                else:
+                    self.stats["timeouts"] += 1
+        return waited
+
+    def _leave(self, key: str):
+        # caller holds _cv
+        n = self._turns.pop(key) - 1
+        if n: self._turns[key] = n
+        self._cv.notify_all()
+
+_LIMITER: RateLimiter | None = None
+
+def install(per_min: float = RATE_PER_MIN, burst: int = RATE_BURST) -> RateLimiter:
+    """Route scraper's navigations/fetches through a shared limiter (per_min <= 0 disables it)."""
+    global _LIMITER
+    _LIMITER = RateLimiter(per_min, burst)
+    set_rate_limiter(_LIMITER.acquire if _LIMITER.rate > 0 else None)
+    return _LIMITER
+
+def rate_stats() -> Dict[str, int]:
+    if _LIMITER is None: return {}
+    with _LIMITER._cv:
+        s = dict(_LIMITER.stats, queued=sum(_LIMITER._turns.values()))
+    s["wait_ms_avg"] = int(s.pop("wait_ms_sum") / s["acquired"]) if s["acquired"] else 0
+    return s
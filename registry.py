@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+In-memory registry of compiled monitor configs.
+
+MonitorConfig parses a monitors row once (theatre filter, dates, window) and
+memoises venue matches and the day's effective dates; indexing falls through
+to the row, so code written against sqlite3.Row keeps working. The registry
+refreshes incrementally: nothing happens until PRAGMA data_version moves, then
+only rows at or past the updated_at watermark are read, and rows that come
+back unchanged keep their existing config.
+"""
+from __future__ import annotations
+import json, time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from store import changed_monitors, get_active_monitors, get_monitor, data_version
+from common import compile_targets, fuzzy_match, roll_dates, to_bms_date, within_time_window
+
+class MonitorConfig:
+    __slots__ = ("row", "id", "state", "url", "chat", "targets", "_match", "_names",
+                 "mode", "dates", "rolling_days", "end_date", "time_start", "time_end", "snooze_until",
+                 "updated_at", "_eff_day", "_eff")
+
+    def __init__(self, row):
+        self.row = row
+        self.id = row["id"]
+        self.state = row["state"]
+        self.url = row["url"]
+        self.chat = str(row["owner_chat_id"] or "")
+        self.targets: List[str] = json.loads(row["theatres"]) if row["theatres"] else []
+        self._match = compile_targets(self.targets)
+        self._names: Dict[str, bool] = {}
+        self.mode = (row["mode"] or "FIXED").upper()
+        self.dates = [x for x in (row["dates"] or "").split(",") if x]
+        self.rolling_days = max(1, int(row["rolling_days"] or 1))
+        self.end_date = to_bms_date(row["end_date"] or "")
+        self.time_start, self.time_end = row["time_start"], row["time_end"]
+        self.snooze_until = int(row["snooze_until"] or 0)
+        self.updated_at = int(row["updated_at"] or 0)
+        self._eff_day = None; self._eff: List[str] = []
+
+    def __getitem__(self, k):
+        return self.row[k]
+
+    def keys(self):
+        return self.row.keys()
+
+    def matches(self, name: str) -> bool:
+        """Venue passes the theatre filter (no filter = everything); memoised per venue name."""
+        hit = self._names.get(name)
+        if hit is None:
+            hit = self._names[name] = not self.targets or fuzzy_match(name, self._match)
+        return hit
+
+    def effective_dates(self) -> List[str]:
+        """Dates to check today (ROLLING/UNTIL move with the calendar); recomputed once per local day."""
+        today = datetime.now().strftime("%Y%m%d")
+        if self._eff_day != today:
+            self._eff_day, self._eff = today, self._compute_dates(today)
+        return list(self._eff)
+
+    def _compute_dates(self, today: str) -> List[str]:
+        if self.mode == "ROLLING":
+            return roll_dates(self.rolling_days)
+        if self.mode == "UNTIL" and self.end_date:
+            if today > self.end_date: return []
+            span = []; cur = datetime.now()
+            while cur.strftime("%Y%m%d") <= self.end_date:
+                span.append(cur.strftime("%Y%m%d")); cur += timedelta(days=1)
+            return span
+        return list(self.dates)
+
+    def should_run(self, now: int) -> bool:
+        if self.state not in ("RUNNING", "DISCOVER"): return False
+        if self.snooze_until and now < self.snooze_until: return False
+        return within_time_window(now, self.time_start, self.time_end)
+
+def as_config(row) -> Optional[MonitorConfig]:
+    if row is None or isinstance(row, MonitorConfig): return row
+    return MonitorConfig(row)
+
+class MonitorRegistry:
+    def __init__(self):
+        self.by_id: Dict[str, MonitorConfig] = {}
+        self.version: Optional[int] = None
+        self.since = 0
+        self.stats = {"polls": 0, "reads": 0, "compiled": 0, "unchanged": 0}
+
+    def _put(self, row) -> Optional[MonitorConfig]:
+        cur = self.by_id.get(row["id"])
+        if cur is not None and tuple(cur.row) == tuple(row):
+            self.stats["unchanged"] += 1
+            return None
+        cfg = self.by_id[row["id"]] = MonitorConfig(row)
+        self.stats["compiled"] += 1
+        return cfg
+
+    def load_active(self, conn) -> List[MonitorConfig]:
+        """Initial fill with the RUNNING/DISCOVER monitors."""
+        self.version = data_version(conn); self.since = int(time.time())
+        return [c for c in map(self._put, get_active_monitors(conn)) if c]
+
+    def poll(self, conn, full: bool = False) -> List[MonitorConfig]:
+        """Configs whose rows changed since the last poll; [] without touching monitors when nothing committed."""
+        v = data_version(conn)
+        if v == self.version and not full: return []
+        self.version = v; self.stats["polls"] += 1
+        rows = changed_monitors(conn, 0 if full else self.since)
+        self.stats["reads"] += len(rows)
+        if rows: self.since = max([self.since] + [int(r["updated_at"] or 0) for r in rows])
+        return [c for c in map(self._put, rows) if c]
+
+    def refresh(self, conn, mid: str) -> Optional[MonitorConfig]:
+        """Re-read one monitor (e.g. after its run); None when it no longer exists."""
+        row = get_monitor(conn, mid)
+        if row is None:
+            self.by_id.pop(mid, None); return None
+        return self._put(row) or self.by_id[mid]
+
+    def get(self, mid: str) -> Optional[MonitorConfig]:
+        return self.by_id.get(mid)
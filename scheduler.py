@@ -1,21 +1,36 @@
 #!/usr/bin/env python3
 from __future__ import annotations
-import os, re, time, json, traceback
+import os, re, time, json, heapq, itertools, queue, threading, traceback
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Tuple
-from datetime import datetime, timedelta
 from utils import titled
 
 import requests
 
 from store import (
-    connect, get_active_monitors, get_monitor, set_state, set_reload, set_dates,
-    get_indexed_theatres, upsert_indexed_theatre, bulk_upsert_seen, is_seen, set_baseline_done
+    connect, set_state, set_reload, set_dates, set_next_due,
+    worker_id, sync_jobs, drop_jobs, claim_jobs, renew_lease, finish_jobs, record_interval,
+    get_indexed_theatres, upsert_indexed_theatres, bulk_upsert_seen, is_seen, seed_baseline,
+    get_fingerprints, set_fingerprints, prune_runs, job_backlog, db_stats, private_connection
 )
-from common import ensure_date_in_url, fuzzy, roll_dates, to_bms_date, within_time_window
-from scraper import set_trace as set_scr_trace, get_driver, open_and_prepare_resilient, parse_theatres
+from common import ensure_date_in_url, page_fingerprint, next_window_open, interval_sec, adapt_interval, roll_dates
+from scraper import (
+    set_trace as set_scr_trace, set_artifact_scope, artifact_stats, driver_factory, quit_driver, open_and_prepare_resilient,
+    fetch_theatres, LifecyclePolicy, fetch_stats, net_stats, ready_stats, normalize_fetch_mode,
+    phase, start_phases, take_phases, set_deadline, FetchTimeout, FETCH_MODES, DEFAULT_TABS, RECYCLE_NAVS, MAX_RSS_MB, PARK_IDLE_SEC
+)
+from pagecache import theatres_for_dates, page_cache_stats
+from registry import MonitorRegistry, as_config
+from digest import send_due_digests, heartbeat_group, format_digest
+import ratelimit, metrics, profiler
 
 BOT_TOKEN = os.environ.get("TELEGRAM_BOT_TOKEN","")
 FALLBACK_CHAT = os.environ.get("TELEGRAM_CHAT_ID","")
+DEFAULT_WORKERS = int(os.environ.get("BMS_WORKERS") or 1)
+RUN_TIMEOUT = int(os.environ.get("BMS_RUN_TIMEOUT") or 300)
+LEASE_SEC = int(os.environ.get("BMS_LEASE_SEC") or 120)
+OWNER = worker_id()
+RUNS_KEEP_DAYS = int(os.environ.get("BMS_RUNS_KEEP_DAYS") or 14)
 
 # ---------- Telegram ----------
 def tg_send(chat_id: str, text: str):
@@ -27,9 +42,12 @@ def tg_send(chat_id: str, text: str):
     api=f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
     for chunk in [text[i:i+4000] for i in range(0,len(text),4000)] or [text]:
         try:
-            r=requests.post(api, data={"chat_id": chat_id, "text": chunk}, timeout=20)
+            with phase("telegram"):
+                r=requests.post(api, data={"chat_id": chat_id, "text": chunk}, timeout=20)
+            metrics.inc("bms_telegram_sends_total", result="ok" if r.status_code<300 else "error")
             if r.status_code>=300: print("[telegram] error:", r.status_code, r.text)
         except Exception as e:
+            metrics.inc("bms_telegram_sends_total", result="exception")
             print("[telegram] exception:", e)
 
 # ---------- helpers ----------
@@ -37,28 +55,10 @@ def _fmt_date(d8: str)->str: return f"{d8[:4]}-{d8[4:6]}-{d8[6:]}"
 def _now_i(): return int(time.time())
 
 def _effective_dates(row)->List[str]:
-    mode=(row["mode"] or "FIXED").upper()
-    if mode=="ROLLING":
-        days=max(1,int(row["rolling_days"] or 1))
-        return roll_dates(days)
-    if mode=="UNTIL":
-        end=to_bms_date(row["end_date"] or "")
-        if not end: return [x for x in (row["dates"] or "").split(",") if x]
-        today=int(datetime.now().strftime("%Y%m%d"))
-        endi=int(end)
-        if today>endi: return []
-        span=[]; cur=datetime.now()
-        while int(cur.strftime("%Y%m%d"))<=endi:
-            span.append(cur.strftime("%Y%m%d"))
-            cur=cur+timedelta(days=1)
-        return span
-    return [x for x in (row["dates"] or "").split(",") if x]
+    return as_config(row).effective_dates()
 
 def _should_run_now(row)->bool:
-    if row["state"] not in ("RUNNING","DISCOVER"): return False
-    if row["snooze_until"] and _now_i() < int(row["snooze_until"]): return False
-    if not within_time_window(_now_i(), row["time_start"], row["time_end"]): return False
-    return True
+    return as_config(row).should_run(_now_i())
 
 def _deeplink(row: dict, d8: str) -> str:
     """Try to build a buytickets deep link using ET code; fall back to date-injected URL."""
@@ -110,42 +110,122 @@ def _format_new_shows(row: dict, found: List[Tuple[str,str,str]]) -> str:
 
 # ---------- selenium driver ----------
 class DriverManager:
-    def __init__(self, debug: bool=False, trace: bool=False, artifacts_dir: str="./artifacts"):
+    def __init__(self, debug: bool=False, trace: bool=False, artifacts_dir: str="./artifacts",
+                 fetch_mode: str|None=None, tabs: int=DEFAULT_TABS, standby: bool=False,
+                 policy: LifecyclePolicy|None=None):
         self.debug = debug
         self.trace = trace
         self.artifacts_dir = artifacts_dir
+        self.fetch_mode = normalize_fetch_mode(fetch_mode)
+        self.tabs = max(1, int(tabs or 1))
+        self.factory = driver_factory(debug)
+        self.factory.standby = self.factory.standby or standby
+        self.policy = policy or LifecyclePolicy()
+        self.parked = False
+        self.recycles = 0
         self.d = None
+        self.gen = 0   # bumped by reset(); a driver obtained under an older gen is never adopted
+        self._lock = threading.Lock()
         set_scr_trace(trace, artifacts_dir)
 
+    def _current(self):
+        with self._lock:
+            return self.gen, self.d
+
+    def _adopt(self, gen: int, d, prev=None) -> bool:
+        """Keep d unless reset() ran since gen was read (e.g. a run timeout from the main thread); then quit it,
+        unless it is `prev`, the driver that reset() already quit."""
+        with self._lock:
+            if gen == self.gen:
+                self.d = d; return True
+        if d is not prev: quit_driver(d)
+        return False
+
     def ensure(self):
-        if self.d: return self.d
-        self.d = get_driver(debug=self.debug)
-        if not self.d:
+        gen, d = self._current()
+        if d: return d
+        d = self.factory.acquire()
+        if not d:
             raise RuntimeError("Failed to start Chrome driver")
-        return self.d
-
-    def reset(self):
-        try:
-            if self.d: self.d.quit()
-        except Exception:
-            pass
-        self.d = None
+        if not self._adopt(gen, d):
+            raise FetchTimeout("driver was reset while starting")
+        return d
+
+    def reset(self, reason: str="error"):
+        with self._lock:
+            d, self.d = self.d, None; self.gen += 1
+        if d is not None: metrics.inc("bms_driver_restarts_total", reason=reason)
+        quit_driver(d)
+
+    def maintain(self, next_due_in: float|None, row=None):
+        """Between runs: recycle a worn-out driver, park it over long idle gaps, pre-warm before the next run
+        (`row`) when that run is fetched with the browser. The shared factory's standby is left to the caller."""
+        if self.d is not None:
+            reason = self.policy.recycle_reason(self.d)
+            if reason:
+                print(f"[driver] recycling ({reason})", flush=True)
+                self.reset("recycle"); self.recycles += 1
+            elif self.policy.should_park(next_due_in):
+                print(f"[driver] parking; next run in {'—' if next_due_in is None else f'{int(next_due_in)}s'}", flush=True)
+                self.reset("park"); self.parked = True
+        elif self.parked and self.policy.should_prewarm(next_due_in):
+            # http/auto runs start without Chrome; auto launches one only if its fallback needs it
+            if (self.mode_for(row) if row is not None else self.fetch_mode) != "browser": return
+            self.parked = False
+            try:
+                self.ensure()
+            except Exception as e:
+                print("[driver] pre-warm failed:", e)
 
     def open(self, url: str):
-        d = self.ensure()
-        return open_and_prepare_resilient(d, url, debug=self.debug)
+        gen = self.gen; prev = self.ensure()
+        d = open_and_prepare_resilient(prev, url, debug=self.debug)
+        if not self._adopt(gen, d, prev):
+            raise FetchTimeout("driver was reset while loading")
+        return d
+
+    def mode_for(self, row) -> str:
+        """Per-monitor fetch_mode wins over the per-run default."""
+        try:
+            m = row["fetch_mode"]
+        except (IndexError, KeyError):
+            m = None
+        return normalize_fetch_mode(m or self.fetch_mode)
+
+    def theatres(self, url: str, row=None, scroll: bool=True):
+        mode = self.mode_for(row) if row is not None else self.fetch_mode
+        gen, prev = self._current()
+        d, pairs = fetch_theatres(prev, url, mode=mode, debug=self.debug, scroll=scroll)
+        self._adopt(gen, d, prev)
+        return pairs
+
+    def theatres_by_date(self, row, dates: List[str], scroll: bool=True) -> Dict[str, List[Tuple[str, List[str]]]]:
+        """All dates of one monitor in a single fan-out (shared page cache first); d8 -> theatres."""
+        gen, prev = self._current()
+        d, pages = theatres_for_dates(prev, row["url"], dates, mode=self.mode_for(row),
+                                      debug=self.debug, tabs=self.tabs, scroll=scroll)
+        self._adopt(gen, d, prev)
+        return pages
 
 # ---------- actions ----------
+_DIFF_STATS = {"checked": 0, "skipped": 0}
+_diff_lock = threading.Lock()
+
+def diff_stats() -> Dict[str,int]:
+    """Per-(monitor, date) pages checked vs skipped on an unchanged fingerprint."""
+    with _diff_lock:
+        st = dict(_DIFF_STATS)
+    return dict(st, skip_pct=round(100 * st["skipped"] / st["checked"]) if st["checked"] else 0)
+
 def _run_discover(dm: DriverManager, row):
+    set_artifact_scope(row["id"])
     eff = _effective_dates(row) or roll_dates(1)
     date = eff[0]
     url = ensure_date_in_url(row["url"], date)
-    d = dm.open(url)
-    pairs = parse_theatres(d)
+    pairs = dm.theatres(url, row, scroll=False)
     names = sorted({n for n,_ in pairs})
     with connect() as conn:
-        for nm in names:
-            upsert_indexed_theatre(conn, row["id"], date, nm)
+        upsert_indexed_theatres(conn, row["id"], date, names)
         set_state(conn, row["id"], "PAUSED")
     chat = str(row["owner_chat_id"] or "")
     tg_send(chat, titled(row, f"🧭 Discover complete for [{row['id']}]\n"
@@ -153,74 +233,83 @@ def _run_discover(dm: DriverManager, row):
                               f"State set to PAUSED.\n"
                               f"🔗 {_deeplink(row, date)}"))
 
-def _run_monitor(dm: DriverManager, row, heartbeat_book: Dict[str,int]):
-    mid = row["id"]; chat=str(row["owner_chat_id"] or "")
-    eff_dates = _effective_dates(row)
+def _run_monitor(dm: DriverManager, row, heartbeat_book: Dict[str,int], dates: List[str]|None=None):
+    """One check of a monitor; `dates` narrows it to the (leased) subset of its effective dates.
+    With baseline=1 the same sweep seeds `seen` instead of alerting.
+    Returns "new", "changed" or "same" for the adaptive interval."""
+    row = as_config(row); mid = row.id; chat = row.chat
+    set_artifact_scope(mid)
+    eff_dates = dates or _effective_dates(row)
     if not eff_dates:
         if (row["mode"] or "FIXED").upper()=="UNTIL":
             with connect() as conn: set_state(conn, mid, "PAUSED")
             tg_send(chat, titled(row, f"⏸️ [{mid}] End date reached; auto-paused."))
         return
 
-    # one-time baseline
-    if int(row["baseline"] or 0) == 1:
-        try:
-            for d8 in eff_dates:
-                turl = ensure_date_in_url(row["url"], d8)
-                d = dm.open(turl)
-                for name, shows in parse_theatres(d):
-                    twanted = json.loads(row["theatres"]) if row["theatres"] else []
-                    if not twanted or fuzzy(name, twanted):
-                        with connect() as conn:
-                            bulk_upsert_seen(conn, [(mid, d8, name, st, _now_i()) for st in shows])
-            with connect() as conn: set_baseline_done(conn, mid)
-            tg_send(chat, titled(row, f"📏 Baseline captured for [{mid}] — alerts will fire only on newly added showtimes."))
-        except Exception as e:
-            tg_send(chat, titled(row, f"⚠️ Baseline failed for [{mid}]: {e}"))
-
+    baseline = int(row["baseline"] or 0) == 1
     found: List[Tuple[str,str,str]] = []
+    changed: Dict[str,str] = {}
     try:
-        for d8 in eff_dates:
-            turl = ensure_date_in_url(row["url"], d8)
-            d = dm.open(turl)
-            try:
-                for _ in range(2):
-                    d.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                    time.sleep(0.5)
-            except Exception:
-                pass
-            pairs = parse_theatres(d)
-            with connect() as conn:
-                for nm,_ in pairs: upsert_indexed_theatre(conn, mid, d8, nm)
-            twanted = json.loads(row["theatres"]) if row["theatres"] else []
-            for nm, shows in pairs:
-                if not twanted or fuzzy(nm, twanted):
-                    for st in shows:
-                        with connect() as conn:
-                            if not is_seen(conn, mid, d8, nm, st):
+        with phase("fetch"):
+            pages = dm.theatres_by_date(row, eff_dates)
+        twanted = row.targets
+        with phase("diff"), connect() as conn:
+            known = {} if baseline else get_fingerprints(conn, mid)
+            for d8 in eff_dates:
+                pairs = pages[d8]
+                fp = page_fingerprint(pairs, twanted)
+                same = known.get(d8) == fp
+                with _diff_lock:
+                    _DIFF_STATS["checked"] += 1; _DIFF_STATS["skipped"] += same
+                if same:
+                    # identical to the last fully processed page: nothing can be new
+                    continue
+                changed[d8] = fp
+                with phase("db"):
+                    upsert_indexed_theatres(conn, mid, d8, [nm for nm,_ in pairs])
+                for nm, shows in pairs:
+                    if row.matches(nm):
+                        for st in shows:
+                            if baseline or not is_seen(conn, mid, d8, nm, st):
                                 found.append((nm, d8, st))
     except Exception:
         dm.reset()
         raise
 
+    if baseline:
+        with phase("db"), connect() as conn:
+            seed_baseline(conn, mid, [(mid, d, n, t, _now_i()) for n,d,t in found], changed)
+        tg_send(chat, titled(row, f"📏 Baseline captured for [{mid}] ({len(found)} showtimes, {len(eff_dates)} date(s)) — "
+                                  f"alerts will fire only on newly added showtimes."))
+        return "changed"
+
     if found:
-        tg_send(chat, _format_new_shows(row, found))
-        with connect() as conn:
+        metrics.inc("bms_new_shows_total", len(found), monitor=mid)
+        tg_send(chat, _format_new_shows(dict(row), found))
+        with phase("db"), connect() as conn:
             bulk_upsert_seen(conn, [(mid, d, n, t, _now_i()) for n,d,t in found])
             conn.execute("UPDATE monitors SET last_alert_ts=?, updated_at=? WHERE id=?", (_now_i(), _now_i(), mid))
             conn.commit()
-
-def _send_heartbeat_if_due(row, heartbeat_book: Dict[str,int]):
-    """Send heartbeat independently of scraping, so you always get a health ping."""
-    mid = row["id"]; chat=str(row["owner_chat_id"] or "")
-    hb_every = int(row["heartbeat_minutes"] or 180)
+    if changed:
+        with phase("db"), connect() as conn: set_fingerprints(conn, mid, changed)
+    return "new" if found else ("changed" if changed else "same")
+
+def _send_heartbeats(rows: Dict[str,object], mid: str, heartbeat_book: Dict[str,int], digest_chats=()):
+    """Send heartbeat independently of scraping, so you always get a health ping. Monitors of the same chat
+    that are nearly due ride along in one message; chats with a digest enabled get it there instead."""
+    row = rows[mid]; chat=str(row["owner_chat_id"] or "")
     now = _now_i()
-    last_sent = heartbeat_book.get(mid, 0)
-    if now - last_sent < hb_every*60:
+    group = heartbeat_group(rows, mid, heartbeat_book, now)
+    if not group:
+        return
+    for r in group: heartbeat_book[r["id"]] = now
+    if chat in digest_chats:
         return
+    if len(group) > 1:
+        tg_send(chat, format_digest(group, now, header="💓 Heartbeat")); return
     eta = 0
     if row["last_run_ts"] and row["interval_min"]:
-        eta = int(row["last_run_ts"]) + int(row["interval_min"])*60 - now
+        eta = int(row["last_run_ts"]) + interval_sec(row) - now
         eta = max(0, eta)
     link = _deeplink(row, (_effective_dates(row) or roll_dates(1))[0])
     msg = (
@@ -230,80 +319,313 @@ def _send_heartbeat_if_due(row, heartbeat_book: Dict[str,int]):
         f"🔗 {link}"
     )
     tg_send(chat, titled(row, msg))
-    heartbeat_book[mid] = now
-
-# ---------- main loop ----------
-class DriverManager:
-    def __init__(self, debug: bool=False, trace: bool=False, artifacts_dir: str="./artifacts"):
-        self.debug = debug
-        self.trace = trace
-        self.artifacts_dir = artifacts_dir
-        self.d = None
-        set_scr_trace(trace, artifacts_dir)
 
-    def ensure(self):
-        if self.d: return self.d
-        self.d = get_driver(debug=self.debug)
-        if not self.d:
-            raise RuntimeError("Failed to start Chrome driver")
-        return self.d
-
-    def reset(self):
-        try:
-            if self.d: self.d.quit()
-        except Exception:
-            pass
-        self.d = None
-
-    def open(self, url: str):
-        d = self.ensure()
-        return open_and_prepare_resilient(d, url, debug=self.debug)
+# ---------- due queue ----------
+def _run_due_ts(row, now: int) -> int|None:
+    """When a monitor should next run: interval after its last run, pushed past snooze and outside its time window."""
+    if row["state"] not in ("RUNNING","DISCOVER"): return None
+    # DISCOVER normally flips to PAUSED on its run; a failing one retries every 30s rather than spinning
+    gap = 30 if row["state"] == "DISCOVER" else interval_sec(row)
+    due = int(row["last_run_ts"] or 0) + gap
+    if row["snooze_until"]: due = max(due, int(row["snooze_until"]))
+    opens = next_window_open(max(due, now), row["time_start"], row["time_end"])
+    return due if opens <= max(due, now) else opens
+
+class DueQueue:
+    """Min-heaps of (due_ts, seq, monitor_id, kind, gen) for the active monitors, one per kind.
+
+    kind is "run" or "hb" (heartbeat); keeping them apart lets a due heartbeat go out while the earliest run
+    waits for a driver. Re-putting or dropping a monitor bumps its generation; entries with an older
+    generation are discarded when they reach the top, so updates never search the heaps."""
+    KINDS = ("run", "hb")
+
+    def __init__(self):
+        self.heaps: Dict[str, List[tuple]] = {k: [] for k in self.KINDS}
+        self.rows: Dict[str, object] = {}
+        self.gen: Dict[str, int] = {}
+        self.dirty: Dict[str, int] = {}   # monitor_id -> next_due_ts still to persist
+        self._seq = itertools.count()
+
+    def __len__(self): return len(self.rows)
+
+    def push(self, due: int, mid: str, kind: str):
+        heapq.heappush(self.heaps[kind], (int(due), next(self._seq), mid, kind, self.gen.get(mid, 0)))
+
+    def put(self, row, now: int, heartbeat_book: Dict[str,int]) -> int|None:
+        mid = row["id"]
+        self.gen[mid] = self.gen.get(mid, 0) + 1
+        due = _run_due_ts(row, now)
+        if due is None:
+            self.rows.pop(mid, None); return None
+        self.rows[mid] = row
+        self.push(due, mid, "run")
+        self.push(heartbeat_book.get(mid, 0) + int(row["heartbeat_minutes"] or 180)*60, mid, "hb")
+        if row["next_due_ts"] != due: self.dirty[mid] = due
+        return due
+
+    def drop(self, mid: str):
+        self.gen[mid] = self.gen.get(mid, 0) + 1
+        self.rows.pop(mid, None)
+
+    def _head(self, kind: str):
+        h = self.heaps[kind]
+        while h and (h[0][2] not in self.rows or h[0][4] != self.gen.get(h[0][2])):
+            heapq.heappop(h)
+        return h[0] if h else None
+
+    def peek(self, kind: str|None=None) -> int|None:
+        """Earliest live due time of one kind, or of either when kind is None."""
+        dues = [e[0] for e in map(self._head, (kind,) if kind else self.KINDS) if e]
+        return min(dues) if dues else None
+
+    def top(self, kind: str="run"):
+        """Earliest live entry of a kind as (due, monitor_id, kind) without removing it."""
+        e = self._head(kind)
+        return e and (e[0], e[2], e[3])
+
+    def pop(self, now: int, kind: str="run"):
+        """Earliest live entry of a kind due at or before now as (due, monitor_id, kind), else None."""
+        e = self._head(kind)
+        if e is None or e[0] > now: return None
+        heapq.heappop(self.heaps[kind])
+        return e[0], e[2], e[3]
+
+    def flush(self, conn):
+        if self.dirty:
+            set_next_due(conn, [(due, mid) for mid, due in self.dirty.items()])
+            self.dirty.clear()
+
+_SCHED_STATS = {"started": 0, "wakeups": 0, "syncs": 0, "runs": 0, "timeouts": 0, "lease_busy": 0, "late_max_s": 0, "late_sum_s": 0}
+
+def sched_stats() -> Dict[str,int]:
+    """Dispatch lateness counts from max(due, scheduler start, last edit) so backlogs and fresh monitors don't skew it."""
+    s = dict(_SCHED_STATS); s.pop("started")
+    s["late_avg_s"] = round(s.pop("late_sum_s") / s["runs"], 1) if s["runs"] else 0
+    return s
+
+class DriverPool:
+    """Fixed set of DriverManagers; a monitor run borrows one for its duration. Main-thread only."""
+    def __init__(self, n: int, **dm_kwargs):
+        self.all = [DriverManager(**dm_kwargs) for _ in range(max(1, int(n or 1)))]
+        self.idle = list(self.all)
+        self.dirty: set = set()   # borrowed managers to reset when they come back
+
+    def take(self) -> DriverManager|None:
+        return self.idle.pop() if self.idle else None
+
+    def give(self, dm: DriverManager):
+        if id(dm) in self.dirty:
+            self.dirty.discard(id(dm)); dm.reset("reload")
+        self.idle.append(dm)
+
+    def reload(self):
+        """Restart every driver: idle ones now, busy ones when their run finishes."""
+        for dm in self.all:
+            if dm in self.idle: dm.reset("reload")
+            else: self.dirty.add(id(dm))
+
+    def maintain(self, next_due_in: float|None, row=None):
+        """Lifecycle pass over the idle drivers; the shared standby browser goes only once every driver is parked."""
+        for dm in self.idle:
+            dm.maintain(next_due_in, row)
+        if len(self.idle) == len(self.all) and all(dm.parked and dm.d is None for dm in self.all):
+            self.all[0].factory.close()
+
+def _sync(pool: DriverPool, q: DueQueue, rows, heartbeat_book: Dict[str,int]):
+    """Fold changed monitor rows into the queue, acting on control flags on the way."""
+    now = _now_i()
+    for r in rows:
+        if int(r["reload"] or 0) == 1:
+            pool.reload()
+            with connect() as conn:
+                conn.execute("UPDATE monitors SET reload=0, updated_at=? WHERE id=?", (now, r["id"])); conn.commit()
+        if r["state"] in ("RUNNING","DISCOVER"):
+            q.put(r, now, heartbeat_book)
+        else:
+            if r["id"] in q.rows:
+                with connect() as conn: drop_jobs(conn, r["id"])
+            q.drop(r["id"])
+
+def _begin_run(q: DueQueue, due: int, mid: str):
+    """Main thread: final gate and bookkeeping before a run is handed to the executor.
+    Returns (row, job claim or None) or None when the run should not happen now."""
+    r = q.rows[mid]; now = _now_i()
+    if not _should_run_now(r):
+        # window/snooze edge (e.g. an overnight window that never opens): look again in a minute
+        q.push(max(_run_due_ts(r, now) or 0, now + 60), mid, "run")
+        return None
+    claim = None
+    if r["state"] == "RUNNING":
+        dates = _effective_dates(r)
+        with connect() as conn:
+            sync_jobs(conn, mid, dates, now)
+            claim = claim_jobs(conn, OWNER, LEASE_SEC, now, mid=mid)
+        if dates and claim is None:
+            # a queue worker holds the lease; its finish bumps updated_at and re-keys us
+            _SCHED_STATS["lease_busy"] += 1
+            q.push(now + 60, mid, "run")
+            return None
+    late = max(0, now - max(due, _SCHED_STATS["started"], int(r["updated_at"] or 0)))
+    _SCHED_STATS["runs"] += 1; _SCHED_STATS["late_sum_s"] += late
+    _SCHED_STATS["late_max_s"] = max(_SCHED_STATS["late_max_s"], late)
+    ivl = interval_sec(r)
+    with connect() as conn:
+        # not updated_at: that is the registry's edit watermark, and a dispatch is not an edit
+        conn.execute("UPDATE monitors SET last_run_ts=?, next_due_ts=? WHERE id=?", (now, now + ivl, mid)); conn.commit()
+    return r, claim
+
+def _execute(dm: DriverManager, r, heartbeat_book: Dict[str,int], claim=None, timeout: int=0):
+    """Executor thread: one monitor run on a borrowed driver. Failures reset only this driver.
+    With a timeout, fetches stop at the deadline (HTTP runs have no browser for the main thread to kill)."""
+    mid = r["id"]; err = None; outcome = None
+    start_phases(); t0 = time.perf_counter()
+    set_deadline(time.time() + timeout if timeout else None)
+    try:
+        with profiler.cycle(mid):
+            if r["state"] == "DISCOVER":
+                _run_discover(dm, r)
+            else:
+                outcome = _run_monitor(dm, r, heartbeat_book, dates=claim and claim[1])
+    except Exception as e:
+        err = str(e) or type(e).__name__; outcome = "error"
+        dm.reset()
+        tg_send(str(r["owner_chat_id"] or ""), titled(r, f"⚠️ Error on [{mid}]: {e}"))
+        print("monitor error:", e)
+    finally:
+        set_deadline(None)
+        ivl = interval_sec(r)
+        if outcome and int(r["adaptive"] or 0):
+            new_ivl, errs = adapt_interval(r, outcome)
+            with connect() as conn: record_interval(conn, mid, new_ivl, errs)
+            if new_ivl != ivl:
+                print(f"[adapt] [{mid}] {outcome}: every {ivl}s -> {new_ivl}s" + (f" (errors x{errs})" if errs else ""), flush=True)
+            ivl = new_ivl
+        phases = take_phases(); phases["total"] = int((time.perf_counter() - t0) * 1000)
+        metrics.inc("bms_checks_total", monitor=mid, outcome=outcome or "discover")
+        if claim:
+            with connect() as conn:
+                finish_jobs(conn, OWNER, mid, claim[2], _now_i() + ivl, err, phases)
 
-def main_loop(debug=False, trace=False, artifacts_dir="./artifacts", sleep_sec=10):
-    dm = DriverManager(debug=debug, trace=trace, artifacts_dir=artifacts_dir)
+# ---------- main loop ----------
+def _log_fetch_stats(last: Dict[str,int]) -> Dict[str,int]:
+    cur = fetch_stats()
+    if cur != last:
+        print("[fetch] " + " ".join(f"{k}={v}" for k,v in sorted(cur.items())), flush=True)
+        print("[net] " + " ".join(f"{k}={v}" for k,v in sorted(net_stats().items())), flush=True)
+        print("[ready] " + " ".join(f"{k}={v}" for k,v in sorted(ready_stats().items())), flush=True)
+        print("[driver] " + " ".join(f"{k}={v}" for k,v in sorted(driver_factory().stats().items())), flush=True)
+        print("[sched] " + " ".join(f"{k}={v}" for k,v in sorted(sched_stats().items())), flush=True)
+        print("[diff] " + " ".join(f"{k}={v}" for k,v in sorted(diff_stats().items())), flush=True)
+        print("[cache] " + " ".join(f"{k}={v}" for k,v in sorted(page_cache_stats().items())), flush=True)
+        print("[artifacts] " + " ".join(f"{k}={v}" for k,v in sorted(artifact_stats().items())), flush=True)
+        print("[rate] " + " ".join(f"{k}={v}" for k,v in sorted(ratelimit.rate_stats().items())), flush=True)
+        print("[db] " + " ".join(f"{k}={v}" for k,v in sorted(db_stats().items())), flush=True)
+    return cur
+
+def main_loop(debug=False, trace=False, artifacts_dir="./artifacts", sleep_sec=10, fetch_mode=None,
+              tabs=DEFAULT_TABS, standby=False, policy: LifecyclePolicy|None=None,
+              workers: int=DEFAULT_WORKERS, run_timeout: int=RUN_TIMEOUT):
+    """Sleep until the earliest due run/heartbeat, a finished run, or another process committing
+    (PRAGMA data_version, checked at most every sleep_sec). Runs are dispatched in due order onto
+    `workers` executor threads, each borrowing its own DriverManager."""
+    pool = DriverPool(workers, debug=debug, trace=trace, artifacts_dir=artifacts_dir, fetch_mode=fetch_mode,
+                      tabs=tabs, standby=standby, policy=policy)
+    ex = ThreadPoolExecutor(max_workers=len(pool.all), thread_name_prefix="bms-run")
+    done: "queue.Queue[str]" = queue.Queue()
+    inflight: Dict[str, list] = {}   # monitor_id -> [DriverManager, started_ts, timed_out, claim, renewed_ts]
     heartbeat_book: Dict[str,int] = {}
+    stats_last: Dict[str,int] = {}; stats_at = 0; maintained_at = 0
+    digest_chats: set = set(); digest_at = 0
+    q = DueQueue()
+    metrics.gauge("bms_sched_queue", lambda: {"queued": len(q), "inflight": len(inflight), "idle_drivers": len(pool.idle)},
+                  "Monitors in the due-time heap, runs in flight, idle drivers", label="state")
+    jobs_db = private_connection()
+    metrics.gauge("bms_jobs", lambda: job_backlog(jobs_db, _now_i()), "Jobs due and unleased vs leased in state.db", label="state")
+    metrics.gauge("bms_rate_queued", lambda: ratelimit.rate_stats().get("queued", 0), "Requests waiting on the rate limiter")
+    _SCHED_STATS["started"] = _now_i()
+    watch = connect()
+    reg = MonitorRegistry()
+    _sync(pool, q, reg.load_active(watch), heartbeat_book)
+
+    def finish(mid: str):
+        dm = inflight.pop(mid)[0]
+        pool.give(dm)
+        with connect() as conn: fresh = reg.refresh(conn, mid)
+        if fresh is None: q.drop(mid)
+        else: _sync(pool, q, [fresh], heartbeat_book)
+
+    def submit(r, claim):
+        dm = pool.take(); mid = r["id"]
+        inflight[mid] = [dm, time.time(), False, claim, time.time()]
+        fut = ex.submit(_execute, dm, r, heartbeat_book, claim, run_timeout)
+        fut.add_done_callback(lambda _f, m=mid: done.put(m))
 
     while True:
         try:
-            with connect() as conn:
-                rows = get_active_monitors(conn)
-            now = _now_i()
-
-            for r in rows:
-                try:
-                    # always consider heartbeat first (even if not due to run)
-                    _send_heartbeat_if_due(r, heartbeat_book)
-
-                    if int(r["reload"] or 0) == 1:
-                        dm.reset()
-                        with connect() as conn:
-                            conn.execute("UPDATE monitors SET reload=0, updated_at=? WHERE id=?", (now, r["id"])); conn.commit()
-
-                    if r["state"] == "STOPPING":
-                        with connect() as conn:
-                            set_state(conn, r["id"], "STOPPED")
-                        tg_send(str(r["owner_chat_id"] or ""), titled(r, f"⏹️ [{r['id']}] Stopped."))
-                        continue
-
-                    if not _should_run_now(r):
-                        continue
-
-                    last = int(r["last_run_ts"] or 0)
-                    ivl = max(60, int(r["interval_min"] or 5)*60)
-                    if r["state"] == "DISCOVER" or now - last >= ivl:
-                        with connect() as conn:
-                            conn.execute("UPDATE monitors SET last_run_ts=?, updated_at=? WHERE id=?", (now, now, r["id"])); conn.commit()
-                        if r["state"] == "DISCOVER":
-                            _run_discover(dm, r)
-                        else:
-                            _run_monitor(dm, r, heartbeat_book)
-                except Exception as e:
-                    tg_send(str(r["owner_chat_id"] or ""), titled(r, f"⚠️ Error on [{r['id']}]: {e}"))
-                    print("monitor error:", e)
+            while True:
+                try: finish(done.get_nowait())
+                except queue.Empty: break
+
+            rows = reg.poll(watch)
+            if rows:
+                _sync(pool, q, rows, heartbeat_book); _SCHED_STATS["syncs"] += 1
+            q.flush(watch)
+
+            for mid, slot in inflight.items():
+                if run_timeout and not slot[2] and time.time() - slot[1] > run_timeout:
+                    # kill the browser under the stuck run; its next driver call fails and the thread returns
+                    print(f"[sched] [{mid}] run exceeded {run_timeout}s; resetting its driver", flush=True)
+                    slot[2] = True; _SCHED_STATS["timeouts"] += 1
+                    slot[0].reset("timeout")
+                if slot[3] and time.time() - slot[4] > LEASE_SEC / 3:
+                    slot[4] = time.time()
+                    with connect() as conn:
+                        if not renew_lease(conn, OWNER, mid, LEASE_SEC):
+                            print(f"[sched] [{mid}] lost its job lease", flush=True)
+
+            # before any heartbeat goes out, so digest chats are known from the first pass
+            if _now_i() - digest_at >= 30:
+                digest_chats = send_due_digests(tg_send, _now_i()); digest_at = _now_i()
+
+            hb = q.pop(_now_i(), "hb")
+            if hb:
+                mid = hb[1]
+                _send_heartbeats(q.rows, mid, heartbeat_book, digest_chats)
+                q.push(heartbeat_book.get(mid, _now_i()) + int(q.rows[mid]["heartbeat_minutes"] or 180)*60, mid, "hb")
+                continue
+            top = q.top("run")
+            blocked = bool(top) and top[0] <= _now_i() and top[1] not in inflight and not pool.idle
+            if top and top[0] <= _now_i() and not blocked:
+                due, mid, _ = q.pop(_now_i(), "run")
+                if mid not in inflight:   # a running monitor is re-keyed when it finishes
+                    started = _begin_run(q, due, mid)
+                    if started is not None: submit(*started)
+                continue
+
+            if _now_i() - maintained_at >= 5:
+                # heartbeats need no driver, so only the next run decides parking and pre-warm
+                nxt = q.top("run")
+                pool.maintain(None if nxt is None else max(0, nxt[0] - _now_i()), nxt and q.rows[nxt[1]])
+                maintained_at = _now_i()
+            if _now_i() - stats_at >= 600:
+                stats_last = _log_fetch_stats(stats_last); stats_at = _now_i()
+                with connect() as conn: prune_runs(conn, _now_i() - RUNS_KEEP_DAYS*86400)
+            # a run waiting for a driver is woken by the finish that frees one, not by its due time
+            nxt = q.peek("hb" if blocked else None)
+            wait = float(sleep_sec) if nxt is None else min(float(sleep_sec), nxt - time.time())
+            try:
+                finish(done.get(timeout=max(0.05, wait)))
+            except queue.Empty:
+                pass
+            _SCHED_STATS["wakeups"] += 1
         except Exception as outer:
             print("scheduler loop error:", outer)
             time.sleep(3)
-        time.sleep(sleep_sec)
+            try:
+                watch.close()
+            except Exception:
+                pass
+            watch = connect()
 
 def parse_args(argv=None):
     import argparse
@@ -311,13 +633,46 @@ def parse_args(argv=None):
     p.add_argument("--debug", action="store_true")
     p.add_argument("--trace", action="store_true")
     p.add_argument("--artifacts-dir", default="./artifacts")
-    p.add_argument("--sleep-sec", type=int, default=10)
+    p.add_argument("--sleep-sec", type=float, default=10,
+                   help="Longest sleep between checks for bot/DB changes; due runs wake the loop on time regardless")
+    p.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                   help="Monitors run concurrently, each on its own driver. Env: BMS_WORKERS")
+    p.add_argument("--run-timeout", type=int, default=RUN_TIMEOUT,
+                   help="Reset a monitor's driver when one run takes longer than this (0=never). Env: BMS_RUN_TIMEOUT")
+    p.add_argument("--fetch-mode", choices=FETCH_MODES, default=None,
+                   help="Default page fetch path (per-monitor fetch_mode overrides). Env: BMS_FETCH_MODE")
+    p.add_argument("--tabs", type=int, default=DEFAULT_TABS,
+                   help="Dates loaded concurrently per monitor (browser tabs / HTTP requests). Env: BMS_TABS")
+    p.add_argument("--standby", action="store_true",
+                   help="Keep one pre-launched Chrome ready for driver restarts. Env: BMS_STANDBY=1")
+    p.add_argument("--recycle-navs", type=int, default=RECYCLE_NAVS,
+                   help="Restart Chrome after this many navigations (0=never). Env: BMS_RECYCLE_NAVS")
+    p.add_argument("--max-rss-mb", type=int, default=MAX_RSS_MB,
+                   help="Restart Chrome when its process tree exceeds this RSS (0=never). Env: BMS_MAX_RSS_MB")
+    p.add_argument("--park-idle-sec", type=int, default=PARK_IDLE_SEC,
+                   help="Shut Chrome down when the next run is further away than this (0=never). Env: BMS_PARK_IDLE_SEC")
+    p.add_argument("--profile", type=int, default=profiler.PROFILE_FIRST, metavar="N",
+                   help="cProfile the first N runs into <artifacts-dir>/profiles (+ report.txt). Env: BMS_PROFILE")
+    p.add_argument("--profile-every", type=int, default=profiler.PROFILE_EVERY, metavar="K",
+                   help="cProfile one run in every K (0=off); a PROFILE file in the profiles dir toggles this live. Env: BMS_PROFILE_EVERY")
+    p.add_argument("--metrics-port", type=int, default=metrics.METRICS_PORT,
+                   help="Serve Prometheus metrics on this port at /metrics (0=off). Env: BMS_METRICS_PORT")
+    p.add_argument("--rate-per-min", type=float, default=ratelimit.RATE_PER_MIN,
+                   help="Global cap on requests to BMS, shared by all processes on state.db (default 0=off). Env: BMS_RATE_PER_MIN")
+    p.add_argument("--rate-burst", type=int, default=ratelimit.RATE_BURST,
+                   help="Requests allowed back-to-back before the cap applies. Env: BMS_RATE_BURST")
     return p.parse_args(argv)
 
 def main(argv=None):
     a = parse_args(argv)
     set_scr_trace(a.trace, a.artifacts_dir)
-    main_loop(debug=a.debug, trace=a.trace, artifacts_dir=a.artifacts_dir, sleep_sec=a.sleep_sec)
+    ratelimit.install(a.rate_per_min, a.rate_burst)
+    metrics.serve(a.metrics_port)
+    profiler.configure(a.artifacts_dir, a.profile, a.profile_every)
+    main_loop(debug=a.debug, trace=a.trace, artifacts_dir=a.artifacts_dir, sleep_sec=a.sleep_sec,
+              fetch_mode=a.fetch_mode, tabs=a.tabs, standby=a.standby, workers=a.workers, run_timeout=a.run_timeout,
+              policy=LifecyclePolicy(recycle_navs=a.recycle_navs, max_rss_mb=a.max_rss_mb,
+                                     park_idle_sec=a.park_idle_sec))
 
 if __name__ == "__main__":
     main()
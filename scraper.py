@@ -1,13 +1,20 @@
 #!/usr/bin/env python3
 from __future__ import annotations
-import os, re, time, random, tempfile, subprocess, json
-from typing import List, Tuple, Optional
+import os, re, time, tempfile, subprocess, json, threading, socket, shutil, gzip, queue, atexit
+from functools import lru_cache
+from contextlib import contextmanager
+from typing import List, Tuple, Optional, Dict
 
+import requests
+from requests.adapters import HTTPAdapter
 from bs4 import BeautifulSoup
+from bs4.element import Tag, NavigableString
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 
+import metrics
+
 # ---------- trace / artifacts ----------
 _TRACE = False
 _ARTIFACTS_DIR: Optional[str] = None
@@ -24,22 +31,200 @@ def _dbg(msg: str):
     if _TRACE:
         print(f"[trace] {msg}", flush=True)
 
-def _save_artifacts(driver, label: str):
+# all: every load (previous behaviour); anomalies: only blocked/blank/failed-parse pages
+ARTIFACT_POLICY = (os.environ.get("BMS_ARTIFACTS") or "all").lower()
+ARTIFACT_KEEP = int(os.environ.get("BMS_ARTIFACTS_KEEP") or 40)
+ARTIFACT_MAX_AGE = int(os.environ.get("BMS_ARTIFACTS_MAX_AGE") or 3*86400)
+_artifact_scope = threading.local()
+
+def set_artifact_scope(scope: Optional[str]):
+    """Tag artifacts saved on this thread (normally the monitor id) so each gets its own ring buffer."""
+    _artifact_scope.name = scope
+
+# ---------- per-run phase timing ----------
+# Each monitor run collects exclusive wall time (ms) per phase: nested phases are subtracted from
+# the enclosing one, so the values add up to the run's total. Helper threads that adopt a run book
+# their own phases, and the caller's enclosing phase is not charged for that time again (_discount);
+# parallel helpers can still push the sum past the total by their overlap. Every phase also feeds the
+# bms_phase_seconds histogram, inside a run or not.
+_phase_local = threading.local()
+_phase_lock = threading.Lock()
+
+def start_phases() -> Dict[str, float]:
+    acc: Dict[str, float] = {}
+    _phase_local.acc = acc; _phase_local.stack = []
+    return acc
+
+def take_phases() -> Dict[str, int]:
+    """Stop collecting on this thread; phase -> ms."""
+    acc = getattr(_phase_local, "acc", None); _phase_local.acc = None
+    with _phase_lock:
+        return {k: int(v) for k, v in (acc or {}).items()}
+
+def _adopt_phases(acc: Optional[Dict[str, float]]):
+    """Let a helper thread (HTTP pool) add to the caller's run."""
+    _phase_local.acc = acc; _phase_local.stack = []
+
+def _booked(acc: Optional[Dict[str, float]]) -> float:
+    if acc is None: return 0.0
+    with _phase_lock:
+        return sum(acc.values())
+
+def _discount(ms: float):
+    """Treat ms of the current phase as nested: helper threads already booked it under their own phases."""
+    stack = getattr(_phase_local, "stack", None)
+    if stack and ms > 0: stack[-1] += ms / 1000
+
+@contextmanager
+def phase(name: str):
+    stack = getattr(_phase_local, "stack", None)
+    if stack is None:
+        stack = _phase_local.stack = []
+    t0 = time.perf_counter(); stack.append(0.0)
+    try:
+        yield
+    finally:
+        dt = time.perf_counter() - t0; inner = stack.pop()
+        if stack: stack[-1] += dt
+        metrics.observe("bms_phase_seconds", dt - inner, phase=name)
+        acc = getattr(_phase_local, "acc", None)
+        if acc is not None:
+            with _phase_lock:
+                acc[name] = acc.get(name, 0.0) + (dt - inner) * 1000
+
+# ---------- run deadline ----------
+_deadline_local = threading.local()
+
+class FetchTimeout(TimeoutError):
+    """The calling run's deadline passed; raised before the next request (or rate-limit wait) rather than mid-request."""
+
+def set_deadline(at: Optional[float]):
+    """time.time() by which this thread's fetches must be done (None = no limit); HTTP fan-out threads inherit it."""
+    _deadline_local.at = at
+
+def _time_left() -> Optional[float]:
+    at = getattr(_deadline_local, "at", None)
+    if at is None:
+        return None
+    left = at - time.time()
+    if left <= 0:
+        raise FetchTimeout("run deadline passed")
+    return left
+
+# ---------- outbound rate limit ----------
+_rate_limiter = None   # callable(key, deadline) blocking until a request may go out; installed by ratelimit.install
+
+def set_rate_limiter(fn):
+    global _rate_limiter
+    _rate_limiter = fn
+
+def _throttle():
+    """Called before every request to BMS (navigation, reload, tab, HTTP fetch); keyed by monitor for fairness."""
+    _time_left()
+    fn = _rate_limiter
+    if fn is not None:
+        with phase("rate"):
+            waited = fn(getattr(_artifact_scope, "name", None) or "-", getattr(_deadline_local, "at", None))
+        if waited >= 0.05: _dbg(f"rate limit: waited {waited*1000:.0f}ms")
+
+class _ArtifactSink:
+    """Background writer: bounded queue, gzip'd HTML, per-scope ring buffer of the newest captures."""
+    def __init__(self, maxsize: int = 32):
+        self.q: "queue.Queue" = queue.Queue(maxsize=maxsize)
+        self.stats = {"queued": 0, "written": 0, "dropped": 0, "bytes": 0, "pruned": 0}
+        self._t: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def submit(self, folder: str, stem: str, html: Optional[str], png: Optional[bytes]) -> bool:
+        with self._lock:
+            if self._t is None or not self._t.is_alive():
+                self._t = threading.Thread(target=self._run, name="bms-artifacts", daemon=True)
+                self._t.start()
+        try:
+            self.q.put_nowait((folder, stem, html, png))
+            ok = True
+        except queue.Full:
+            ok = False
+        with self._lock:
+            self.stats["queued" if ok else "dropped"] += 1
+        return ok
+
+    def _run(self):
+        while True:
+            folder, stem, html, png = self.q.get()
+            try:
+                self._write(folder, stem, html, png)
+            except Exception as e:
+                print(f"[artifacts] write failed: {e}")
+            finally:
+                self.q.task_done()
+
+    def _write(self, folder: str, stem: str, html: Optional[str], png: Optional[bytes]):
+        os.makedirs(folder, exist_ok=True)
+        if html is not None:
+            with gzip.open(os.path.join(folder, stem + ".html.gz"), "wt", encoding="utf-8", compresslevel=5) as f:
+                f.write(html)
+        if png:
+            with open(os.path.join(folder, stem + ".png"), "wb") as f:
+                f.write(png)
+        size = sum(os.path.getsize(os.path.join(folder, stem + ext))
+                   for ext in (".html.gz", ".png") if os.path.exists(os.path.join(folder, stem + ext)))
+        pruned = self._prune(folder)
+        with self._lock:
+            self.stats["written"] += 1; self.stats["bytes"] += size; self.stats["pruned"] += pruned
+
+    def _prune(self, folder: str) -> int:
+        pruned = 0
+        groups: Dict[str, List[str]] = {}
+        for name in os.listdir(folder):
+            groups.setdefault(name.split(".", 1)[0], []).append(name)
+        now = time.time()
+        for i, stem in enumerate(sorted(groups, reverse=True)):
+            try:
+                ts = int(stem.split("_", 1)[0])
+            except ValueError:
+                continue
+            if i >= ARTIFACT_KEEP or now - ts > ARTIFACT_MAX_AGE:
+                for name in groups[stem]:
+                    try:
+                        os.remove(os.path.join(folder, name))
+                    except OSError:
+                        pass
+                pruned += 1
+        return pruned
+
+    def flush(self, timeout: float = 5.0):
+        end = time.time() + timeout
+        while self.q.unfinished_tasks and time.time() < end:
+            time.sleep(0.05)
+
+_SINK = _ArtifactSink()
+atexit.register(_SINK.flush)
+
+def artifact_stats() -> Dict[str, int]:
+    with _SINK._lock:
+        return dict(_SINK.stats)
+
+def _save_artifacts(driver, label: str, snap: Optional["PageSnapshot"] = None, anomaly: bool = False):
+    """Queue the page HTML + screenshot for the background writer; never blocks on disk."""
     if not (_TRACE and _ARTIFACTS_DIR):
         return
-    ts = int(time.time())
-    html = os.path.join(_ARTIFACTS_DIR, f"{ts}_{label}.html")
-    png  = os.path.join(_ARTIFACTS_DIR, f"{ts}_{label}.png")
+    if ARTIFACT_POLICY == "anomalies" and not anomaly:
+        return
+    scope = re.sub(r"[^A-Za-z0-9_.-]+", "_", getattr(_artifact_scope, "name", None) or "_global")
+    stem = f"{int(time.time())}_{label}"
     try:
-        with open(html, "w", encoding="utf-8") as f:
-            f.write(driver.page_source or "")
+        html = snap.html if snap is not None else (driver.page_source or "")
     except Exception:
-        pass
+        html = None
     try:
-        driver.save_screenshot(png)
+        png = driver.get_screenshot_as_png()
     except Exception:
-        pass
-    _dbg(f"saved artifacts: {html}, {png}")
+        png = None
+    if _SINK.submit(os.path.join(_ARTIFACTS_DIR, scope), stem, html, png):
+        _dbg(f"queued artifacts: {scope}/{stem}")
+    else:
+        _dbg(f"artifact queue full; dropped {scope}/{stem}")
 
 # ---------- Chrome discovery ----------
 def get_chrome_binary() -> Optional[str]:
@@ -53,6 +238,15 @@ def get_chrome_binary() -> Optional[str]:
     return None
 
 def _chrome_major_from_binary(path: str) -> Optional[int]:
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        mtime = 0.0
+    return _chrome_major_cached(path, mtime)
+
+@lru_cache(maxsize=8)
+def _chrome_major_cached(path: str, mtime: float) -> Optional[int]:
+    # keyed by mtime so a Chrome upgrade in place is picked up without a restart
     try:
         out = subprocess.check_output([path, "--version"]).decode().strip()
         m = re.search(r"(\d+)\.", out)
@@ -93,50 +287,342 @@ def _ua_override(driver):
     except Exception:
         pass
 
-def _is_cloudflare_block(driver) -> bool:
+# ---------- Resource blocking ----------
+# Venue data only needs the document and its scripts; everything else is bandwidth.
+_MEDIA_PATTERNS = [
+    "*.png*", "*.jpg*", "*.jpeg*", "*.gif*", "*.webp*", "*.avif*", "*.svg*", "*.ico*",
+    "*.woff*", "*.ttf*", "*.otf*", "*.eot*", "*.mp4*", "*.webm*", "*.m3u8*", "*.mp3*",
+]
+_TRACKER_PATTERNS = [
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*", "*googlesyndication.com*",
+    "*adservice.google.*", "*facebook.net*", "*connect.facebook.*", "*hotjar.com*", "*clevertap*",
+    "*branch.io*", "*criteo.*", "*taboola.com*", "*moengage*", "*amplitude.com*", "*mixpanel.com*",
+    "*appsflyer.com*", "*scorecardresearch.com*",
+]
+BLOCK_PROFILES: Dict[str, List[str]] = {
+    "off": [],
+    "lite": _MEDIA_PATTERNS,
+    "strict": _MEDIA_PATTERNS + _TRACKER_PATTERNS + ["*.css*"],
+}
+DEFAULT_BLOCK_PROFILE = (os.environ.get("BMS_BLOCK_PROFILE") or "lite").lower()
+# rough encoded sizes used to estimate what a blocked request would have cost
+_AVG_BYTES = {"Image": 45_000, "Font": 35_000, "Media": 400_000, "Stylesheet": 25_000,
+              "Script": 60_000, "XHR": 8_000, "Fetch": 8_000, "Ping": 500, "Other": 5_000}
+_NET_STATS: Dict[str, int] = {"navigations": 0, "requests": 0, "blocked": 0, "bytes_loaded": 0,
+                              "bytes_saved_est": 0}
+
+def _block_patterns(profile: Optional[str] = None) -> List[str]:
+    pats = list(BLOCK_PROFILES.get((profile or DEFAULT_BLOCK_PROFILE).lower(), _MEDIA_PATTERNS))
+    extra = os.environ.get("BMS_BLOCK_EXTRA", "")
+    pats += [x.strip() for x in extra.split(",") if x.strip()]
+    return pats
+
+def _net_logging_enabled() -> bool:
+    return DEFAULT_BLOCK_PROFILE != "off" or os.environ.get("BMS_NET_STATS") == "1"
+
+def _apply_block_profile(driver, profile: Optional[str] = None):
+    """Network.setBlockedURLs for the current target (each tab needs its own call)."""
     try:
-        t = (driver.title or "").lower()
-        b = (driver.page_source or "").lower()
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": _block_patterns(profile)})
+    except Exception as e:
+        _dbg(f"setBlockedURLs failed ({e})")
+
+def _net_report(driver, label: str, navs: int = 1):
+    """Fold the performance log since the last call into _NET_STATS; one line per navigation under --trace."""
+    if not _net_logging_enabled():
+        return
+    try:
+        entries = driver.get_log("performance")
     except Exception:
-        return False
-    return ("attention required | cloudflare" in t) or ("sorry, you have been blocked" in b)
+        return
+    req = blocked = loaded = saved = 0
+    for e in entries:
+        try:
+            m = json.loads(e["message"])["message"]
+        except Exception:
+            continue
+        meth = m.get("method"); p = m.get("params") or {}
+        if meth == "Network.requestWillBeSent":
+            req += 1
+        elif meth == "Network.loadingFinished":
+            loaded += int(p.get("encodedDataLength") or 0)
+        elif meth == "Network.loadingFailed" and p.get("blockedReason"):
+            blocked += 1; saved += _AVG_BYTES.get(p.get("type") or "Other", _AVG_BYTES["Other"])
+    with _stats_lock:
+        _NET_STATS["navigations"] += navs; _NET_STATS["requests"] += req; _NET_STATS["blocked"] += blocked
+        _NET_STATS["bytes_loaded"] += loaded; _NET_STATS["bytes_saved_est"] += saved
+    _dbg(f"net[{label}]: {req} req, {loaded/1024:.0f}KB loaded, {blocked} blocked (~{saved/1024:.0f}KB saved)")
 
-def _recover_blank_or_oops(driver, url: str):
+def net_stats() -> Dict[str, int]:
+    with _stats_lock:
+        return dict(_NET_STATS)
+
+def _prepare_target(driver):
+    """Per-target CDP setup: stealth, UA/headers and the blocking profile."""
+    _inject_stealth(driver); _ua_override(driver); _apply_block_profile(driver)
+
+# ---------- Page snapshot ----------
+_SNAP_JS = "return [document.title || '', (document.body && document.body.innerText) ? document.body.innerText.length : 0];"
+
+class PageSnapshot:
+    """
+    One capture of the current page: a single page_source pull plus title and visible text length.
+    Block/blank detection, artifacts and the parsers all read from it; it is re-taken only after
+    the page changes (navigation, reload, scroll).
+    """
+    __slots__ = ("html", "title", "body_len", "_lower")
+
+    def __init__(self, html: str, title: str = "", body_len: int = 0):
+        self.html = html or ""; self.title = title or ""; self.body_len = int(body_len or 0)
+        self._lower: Optional[str] = None
+
+    @classmethod
+    def capture(cls, driver) -> "PageSnapshot":
+        try:
+            title, body_len = driver.execute_script(_SNAP_JS)
+        except Exception:
+            title, body_len = "", 0
+        try:
+            html = driver.page_source or ""
+        except Exception:
+            html = ""
+        return cls(html, title, body_len)
+
+    @property
+    def lower(self) -> str:
+        if self._lower is None:
+            self._lower = self.html.lower()
+        return self._lower
+
+    def blocked(self) -> bool:
+        return ("attention required | cloudflare" in self.title.lower()) or ("sorry, you have been blocked" in self.lower)
+
+    def blank(self) -> bool:
+        return (self.body_len < 200 and len(self.html) < 5000) or ("oops! something went wrong" in self.lower)
+
+def snapshot(driver, refresh: bool = False) -> PageSnapshot:
+    """The driver's current snapshot, captured on first use after the page last changed."""
+    snap = None if refresh else getattr(driver, "_bms_snap", None)
+    if snap is None:
+        snap = PageSnapshot.capture(driver)
+        try:
+            driver._bms_snap = snap
+        except Exception:
+            pass
+    return snap
+
+def _invalidate(driver):
     try:
-        body_len = driver.execute_script(
-            "return (document.body && document.body.innerText) ? document.body.innerText.length : 0;")
+        driver._bms_snap = None
     except Exception:
-        body_len = 0
-    src_len = len(driver.page_source or "")
-    page = (driver.page_source or "").lower()
-    if (body_len < 200 and src_len < 5000) or ("oops! something went wrong" in page):
+        pass
+
+def _is_cloudflare_block(driver) -> bool:
+    return snapshot(driver).blocked()
+
+def _recover_blank_or_oops(driver, url: str):
+    if snapshot(driver).blank():
         _dbg("blank/oops detected; reloading")
         try:
-            driver.execute_script("location.reload(true)"); time.sleep(2.5)
+            _throttle(); driver.execute_script("location.reload(true)"); time.sleep(0.5); wait_ready(driver)
         except Exception:
             try:
-                driver.get(url); time.sleep(2)
+                _throttle(); driver.get(url); wait_ready(driver)
             except Exception:
                 pass
-        _save_artifacts(driver, "after_reload")
+        _invalidate(driver)
+        _save_artifacts(driver, "after_reload", snapshot(driver), anomaly=True)
+
+# ---------- Profiles ----------
+PROFILE_ROOT = os.environ.get("BMS_PROFILE_ROOT") or os.path.join(tempfile.gettempdir(), "bms-profiles")
+PROFILE_KEEP = int(os.environ.get("BMS_PROFILE_KEEP") or 4)
+PROFILE_MAX_AGE = int(os.environ.get("BMS_PROFILE_MAX_AGE") or 86400)
+_profiles_in_use: set = set()
+_profile_lock = threading.Lock()
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sk:
+        sk.bind(("127.0.0.1", 0))
+        return sk.getsockname()[1]
+
+def _profile_locked(path: str) -> bool:
+    """True while a live Chrome holds the profile (SingletonLock -> host-pid)."""
+    lock = os.path.join(path, "SingletonLock")
+    if not os.path.lexists(lock):
+        return False
+    try:
+        pid = int(os.readlink(lock).rsplit("-", 1)[-1])
+        os.kill(pid, 0)
+        return True
+    except (OSError, ValueError):
+        return False
+
+def _acquire_profile() -> str:
+    """Reuse an idle profile dir under PROFILE_ROOT (warm disk cache), else create one."""
+    with _profile_lock:
+        os.makedirs(PROFILE_ROOT, exist_ok=True)
+        for name in sorted(os.listdir(PROFILE_ROOT)):
+            p = os.path.join(PROFILE_ROOT, name)
+            if p in _profiles_in_use or not os.path.isdir(p) or _profile_locked(p):
+                continue
+            _profiles_in_use.add(p); os.utime(p, None)
+            return p
+        p = tempfile.mkdtemp(prefix="bms-chrome-", dir=PROFILE_ROOT)
+        _profiles_in_use.add(p)
+        return p
+
+def _release_profile(path: Optional[str]):
+    if not path:
+        return
+    with _profile_lock:
+        _profiles_in_use.discard(path)
+    _gc_profiles()
+
+def _gc_profiles():
+    """Keep at most PROFILE_KEEP idle profiles, none older than PROFILE_MAX_AGE."""
+    with _profile_lock:
+        try:
+            names = os.listdir(PROFILE_ROOT)
+        except OSError:
+            return
+        idle = []
+        for name in names:
+            p = os.path.join(PROFILE_ROOT, name)
+            if p in _profiles_in_use or not os.path.isdir(p) or _profile_locked(p):
+                continue
+            try:
+                idle.append((os.stat(p).st_mtime, p))
+            except OSError:
+                pass
+        idle.sort(reverse=True)
+        now = time.time()
+        for i, (mtime, p) in enumerate(idle):
+            if i >= PROFILE_KEEP or now - mtime > PROFILE_MAX_AGE:
+                shutil.rmtree(p, ignore_errors=True)
+                _dbg(f"removed profile {p}")
+
+def quit_driver(driver):
+    """Quit a driver and hand its profile dir back to the pool."""
+    if not driver:
+        return
+    prof = getattr(driver, "_bms_profile", None)
+    try:
+        driver.quit()
+    except Exception:
+        pass
+    _release_profile(prof)
+
+# ---------- Driver lifecycle ----------
+RECYCLE_NAVS = int(os.environ.get("BMS_RECYCLE_NAVS") or 300)
+MAX_RSS_MB = int(os.environ.get("BMS_MAX_RSS_MB") or 1200)
+PARK_IDLE_SEC = int(os.environ.get("BMS_PARK_IDLE_SEC") or 600)
+PREWARM_SEC = int(os.environ.get("BMS_PREWARM_SEC") or 30)
+
+def _count_navs(driver, n: int = 1):
+    try:
+        driver._bms_navs = getattr(driver, "_bms_navs", 0) + n
+    except Exception:
+        pass
+
+def driver_navs(driver) -> int:
+    return int(getattr(driver, "_bms_navs", 0) or 0)
+
+def _driver_root_pid(driver) -> Optional[int]:
+    for get in (lambda: driver.service.process.pid, lambda: driver.browser_pid):
+        try:
+            pid = int(get())
+            if pid > 0:
+                return pid
+        except Exception:
+            pass
+    return None
+
+def driver_rss_mb(driver) -> Optional[float]:
+    """RSS of chromedriver + every Chrome process under it, from /proc (None where unavailable)."""
+    root = _driver_root_pid(driver)
+    if not root or not os.path.isdir("/proc"):
+        return None
+    children: Dict[int, List[int]] = {}
+    for name in os.listdir("/proc"):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{name}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except Exception:
+            continue
+        children.setdefault(ppid, []).append(int(name))
+    total_kb = 0; stack = [root]
+    while stack:
+        pid = stack.pop()
+        stack.extend(children.get(pid, []))
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total_kb += int(line.split()[1]); break
+        except Exception:
+            pass
+    return total_kb / 1024.0
+
+class LifecyclePolicy:
+    """When a long-lived driver should be recycled (navigations, RSS) or parked (idle gap)."""
+    def __init__(self, recycle_navs: int = RECYCLE_NAVS, max_rss_mb: int = MAX_RSS_MB,
+                 park_idle_sec: int = PARK_IDLE_SEC, prewarm_sec: int = PREWARM_SEC, rss_every_sec: int = 60):
+        self.recycle_navs = recycle_navs
+        self.max_rss_mb = max_rss_mb
+        self.park_idle_sec = park_idle_sec
+        self.prewarm_sec = prewarm_sec
+        self.rss_every_sec = rss_every_sec
+        self._rss_checked = 0.0
+
+    def recycle_reason(self, driver) -> Optional[str]:
+        if self.recycle_navs > 0 and driver_navs(driver) >= self.recycle_navs:
+            return f"{driver_navs(driver)} navigations"
+        if self.max_rss_mb > 0 and time.time() - self._rss_checked >= self.rss_every_sec:
+            self._rss_checked = time.time()
+            rss = driver_rss_mb(driver)
+            if rss is not None and rss >= self.max_rss_mb:
+                return f"rss {rss:.0f}MB"
+        return None
+
+    def should_park(self, next_due_in: Optional[float]) -> bool:
+        return self.park_idle_sec > 0 and (next_due_in is None or next_due_in > self.park_idle_sec)
+
+    def should_prewarm(self, next_due_in: Optional[float]) -> bool:
+        return next_due_in is not None and next_due_in <= self.prewarm_sec
 
 # ---------- Driver factory ----------
+_uc_lock = threading.Lock()
+
 def get_driver(debug: bool = False):
     """Try Selenium first (unless BMS_FORCE_UC=1), then undetected-chromedriver (pinned if version known)."""
+    fixed_udd = os.environ.get("BMS_USER_DATA_DIR")
+    udd = fixed_udd or _acquire_profile()
+
     def build_args():
         args = []
         if not debug: args.append("--headless=new")
         args += [
             "--no-sandbox","--disable-dev-shm-usage","--disable-gpu",
             "--window-size=1366,768","--disable-blink-features=AutomationControlled",
-            f"--remote-debugging-port={random.randint(9223,9555)}",
+            f"--remote-debugging-port={_free_port()}",
             "--no-first-run","--no-default-browser-check",
+            "--disk-cache-size=67108864",
         ]
-        udd = os.environ.get("BMS_USER_DATA_DIR") or tempfile.mkdtemp(prefix="bms-chrome-")
         prof = os.environ.get("BMS_PROFILE_DIR","Default")
         args.append(f"--user-data-dir={udd}"); args.append(f"--profile-directory={prof}")
         return args
 
+    def owned(d):
+        if not fixed_udd:
+            try:
+                d._bms_profile = udd
+            except Exception:
+                pass
+        return d
+
     chrome_binary = get_chrome_binary()
     _dbg(f"chrome_binary={chrome_binary}")
     force_uc = os.environ.get("BMS_FORCE_UC","1") == "1"
@@ -148,14 +634,15 @@ def get_driver(debug: bool = False):
             if chrome_binary: opts.binary_location = chrome_binary
             for a in build_args(): opts.add_argument(a)
             opts.page_load_strategy = "eager"
+            if _net_logging_enabled(): opts.set_capability("goog:loggingPrefs", {"performance": "ALL"})
             opts.add_experimental_option("prefs", {
                 "intl.accept_languages": "en-US,en",
                 "profile.default_content_setting_values.geolocation": 1,
             })
             d = webdriver.Chrome(options=opts); d.set_page_load_timeout(60)
-            _inject_stealth(d); _ua_override(d)
+            _prepare_target(d)
             _dbg("selenium driver OK")
-            return d
+            return owned(d)
         except Exception as e:
             print(f"[driver] Selenium failed: {e}")
 
@@ -164,28 +651,213 @@ def get_driver(debug: bool = False):
         uc_opts = uc.ChromeOptions()
         if chrome_binary: uc_opts.binary_location = chrome_binary
         for a in build_args(): uc_opts.add_argument(a)
+        if _net_logging_enabled(): uc_opts.set_capability("goog:loggingPrefs", {"performance": "ALL"})
         major = _chrome_major_from_binary(chrome_binary) if chrome_binary else None
         env_major = os.environ.get("BMS_CHROME_VERSION_MAIN")
         if not major and env_major and env_major.isdigit(): major = int(env_major)
         _dbg(f"UC version_main={major}")
-        d = uc.Chrome(options=uc_opts, headless=(not debug), version_main=major) if major else uc.Chrome(options=uc_opts, headless=(not debug))
-        d.set_page_load_timeout(60); _inject_stealth(d); _ua_override(d)
+        with _uc_lock:   # uc patches one shared chromedriver binary; concurrent launches race on it
+            d = uc.Chrome(options=uc_opts, headless=(not debug), version_main=major) if major else uc.Chrome(options=uc_opts, headless=(not debug))
+        d.set_page_load_timeout(60); _prepare_target(d)
         _dbg("UC driver OK")
-        return d
+        return owned(d)
     except Exception as e:
         print(f"[driver] UC failed: {e}")
+        if not fixed_udd: _release_profile(udd)
         return None
 
+class DriverFactory:
+    """
+    Hands out Chrome drivers. With standby enabled, one browser is pre-launched in the
+    background so a replacement (restart, recovery, recycle) is ready immediately.
+    """
+    def __init__(self, debug: bool = False, standby: bool = False):
+        self.debug = debug
+        self.standby = standby
+        self._spare = None
+        self._filler: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stats: Dict[str, float] = {"cold_starts": 0, "warm_starts": 0, "cold_ms_last": 0,
+                                         "cold_ms_avg": 0, "warm_ms_last": 0}
+
+    def _fill(self):
+        d = get_driver(debug=self.debug)
+        with self._lock:
+            if d is not None and self._spare is None:
+                self._spare, d = d, None
+        quit_driver(d)
+
+    def prewarm(self):
+        """Start the standby browser in the background if one is not ready or launching."""
+        if not self.standby:
+            return
+        with self._lock:
+            if self._spare is not None or (self._filler and self._filler.is_alive()):
+                return
+            self._filler = threading.Thread(target=self._fill, name="bms-standby", daemon=True)
+            self._filler.start()
+
+    def acquire(self):
+        with phase("driver"):
+            return self._acquire()
+
+    def _acquire(self):
+        t0 = time.time()
+        filler = self._filler
+        if filler and filler.is_alive():
+            filler.join(timeout=90)
+        with self._lock:
+            d, self._spare = self._spare, None
+        if d is not None:
+            try:
+                d.current_window_handle
+            except Exception:
+                quit_driver(d); d = None
+        warm = d is not None
+        if d is None:
+            d = get_driver(debug=self.debug)
+        ms = int((time.time() - t0) * 1000)
+        if d is not None: metrics.inc("bms_driver_starts_total", kind="warm" if warm else "cold")
+        with self._lock:
+            if warm:
+                self._stats["warm_starts"] += 1; self._stats["warm_ms_last"] = ms
+            elif d is not None:
+                n = self._stats["cold_starts"] = self._stats["cold_starts"] + 1
+                self._stats["cold_ms_last"] = ms
+                self._stats["cold_ms_avg"] = int(self._stats["cold_ms_avg"] + (ms - self._stats["cold_ms_avg"]) / n)
+        _dbg(f"driver {'warm' if warm else 'cold'} start in {ms}ms")
+        self.prewarm()
+        return d
+
+    def close(self):
+        with self._lock:
+            d, self._spare = self._spare, None
+        quit_driver(d)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self._stats)
+
+_factories: Dict[bool, DriverFactory] = {}
+
+def driver_factory(debug: bool = False) -> DriverFactory:
+    f = _factories.get(bool(debug))
+    if f is None:
+        f = _factories[bool(debug)] = DriverFactory(debug=debug, standby=os.environ.get("BMS_STANDBY") == "1")
+    return f
+
+def acquire_driver(debug: bool = False):
+    """get_driver through the shared factory (standby browser, start-time stats)."""
+    return driver_factory(debug).acquire()
+
+# ---------- Readiness ----------
+READY_TIMEOUT = float(os.environ.get("BMS_READY_TIMEOUT") or 10)
+_READY_POLL = 0.1
+_EMPTY_POLLS = 5   # polls of a loaded page with no rows and an unchanged DOM before it counts as empty
+
+# payload: venue-card JSON is in the DOM; rows: virtualized list is rendered; blocked/oops: terminal pages;
+# otherwise readyState plus the row and element counts, from which the watch infers an empty date
+_READY_JS = r"""
+var t = (document.title || '').toLowerCase();
+if (t.indexOf('attention required') >= 0) return {state: 'blocked'};
+var st = document.readyState, ss = document.scripts;
+for (var i = 0; i < ss.length; i++) {
+  if ((ss[i].text || '').indexOf('"type":"venue-card"') >= 0 && (st !== 'loading' || ss[i].nextSibling))
+    return {state: 'payload'};
+}
+var b = document.body ? (document.body.innerText || '') : '';
+if (b.length < 4000) {
+  var lb = b.toLowerCase();
+  if (lb.indexOf('sorry, you have been blocked') >= 0) return {state: 'blocked'};
+  if (lb.indexOf('oops! something went wrong') >= 0) return {state: 'oops'};
+}
+var g = document.querySelector('.ReactVirtualized__Grid__innerScrollContainer');
+return {state: st, rows: g ? g.children.length : 0, nodes: document.getElementsByTagName('*').length};
+"""
+
+_READY_STATS: Dict[str, int] = {}
+_READY_TIMES: List[float] = []
+
+def _record_ready(outcome: str, secs: float):
+    with _stats_lock:
+        _READY_STATS[outcome] = _READY_STATS.get(outcome, 0) + 1
+        _READY_TIMES.append(secs)
+        if len(_READY_TIMES) > 500: del _READY_TIMES[:250]
+    _dbg(f"ready: {outcome} in {int(secs*1000)}ms")
+
+def ready_stats() -> Dict[str, float]:
+    """Outcome counts plus p50/max time-to-ready (ms) over recent navigations."""
+    with _stats_lock:
+        out: Dict[str, float] = dict(_READY_STATS)
+        ts = sorted(_READY_TIMES)
+    if ts:
+        out["p50_ms"] = int(ts[len(ts)//2]*1000); out["max_ms"] = int(ts[-1]*1000)
+    return out
+
+class _ReadyWatch:
+    """Polls one tab until the venue payload or a stable row list shows up, or the page has finished
+    loading with no rows and stopped changing ("empty": a date with no shows has nothing to wait for)."""
+    __slots__ = ("t0", "rows", "stable", "nodes", "idle")
+
+    def __init__(self):
+        self.t0 = time.time(); self.rows = -1; self.stable = 0; self.nodes = -1; self.idle = 0
+
+    def check(self, driver) -> Optional[str]:
+        try:
+            r = driver.execute_script(_READY_JS) or {}
+        except Exception:
+            r = {}
+        st = r.get("state")
+        if st in ("payload", "blocked", "oops"):
+            return st
+        rows = int(r.get("rows") or 0)
+        if rows > 0:
+            self.stable = self.stable + 1 if rows == self.rows else 0
+            if self.stable >= 2:
+                return "rows"
+        elif st == "complete":
+            nodes = int(r.get("nodes") or 0)
+            self.idle = self.idle + 1 if nodes == self.nodes else 0
+            self.nodes = nodes
+            if self.idle >= _EMPTY_POLLS:
+                return "empty"
+        self.rows = rows
+        return None
+
+    def elapsed(self) -> float:
+        return time.time() - self.t0
+
+def wait_ready(driver, timeout: float = READY_TIMEOUT) -> str:
+    """Block until the page is usable or timeout; returns the outcome ('timeout' on deadline)."""
+    with phase("ready"):
+        w = _ReadyWatch()
+        while True:
+            out = w.check(driver)
+            if out is None and w.elapsed() >= timeout:
+                out = "timeout"
+            if out:
+                _record_ready(out, w.elapsed())
+                return out
+            time.sleep(_READY_POLL)
+
 # ---------- Navigation ----------
 def open_and_prepare(driver, url: str):
+    with phase("nav"):
+        _open_and_prepare(driver, url)
+
+def _open_and_prepare(driver, url: str):
     _dbg(f"open {url}")
-    driver.get("about:blank"); driver.get(url); time.sleep(2)
-    _save_artifacts(driver, "loaded")
+    _invalidate(driver)
+    driver.get("about:blank"); _throttle(); driver.get(url); _count_navs(driver); wait_ready(driver)
+    snap = snapshot(driver)
+    _save_artifacts(driver, "loaded", snap, anomaly=snap.blank() or snap.blocked())
     _recover_blank_or_oops(driver, url)
     if _is_cloudflare_block(driver):
         _dbg("cloudflare block detected: retry")
-        time.sleep(2); driver.get(url); time.sleep(2)
-        _save_artifacts(driver, "after_cf_retry")
+        time.sleep(2); _throttle(); driver.get(url); wait_ready(driver)
+        _invalidate(driver)
+        _save_artifacts(driver, "after_cf_retry", snapshot(driver), anomaly=True)
+    _net_report(driver, "open")
 
 def open_and_prepare_resilient(driver, url: str, debug: bool = False):
     """Open URL; if the session died, rebuild the driver and retry. Returns a (possibly new) driver."""
@@ -194,11 +866,8 @@ def open_and_prepare_resilient(driver, url: str, debug: bool = False):
         return driver
     except Exception as e:
         _dbg(f"driver.get failed ({e}); recreating driver")
-        try:
-            driver.quit()
-        except Exception:
-            pass
-        d2 = get_driver(debug=debug)
+        quit_driver(driver)
+        d2 = acquire_driver(debug=debug)
         if not d2:
             raise
         open_and_prepare(d2, url)
@@ -207,80 +876,197 @@ def open_and_prepare_resilient(driver, url: str, debug: bool = False):
 # ---------- Parsing ----------
 _TIME_RE = re.compile(r"\b\d{1,2}:\d{2}\s?(AM|PM)\b", re.I)
 
+_VENUE_ANCHOR = '"type":"venue-card"'
+_JSON = json.JSONDecoder()
+_JSON_OPEN_RE = re.compile(r"[\[{]")
+
+def _venue_from_card(obj: dict) -> Optional[Tuple[str, List[str]]]:
+    name = (obj.get("additionalData") or {}).get("venueName")
+    if not name:
+        return None
+    shows: List[str] = []
+    for st in obj.get("showtimes", []) or []:
+        t = ((st or {}).get("title") or "").strip() if isinstance(st, dict) else ""
+        if t and _TIME_RE.search(t):
+            shows.append(t)
+    return name, shows
+
+def _iter_venue_cards(value):
+    """Document-order walk over decoded JSON yielding venue-card dicts (not descending into them)."""
+    stack = [value]
+    while stack:
+        v = stack.pop()
+        if isinstance(v, dict):
+            if v.get("type") == "venue-card":
+                yield v; continue
+            stack.extend(reversed(list(v.values())))
+        elif isinstance(v, list):
+            stack.extend(reversed(v))
+
+def _payload_spans(html: str, anchors: List[int]) -> List[Tuple[int, int, List[int]]]:
+    """Group anchor offsets by the <script> body that carries them: (start, end, anchors)."""
+    spans: List[Tuple[int, int, List[int]]] = []
+    for i in anchors:
+        if spans and spans[-1][0] <= i < spans[-1][1]:
+            spans[-1][2].append(i); continue
+        s = html.rfind("<script", spans[-1][1] if spans else 0, i)
+        s = (html.find(">", s, i) + 1) if s != -1 else (spans[-1][1] if spans else 0)
+        e = html.find("</script", i)
+        spans.append((s, e if e != -1 else len(html), [i]))
+    return spans
+
+def _decode_values(html: str, start: int, end: int):
+    """Yield (obj, start, stop) for each top-level JSON value in html[start:end], one pass."""
+    pos = start
+    while True:
+        m = _JSON_OPEN_RE.search(html, pos, end)
+        if not m:
+            return
+        try:
+            obj, stop = _JSON.raw_decode(html, m.start())
+        except ValueError:
+            pos = m.start() + 1; continue
+        yield obj, m.start(), stop
+        pos = stop
+
+def _card_around(html: str, i: int, floor: int, tries: int = 16) -> Optional[Tuple[dict, int]]:
+    """Fallback for an anchor outside any decodable payload: try enclosing '{' candidates."""
+    pos = i
+    for _ in range(tries):
+        pos = html.rfind("{", floor, pos)
+        if pos == -1:
+            return None
+        try:
+            obj, stop = _JSON.raw_decode(html, pos)
+        except ValueError:
+            continue
+        if stop > i and isinstance(obj, dict) and obj.get("type") == "venue-card":
+            return obj, stop
+    return None
+
 def _parse_venues_from_json(html: str) -> List[Tuple[str, List[str]]]:
-    """Extract venues from embedded JSON fragments with type:'venue-card'."""
+    """Extract venues from the embedded JSON payload carrying type:'venue-card' objects."""
+    anchors: List[int] = []
+    i = html.find(_VENUE_ANCHOR)
+    while i != -1:
+        anchors.append(i); i = html.find(_VENUE_ANCHOR, i + len(_VENUE_ANCHOR))
     theatres: List[Tuple[str, List[str]]] = []
-    anchor = '"type":"venue-card"'
-    i = 0
-    n = len(html)
+
+    def emit(card: dict):
+        v = _venue_from_card(card)
+        if v: theatres.append(v)
+
+    for start, end, span in _payload_spans(html, anchors):
+        k = 0; floor = start; n = len(span)
+
+        def salvage(limit: int):
+            # anchors not covered by a decodable payload value
+            nonlocal k, floor
+            while k < n and span[k] < limit:
+                hit = _card_around(html, span[k], floor)
+                k += 1
+                if hit:
+                    emit(hit[0]); floor = hit[1]
+                    while k < n and span[k] < floor: k += 1
+
+        for obj, vs, ve in _decode_values(html, start, end):
+            if k >= n: break
+            if ve <= span[k]: continue
+            salvage(vs)
+            if k < n and span[k] < ve:
+                for card in _iter_venue_cards(obj): emit(card)
+                while k < n and span[k] < ve: k += 1
+            floor = max(floor, ve)
+        salvage(end + 1)
+    return theatres
+
+def _bs_features() -> str:
+    """Prefer lxml's tree builder when installed; html.parser otherwise."""
+    env = os.environ.get("BMS_BS_FEATURES")
+    if env:
+        return env
+    try:
+        import lxml  # noqa: F401
+        return "lxml"
+    except ImportError:
+        return "html.parser"
+
+_BS_FEATURES = _bs_features()
+_NAME_TAGS = ("h3", "h4", "a", "span")
+_SKIP_TAGS = ("script", "style", "noscript", "template")
+_NAME_MAX = 160
+
+def _valid_name(t: str) -> bool:
+    return 5 < len(t) <= _NAME_MAX and not _TIME_RE.search(t)
+
+def _short_text(node) -> str:
+    """get_text(strip=True) that gives up once the text is too long to be a venue name."""
+    parts: List[str] = []; n = 0
+    for s in node.strings:
+        s = s.strip()
+        if s:
+            parts.append(s); n += len(s)
+            if n > _NAME_MAX:
+                break
+    return "".join(parts)
+
+def _pick_name(names: Dict[str, str]) -> Optional[str]:
+    for tag in _NAME_TAGS:
+        if tag in names:
+            return names[tag]
+    return None
+
+def _scan_rows(root, rows_out: Optional[List[Tuple[str, List[str]]]] = None):
+    """
+    One post-order pass over root. Each node carries the showtimes found in its text and the
+    first valid name per candidate tag among its descendants. With rows_out, the innermost
+    container holding both is emitted and its ancestors are never emitted.
+    Returns (times, names) for root.
+    """
+    frames = [[root, iter(root.children), [], {}, False]]
     while True:
-        i = html.find(anchor, i)
-        if i == -1:
-            break
-        # walk backwards to the beginning of this JSON object
-        start = html.rfind("{", 0, i)
-        if start == -1:
-            i += len(anchor); continue
-        # scan forward to find the matching closing brace, honoring strings/escapes
-        depth = 0
-        j = start
-        in_str = False
-        esc = False
-        while j < n:
-            ch = html[j]
-            if in_str:
-                if esc:
-                    esc = False
-                elif ch == "\\":          # <— THIS is the previously broken line
-                    esc = True
-                elif ch == '"':
-                    in_str = False
-            else:
-                if ch == '"':
-                    in_str = True
-                elif ch == "{":
-                    depth += 1
-                elif ch == "}":
-                    depth -= 1
-                    if depth == 0:
-                        break
-            j += 1
-        if depth != 0:
-            i += len(anchor); continue
-        frag = html[start:j+1]
-        try:
-            obj = json.loads(frag)
-            name = obj.get("additionalData", {}).get("venueName")
-            shows: List[str] = []
-            for st in obj.get("showtimes", []) or []:
-                t = (st.get("title") or "").strip()
-                if t and _TIME_RE.search(t):
-                    shows.append(t)
+        f = frames[-1]
+        child = next(f[1], None)
+        if child is not None:
+            if isinstance(child, Tag):
+                if child.name not in _SKIP_TAGS:
+                    frames.append([child, iter(child.children), [], {}, False])
+            elif type(child) is NavigableString:
+                f[2].extend(m.group(0) for m in _TIME_RE.finditer(child))
+            continue
+        node, _, times, names, done = frames.pop()
+        if rows_out is not None and not done and times:
+            name = _pick_name(names)
             if name:
-                theatres.append((name, shows))
-        except Exception:
-            pass
-        i = j + 1
-    return theatres
+                rows_out.append((name, times)); done = True
+        if not frames:
+            return times, names
+        parent = frames[-1]
+        if done:
+            parent[4] = True
+            continue
+        parent[2].extend(times)
+        pnames = parent[3]
+        if node.name in _NAME_TAGS and node.name not in pnames:
+            t = _short_text(node)
+            if _valid_name(t):
+                pnames[node.name] = t
+        for tag, v in names.items():
+            pnames.setdefault(tag, v)
 
 def _parse_venues_from_dom(html: str) -> List[Tuple[str, List[str]]]:
-    """Fallback: scan visible rows and pull theatre name + showtime tokens."""
+    """Fallback: scan visible rows and pull theatre name + showtime tokens in a single tree pass."""
     theatres: List[Tuple[str, List[str]]] = []
-    soup = BeautifulSoup(html, "html.parser")
-    rows = soup.select('.ReactVirtualized__Grid__innerScrollContainer > div') or soup.find_all("div")
-    for row in rows:
-        text = row.get_text(" ", strip=True)
-        times_full = [m.group(0) for m in _TIME_RE.finditer(text)]
-        if not times_full:
-            continue
-        name_el = None
-        for sel in ["h3", "h4", "a", "span"]:
-            cand = row.select_one(sel)
-            if cand and len(cand.get_text(strip=True)) >= 6:
-                name_el = cand; break
-        name = name_el.get_text(strip=True) if name_el else None
-        if name and "AM" not in name and "PM" not in name and len(name) > 5:
-            theatres.append((name, times_full))
+    soup = BeautifulSoup(html, _BS_FEATURES)
+    grid = soup.select_one(".ReactVirtualized__Grid__innerScrollContainer")
+    if grid is not None:
+        for row in grid.find_all("div", recursive=False):
+            times, names = _scan_rows(row)
+            name = _pick_name(names)
+            if name and times:
+                theatres.append((name, times))
+    else:
+        _scan_rows(soup, theatres)
     # dedupe by name
     out: dict[str, List[str]] = {}
     for n_, ts in theatres:
@@ -291,14 +1077,265 @@ def _parse_venues_from_dom(html: str) -> List[Tuple[str, List[str]]]:
     return [(n_, out[n_]) for n_ in out]
 
 def parse_theatres(driver) -> List[Tuple[str, List[str]]]:
-    html = driver.page_source or ""
-    theatres = _parse_venues_from_json(html)
-    if not theatres or any(len(ts) == 0 for _, ts in theatres):
-        dom = _parse_venues_from_dom(html)
-        if theatres:
-            dom_map = {n: ts for n, ts in dom}
-            theatres = [(n, dom_map.get(n, ts) or ts) for n, ts in theatres]
-        else:
-            theatres = dom
+    return parse_html(snapshot(driver).html)
+
+def parse_html(html: str) -> List[Tuple[str, List[str]]]:
+    """JSON payload first; DOM rows fill in venues that came back without showtimes."""
+    with phase("parse"):
+        theatres = _parse_venues_from_json(html)
+        if not theatres or any(len(ts) == 0 for _, ts in theatres):
+            dom = _parse_venues_from_dom(html)
+            if theatres:
+                dom_map = {n: ts for n, ts in dom}
+                theatres = [(n, dom_map.get(n, ts) or ts) for n, ts in theatres]
+            else:
+                theatres = dom
     _dbg(f"parsed theatres: {len(theatres)}")
     return theatres
+
+# ---------- Fetch modes ----------
+# auto: plain HTTP first, Chrome only when blocked or nothing parsed
+# http: plain HTTP only (never starts Chrome)
+# browser: Chrome only (previous behaviour)
+FETCH_MODES = ("auto", "http", "browser")
+DEFAULT_FETCH_MODE = (os.environ.get("BMS_FETCH_MODE") or "auto").lower()
+HTTP_UA = os.environ.get("BMS_HTTP_UA") or (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36")
+
+_FETCH_STATS: Dict[str, int] = {"http_ok": 0, "http_blocked": 0, "http_empty": 0, "http_error": 0,
+                                "browser": 0, "browser_tab": 0}
+_stats_lock = threading.Lock()
+_http_local = threading.local()
+
+class FetchBlocked(RuntimeError):
+    """http mode got a block page or no answer; unlike an empty page, the run must count as failed."""
+
+def _bump(key: str, n: int = 1):
+    with _stats_lock:
+        _FETCH_STATS[key] = _FETCH_STATS.get(key, 0) + n
+
+def fetch_stats() -> Dict[str, int]:
+    """Snapshot of how often each fetch path was used in this process."""
+    with _stats_lock:
+        return dict(_FETCH_STATS)
+
+def normalize_fetch_mode(mode: Optional[str]) -> str:
+    m = (mode or "").strip().lower()
+    return m if m in FETCH_MODES else (DEFAULT_FETCH_MODE if DEFAULT_FETCH_MODE in FETCH_MODES else "auto")
+
+def _http_session() -> requests.Session:
+    """Per-thread keep-alive session with the same identity headers the browser path sends."""
+    s = getattr(_http_local, "session", None)
+    if s is None:
+        s = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=0)
+        s.mount("https://", adapter); s.mount("http://", adapter)
+        s.headers.update({
+            "User-Agent": HTTP_UA,
+            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+            "Accept-Language": "en-US,en",
+            "Accept-Encoding": "gzip, deflate",
+            "Referer": "https://in.bookmyshow.com/",
+            "Connection": "keep-alive",
+        })
+        _http_local.session = s
+    return s
+
+def http_fetch(url: str, timeout: float = 15) -> Tuple[int, str]:
+    """GET url over the pooled session; returns (status, html). Raises on transport errors."""
+    _throttle()
+    left = _time_left()
+    with phase("nav"):
+        r = _http_session().get(url, timeout=timeout if left is None else min(timeout, left), allow_redirects=True)
+    return r.status_code, (r.text or "")
+
+def theatres_via_http(url: str, http_only: bool = False) -> Optional[List[Tuple[str, List[str]]]]:
+    """Parse theatres from a plain HTTP fetch; None means the browser path is needed.
+    With http_only there is no browser to fall back to: blocks and transport errors raise FetchBlocked
+    and an incomplete parse is returned as is."""
+    t0 = time.time()
+    try:
+        status, html = http_fetch(url)
+    except FetchTimeout:
+        raise
+    except Exception as e:
+        _bump("http_error"); _dbg(f"http fetch failed ({e})")
+        if http_only: raise FetchBlocked(f"http fetch failed: {e}") from e
+        return None
+    m = re.search(r"<title[^>]*>(.*?)</title>", html[:20000], re.I | re.S)
+    if status in (403, 429, 503) or PageSnapshot(html, m.group(1) if m else "").blocked():
+        _bump("http_blocked"); _dbg(f"http blocked status={status}")
+        if http_only: raise FetchBlocked(f"blocked by BMS (HTTP {status})")
+        return None
+    theatres = parse_html(html)
+    if not _complete(theatres):
+        _bump("http_empty"); _dbg(f"http parse incomplete status={status} theatres={len(theatres)}")
+        return theatres if http_only else None
+    _bump("http_ok")
+    _dbg(f"http parsed theatres: {len(theatres)} in {int((time.time()-t0)*1000)}ms")
+    return theatres
+
+def _scroll_rows(driver, timeout: float = 0.75):
+    """Scroll the virtualized list to the bottom and wait for its row count to settle."""
+    try:
+        for _ in range(2):
+            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+            w = _ReadyWatch()
+            while w.elapsed() < timeout and w.check(driver) not in ("rows", "empty", "blocked", "oops"):
+                time.sleep(_READY_POLL)
+    except Exception:
+        pass
+    _invalidate(driver)
+
+def _complete(theatres: List[Tuple[str, List[str]]]) -> bool:
+    return bool(theatres) and all(ts for _, ts in theatres)
+
+def fetch_theatres(driver, url: str, mode: Optional[str] = None, debug: bool = False, scroll: bool = True):
+    """
+    Parsed theatres for url using the requested fetch mode.
+    Returns (driver, theatres); driver is created lazily and may be replaced on recovery.
+    """
+    mode = normalize_fetch_mode(mode)
+    if mode in ("auto", "http"):
+        theatres = theatres_via_http(url, http_only=mode == "http")
+        if theatres is not None:
+            return driver, theatres
+        _dbg("falling back to browser")
+    if driver is None:
+        driver = acquire_driver(debug=debug)
+        if not driver:
+            raise RuntimeError("Failed to start Chrome driver")
+    driver = open_and_prepare_resilient(driver, url, debug=debug)
+    _bump("browser")
+    theatres = parse_theatres(driver)
+    if scroll and not _complete(theatres):
+        # the embedded payload was not enough; render the rest of the rows for the DOM parser
+        _scroll_rows(driver)
+        theatres = parse_theatres(driver)
+    if not theatres:
+        _save_artifacts(driver, "parse_empty", snapshot(driver), anomaly=True)
+    return driver, theatres
+
+# ---------- Multi-tab fan-out ----------
+DEFAULT_TABS = max(1, int(os.environ.get("BMS_TABS") or 4))
+_http_pool = None
+
+def open_many(driver, urls: List[str], tabs: int = DEFAULT_TABS, timeout: float = READY_TIMEOUT
+              ) -> Dict[str, Optional[List[Tuple[str, List[str]]]]]:
+    """
+    Load urls concurrently in up to `tabs` tabs of one browser and parse each as it becomes ready.
+    url -> theatres ([] for a date that loaded with no shows), or None when the tab was blocked/blank,
+    timed out empty, or came back incomplete and needs the sequential path.
+    """
+    with phase("nav"):
+        return _open_many(driver, urls, tabs, timeout)
+
+def _open_many(driver, urls: List[str], tabs: int, timeout: float) -> Dict[str, Optional[List[Tuple[str, List[str]]]]]:
+    results: Dict[str, Optional[List[Tuple[str, List[str]]]]] = {}
+    main = driver.current_window_handle
+    for b in range(0, len(urls), max(1, tabs)):
+        batch = urls[b:b + max(1, tabs)]
+        waiting: Dict[str, str] = {}
+        try:
+            for u in batch:
+                driver.switch_to.new_window("tab")
+                _prepare_target(driver)
+                _throttle(); driver.execute_script("window.location.href = arguments[0];", u)
+                _count_navs(driver)
+                waiting[driver.current_window_handle] = u
+            _dbg(f"tabs: opened {len(waiting)}")
+            watches = {h: _ReadyWatch() for h in waiting}
+            with phase("ready"):
+                while waiting:
+                    for h, u in list(waiting.items()):
+                        driver.switch_to.window(h)
+                        w = watches[h]
+                        state = w.check(driver)
+                        if state is None:
+                            if w.elapsed() < timeout:
+                                continue
+                            state = "timeout"
+                        _record_ready(state, w.elapsed())
+                        del waiting[h]
+                        snap = PageSnapshot.capture(driver)
+                        if snap.blocked() or snap.blank():
+                            _dbg(f"tab blocked/blank: {u}"); results[u] = None
+                            _save_artifacts(driver, "tab_blocked", snap, anomaly=True)
+                            continue
+                        theatres = parse_html(snap.html)
+                        # a page that finished loading with nothing on it is an answer, not a miss
+                        final = _complete(theatres) or (not theatres and state != "timeout")
+                        results[u] = theatres if final else None
+                    if waiting:
+                        time.sleep(_READY_POLL)
+            _net_report(driver, f"tabs x{len(batch)}", navs=len(batch))
+        finally:
+            for h in driver.window_handles:
+                if h != main:
+                    try:
+                        driver.switch_to.window(h); driver.close()
+                    except Exception:
+                        pass
+            driver.switch_to.window(main)
+    return results
+
+def _http_many(urls: List[str], workers: int, http_only: bool = False) -> Dict[str, Optional[List[Tuple[str, List[str]]]]]:
+    global _http_pool
+    if workers <= 1 or len(urls) <= 1:
+        return {u: theatres_via_http(u, http_only) for u in urls}
+    if _http_pool is None:
+        from concurrent.futures import ThreadPoolExecutor
+        _http_pool = ThreadPoolExecutor(max_workers=max(DEFAULT_TABS, workers), thread_name_prefix="bms-http")
+    scope = getattr(_artifact_scope, "name", None); acc = getattr(_phase_local, "acc", None)
+    deadline = getattr(_deadline_local, "at", None)
+    def one(u):
+        # pool threads act for the calling monitor (artifacts, rate-limit fairness, phase timing, deadline)
+        set_artifact_scope(scope); _adopt_phases(acc); set_deadline(deadline)
+        try:
+            return theatres_via_http(u, http_only)
+        finally:
+            _adopt_phases(None); set_deadline(None)
+    from concurrent.futures import wait
+    booked = _booked(acc); t0 = time.perf_counter()
+    futs = [_http_pool.submit(one, u) for u in urls]
+    _, pending = wait(futs, timeout=None if deadline is None else max(0.0, deadline - time.time()))
+    _discount(min(_booked(acc) - booked, (time.perf_counter() - t0) * 1000))
+    if pending:
+        for f in pending: f.cancel()
+        raise FetchTimeout(f"run deadline passed with {len(pending)}/{len(futs)} http fetches pending")
+    return {u: f.result() for u, f in zip(urls, futs)}
+
+def fetch_theatres_many(driver, urls: List[str], mode: Optional[str] = None, debug: bool = False,
+                        tabs: int = DEFAULT_TABS, scroll: bool = True):
+    """
+    fetch_theatres for several urls (typically one movie across dates).
+    HTTP fetches run concurrently; browser loads fan out over `tabs` tabs of one Chrome,
+    with anything a tab could not resolve retried through the sequential path.
+    Returns (driver, {url: theatres}).
+    """
+    mode = normalize_fetch_mode(mode)
+    results: Dict[str, List[Tuple[str, List[str]]]] = {}
+    if mode in ("auto", "http"):
+        for u, t in _http_many(urls, tabs, http_only=mode == "http").items():
+            if t is not None: results[u] = t
+        if mode == "http":
+            return driver, results
+    remaining = [u for u in urls if u not in results]
+    if remaining and tabs > 1 and len(remaining) > 1:
+        if driver is None:
+            driver = acquire_driver(debug=debug)
+            if not driver:
+                raise RuntimeError("Failed to start Chrome driver")
+        try:
+            for u, t in open_many(driver, remaining, tabs=tabs).items():
+                if t is not None:
+                    results[u] = t; _bump("browser_tab")
+        except FetchTimeout:
+            raise
+        except Exception as e:
+            _dbg(f"tab fan-out failed ({e}); continuing sequentially")
+    for u in urls:
+        if u not in results:
+            driver, results[u] = fetch_theatres(driver, u, mode="browser", debug=debug, scroll=scroll)
+    return driver, results
@@ -1,12 +1,16 @@
 #!/usr/bin/env python3
 from __future__ import annotations
-import os, time, json, sqlite3
+import os, time, json, sqlite3, threading, weakref
+import metrics
 from typing import List, Optional
 
 STATE_DB = os.environ.get("STATE_DB", "./artifacts/state.db")
+DB_SYNC = (os.environ.get("BMS_DB_SYNC") or "NORMAL").upper()
+DB_CACHE_MB = int(os.environ.get("BMS_DB_CACHE_MB") or 16)
+DB_MMAP_MB = int(os.environ.get("BMS_DB_MMAP_MB") or 128)
+DB_BUSY_MS = int(os.environ.get("BMS_DB_BUSY_MS") or 30000)
 
 SCHEMA = """
-PRAGMA journal_mode=WAL;
 CREATE TABLE IF NOT EXISTS monitors(
   id TEXT PRIMARY KEY,
   url TEXT NOT NULL,
@@ -27,7 +31,14 @@ CREATE TABLE IF NOT EXISTS monitors(
   updated_at INTEGER,
   last_run_ts INTEGER,
   last_alert_ts INTEGER,
-  reload INTEGER DEFAULT 0
+  reload INTEGER DEFAULT 0,
+  fetch_mode TEXT,
+  next_due_ts INTEGER,
+  adaptive INTEGER DEFAULT 0,
+  ival_min INTEGER,
+  ival_max INTEGER,
+  cur_interval_sec INTEGER,
+  err_streak INTEGER DEFAULT 0
 );
 CREATE TABLE IF NOT EXISTS seen(
   monitor_id TEXT NOT NULL,
@@ -52,6 +63,18 @@ CREATE TABLE IF NOT EXISTS runs(
   status TEXT,
   error TEXT
 );
+CREATE INDEX IF NOT EXISTS idx_runs_started ON runs(started_ts);
+CREATE TABLE IF NOT EXISTS jobs(
+  monitor_id TEXT NOT NULL,
+  date TEXT NOT NULL,
+  due_ts INTEGER NOT NULL,
+  lease_owner TEXT,
+  lease_until INTEGER,
+  attempts INTEGER NOT NULL DEFAULT 0,
+  last_error TEXT,
+  PRIMARY KEY(monitor_id, date)
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_due ON jobs(due_ts);
 CREATE TABLE IF NOT EXISTS snapshots(
   monitor_id TEXT NOT NULL,
   date TEXT NOT NULL,
@@ -60,6 +83,24 @@ CREATE TABLE IF NOT EXISTS snapshots(
   updated_at INTEGER,
   PRIMARY KEY(monitor_id,date,theatre)
 );
+CREATE TABLE IF NOT EXISTS page_cache(
+  key TEXT PRIMARY KEY,
+  pairs_json TEXT NOT NULL,
+  scrolled INTEGER NOT NULL DEFAULT 1,
+  fetched_ts INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS fingerprints(
+  monitor_id TEXT NOT NULL,
+  date TEXT NOT NULL,
+  fp TEXT NOT NULL,
+  updated_at INTEGER,
+  PRIMARY KEY(monitor_id,date)
+);
+CREATE TABLE IF NOT EXISTS rate_bucket(
+  name TEXT PRIMARY KEY,
+  tokens REAL NOT NULL,
+  updated REAL NOT NULL
+);
 CREATE TABLE IF NOT EXISTS daily(
   chat_id TEXT PRIMARY KEY,
   hhmm TEXT NOT NULL,
@@ -80,25 +121,148 @@ def _ensure_dir(path: str):
     if d and not os.path.isdir(d):
         os.makedirs(d, exist_ok=True)
 
-def connect() -> sqlite3.Connection:
-    _ensure_dir(STATE_DB)
-    conn = sqlite3.connect(STATE_DB, timeout=30, check_same_thread=False)
+# Ordered schema steps; PRAGMA user_version records how many have been applied.
+# Append new steps, never edit old ones. Step 1 also brings pre-versioning databases
+# up to date (their ADD COLUMNs are skipped where the column already exists).
+MIGRATIONS: List[List[str]] = [
+    [SCHEMA,
+     "ALTER TABLE monitors ADD COLUMN mode TEXT DEFAULT 'FIXED'",
+     "ALTER TABLE monitors ADD COLUMN rolling_days INTEGER DEFAULT 0",
+     "ALTER TABLE monitors ADD COLUMN end_date TEXT",
+     "ALTER TABLE monitors ADD COLUMN time_start TEXT",
+     "ALTER TABLE monitors ADD COLUMN time_end TEXT",
+     "ALTER TABLE monitors ADD COLUMN reload INTEGER DEFAULT 0",
+     "ALTER TABLE monitors ADD COLUMN fetch_mode TEXT",
+     "ALTER TABLE monitors ADD COLUMN next_due_ts INTEGER",
+     "ALTER TABLE monitors ADD COLUMN adaptive INTEGER DEFAULT 0",
+     "ALTER TABLE monitors ADD COLUMN ival_min INTEGER",
+     "ALTER TABLE monitors ADD COLUMN ival_max INTEGER",
+     "ALTER TABLE monitors ADD COLUMN cur_interval_sec INTEGER",
+     "ALTER TABLE monitors ADD COLUMN err_streak INTEGER DEFAULT 0",
+     "ALTER TABLE runs ADD COLUMN owner TEXT",
+     "ALTER TABLE runs ADD COLUMN dates TEXT",
+     "ALTER TABLE runs ADD COLUMN attempt INTEGER",
+     "ALTER TABLE runs ADD COLUMN phases TEXT",
+     "ALTER TABLE daily ADD COLUMN every_min INTEGER",
+     # indexes on ALTERed columns must come after the ALTERs
+     "CREATE INDEX IF NOT EXISTS idx_monitors_due ON monitors(state, next_due_ts)",
+     "CREATE INDEX IF NOT EXISTS idx_monitors_updated ON monitors(updated_at)"],
+]
+
+_local = threading.local()
+_live: "weakref.WeakSet[_Conn]" = weakref.WeakSet()
+_migrated: set = set()
+_migrate_lock = threading.Lock()
+_DB_STATS = {"opened": 0, "reused": 0, "closed": 0, "spilled": 0, "migrations": 0,
+             "lock_waits": 0, "lock_wait_ms_sum": 0.0, "lock_wait_ms_max": 0.0}
+_stats_lock = threading.Lock()
+
+def _bump(key: str, n: int = 1):
+    with _stats_lock:
+        _DB_STATS[key] += n
+
+class _Conn(sqlite3.Connection):
+    """Connection handed out by connect(); close() also takes it out of this thread's pool."""
+    def __init__(self, *a, **kw):
+        super().__init__(*a, **kw)
+        self.is_open = True
+
+    def close(self):
+        pool = getattr(_local, "conns", {})
+        for path in [k for k, c in pool.items() if c is self]: del pool[path]
+        if self.is_open:
+            self.is_open = False; _bump("closed")
+        super().close()
+
+def _statements(sql: str):
+    return [x.strip() for x in sql.split(";") if x.strip()]
+
+def _apply(conn, sql: str):
+    parts = sql.split()
+    if parts[:2] == ["ALTER", "TABLE"] and parts[3:5] == ["ADD", "COLUMN"]:
+        if any(r[1] == parts[5] for r in conn.execute(f"PRAGMA table_info({parts[2]})")): return
+    conn.execute(sql)
+
+def _migrate(conn):
+    """Bring the file to len(MIGRATIONS); concurrent processes serialise on the write lock."""
+    conn.execute("PRAGMA journal_mode=WAL")
+    if conn.execute("PRAGMA user_version").fetchone()[0] >= len(MIGRATIONS): return
+    _begin_immediate(conn, "migrate")
+    try:
+        v = conn.execute("PRAGMA user_version").fetchone()[0]
+        for n, step in enumerate(MIGRATIONS[v:], v + 1):
+            for sql in step:
+                for stmt in _statements(sql): _apply(conn, stmt)
+            conn.execute(f"PRAGMA user_version={n}")
+            _bump("migrations")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+def _open(path: str) -> _Conn:
+    _ensure_dir(path)
+    conn = sqlite3.connect(path, timeout=DB_BUSY_MS / 1000, check_same_thread=False, factory=_Conn)
     conn.row_factory = sqlite3.Row
-    conn.executescript(SCHEMA)
-    for alter in [
-        "ALTER TABLE monitors ADD COLUMN mode TEXT DEFAULT 'FIXED'",
-        "ALTER TABLE monitors ADD COLUMN rolling_days INTEGER DEFAULT 0",
-        "ALTER TABLE monitors ADD COLUMN end_date TEXT",
-        "ALTER TABLE monitors ADD COLUMN time_start TEXT",
-        "ALTER TABLE monitors ADD COLUMN time_end TEXT",
-        "ALTER TABLE monitors ADD COLUMN reload INTEGER DEFAULT 0",
-    ]:
-        try:
-            conn.execute(alter); conn.commit()
-        except Exception:
-            pass
+    conn.execute(f"PRAGMA busy_timeout={DB_BUSY_MS}")
+    conn.execute(f"PRAGMA synchronous={DB_SYNC}")
+    conn.execute(f"PRAGMA cache_size={-DB_CACHE_MB * 1024}")
+    conn.execute(f"PRAGMA mmap_size={DB_MMAP_MB << 20}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    if path not in _migrated:
+        with _migrate_lock:
+            if path not in _migrated:
+                _migrate(conn); _migrated.add(path)
+    with _stats_lock:
+        _live.add(conn); _DB_STATS["opened"] += 1
     return conn
 
+def connect() -> sqlite3.Connection:
+    """This thread's long-lived connection to STATE_DB (opened, tuned and migrated on first use).
+    `with connect() as conn:` commits/rolls back as before but no longer closes anything.
+    While that connection has uncommitted writes (e.g. inside another caller's `with`), a private
+    connection is returned instead, so neither caller's transaction leaks into the other's."""
+    pool = getattr(_local, "conns", None)
+    if pool is None: pool = _local.conns = {}
+    conn = pool.get(STATE_DB)
+    if conn is None:
+        conn = pool[STATE_DB] = _open(STATE_DB)
+        return conn
+    if conn.in_transaction:
+        _bump("spilled")
+        return _open(STATE_DB)
+    _bump("reused")
+    return conn
+
+def private_connection() -> sqlite3.Connection:
+    """A connection outside the per-thread pool, for a long-lived user on threads it doesn't own
+    (the metrics collector runs on throwaway HTTP threads). The caller serialises access."""
+    return _open(STATE_DB)
+
+def _begin_immediate(conn, op: str):
+    """Take the write lock, timing the wait (stats + bms_db_lock_wait_seconds)."""
+    if conn.in_transaction:
+        raise sqlite3.ProgrammingError(f"{op}: connection already has an open transaction")
+    t0 = time.perf_counter()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+    finally:
+        secs = time.perf_counter() - t0
+        metrics.observe("bms_db_lock_wait_seconds", secs, op=op)
+        ms = secs * 1000
+        with _stats_lock:
+            _DB_STATS["lock_waits"] += 1; _DB_STATS["lock_wait_ms_sum"] += ms
+            if ms > _DB_STATS["lock_wait_ms_max"]: _DB_STATS["lock_wait_ms_max"] = ms
+
+def db_stats() -> dict:
+    with _stats_lock:
+        st = dict(_DB_STATS); live = len(_live)
+    waits = st.pop("lock_wait_ms_sum")
+    st["lock_wait_ms_avg"] = int(waits / st["lock_waits"]) if st["lock_waits"] else 0
+    st["lock_wait_ms_max"] = int(st["lock_wait_ms_max"])
+    st["live"] = live
+    return st
+
 def list_monitors(conn): return conn.execute("SELECT * FROM monitors ORDER BY created_at DESC").fetchall()
 def get_monitor(conn, mid): return conn.execute("SELECT * FROM monitors WHERE id=?", (mid,)).fetchone()
 def set_state(conn, mid, state):
@@ -117,6 +281,15 @@ def set_theatres(conn, mid, theatres):
 def set_mode(conn, mid, mode, rolling_days=0, end_date=None):
     cur=conn.execute("UPDATE monitors SET mode=?, rolling_days=?, end_date=?, updated_at=? WHERE id=?", 
                      (mode, int(rolling_days or 0), end_date, int(time.time()), mid)); conn.commit(); return cur.rowcount>0
+def set_fetch_mode(conn, mid, mode):
+    cur=conn.execute("UPDATE monitors SET fetch_mode=?, updated_at=? WHERE id=?", (mode, int(time.time()), mid)); conn.commit(); return cur.rowcount>0
+def set_adaptive(conn, mid, lo=None, hi=None):
+    """Enable adaptive polling between lo and hi minutes (starting at lo); lo=None turns it off."""
+    cur=conn.execute("UPDATE monitors SET adaptive=?, ival_min=?, ival_max=?, cur_interval_sec=?, err_streak=0, updated_at=? WHERE id=?",
+                     (1 if lo else 0, lo, hi, lo and lo*60, int(time.time()), mid)); conn.commit(); return cur.rowcount>0
+def record_interval(conn, mid, interval_sec: int, err_streak: int):
+    # adaptive bookkeeping after each run; leaves updated_at alone like set_next_due
+    conn.execute("UPDATE monitors SET cur_interval_sec=?, err_streak=? WHERE id=?", (int(interval_sec), int(err_streak), mid)); conn.commit()
 
 def get_indexed_theatres(conn, mid) -> List[str]:
     rows = conn.execute("SELECT DISTINCT theatre FROM theatres_index WHERE monitor_id=? ORDER BY theatre COLLATE NOCASE", (mid,)).fetchall()
@@ -129,6 +302,14 @@ def upsert_indexed_theatre(conn, mid, date, theatre):
                  (mid, date, theatre, int(time.time())))
     conn.commit()
 
+def upsert_indexed_theatres(conn, mid, date, theatres):
+    """upsert_indexed_theatre for a whole page, one statement batch; the caller commits."""
+    now = int(time.time())
+    conn.executemany("""INSERT INTO theatres_index(monitor_id,date,theatre,last_seen_ts)
+                        VALUES(?,?,?,?)
+                        ON CONFLICT(monitor_id,date,theatre) DO UPDATE SET last_seen_ts=excluded.last_seen_ts""",
+                     [(mid, date, t, now) for t in theatres])
+
 # UI session helpers
 def get_ui_session(conn, chat_id: str, sid: str):
     row = conn.execute("SELECT data_json FROM ui_sessions WHERE chat_id=? AND monitor_id=?", (str(chat_id), str(sid))).fetchone()
@@ -151,10 +332,52 @@ def clear_ui_session(conn, chat_id: str, sid: str):
     conn.execute("DELETE FROM ui_sessions WHERE chat_id=? AND monitor_id=?", (str(chat_id), str(sid)))
     conn.commit()
 
+# ---- Per-chat digest (daily table: hhmm = daily send time, every_min = cadence instead) ----
+def get_digest(conn, chat_id: str):
+    return conn.execute("SELECT * FROM daily WHERE chat_id=?", (str(chat_id),)).fetchone()
+
+def set_digest(conn, chat_id: str, hhmm: str|None, every_min: int|None, enabled: bool):
+    conn.execute("""INSERT INTO daily(chat_id,hhmm,enabled,every_min) VALUES(?,?,?,?)
+                    ON CONFLICT(chat_id) DO UPDATE SET hhmm=excluded.hhmm, enabled=excluded.enabled, every_min=excluded.every_min""",
+                 (str(chat_id), hhmm or "", 1 if enabled else 0, every_min))
+    conn.commit()
+
+def enabled_digests(conn):
+    return conn.execute("SELECT * FROM daily WHERE enabled=1").fetchall()
+
+def claim_digest(conn, chat_id: str, prev_sent: int|None, now: int) -> bool:
+    """Compare-and-set last_sent_ts so only one process sends a given digest."""
+    cur = conn.execute("UPDATE daily SET last_sent_ts=? WHERE chat_id=? AND COALESCE(last_sent_ts,0)=?",
+                       (int(now), str(chat_id), int(prev_sent or 0)))
+    conn.commit()
+    return cur.rowcount > 0
+
+def chat_monitors(conn, chat_id: str):
+    return conn.execute("SELECT * FROM monitors WHERE owner_chat_id=? AND state<>'STOPPED' ORDER BY created_at",
+                        (str(chat_id),)).fetchall()
+
 # ---- New helpers for scheduler ----
 def get_active_monitors(conn):
     return conn.execute("SELECT * FROM monitors WHERE state IN ('RUNNING','DISCOVER')").fetchall()
 
+def changed_monitors(conn, since: int):
+    """Monitors touched (updated_at) at or after `since`, any state."""
+    return conn.execute("SELECT * FROM monitors WHERE updated_at>=?", (int(since),)).fetchall()
+
+def due_monitors(conn, now: int, limit: int = 100):
+    return conn.execute("""SELECT * FROM monitors WHERE state IN ('RUNNING','DISCOVER') AND next_due_ts<=?
+                           ORDER BY next_due_ts LIMIT ?""", (int(now), int(limit))).fetchall()
+
+def set_next_due(conn, rows):
+    # rows: list of (next_due_ts, monitor_id); scheduling bookkeeping, deliberately leaves updated_at alone
+    if not rows: return
+    conn.executemany("UPDATE monitors SET next_due_ts=? WHERE id=?", rows)
+    conn.commit()
+
+def data_version(conn) -> int:
+    """Bumps whenever another connection commits to the DB (cheap change detection)."""
+    return int(conn.execute("PRAGMA data_version").fetchone()[0])
+
 def upsert_seen(conn, monitor_id: str, date: str, theatre: str, time_: str, first_seen_ts: int):
     conn.execute("""INSERT INTO seen(monitor_id,date,theatre,time,first_seen_ts)
                     VALUES(?,?,?,?,?)
@@ -179,3 +402,163 @@ def set_baseline_done(conn, mid: str):
     cur=conn.execute("UPDATE monitors SET baseline=0, updated_at=? WHERE id=?", (int(time.time()), mid))
     conn.commit()
     return cur.rowcount>0
+
+def seed_baseline(conn, mid: str, rows, fps):
+    """First sweep of a baseline monitor in one transaction: everything on the pages is seen, fingerprints
+    recorded, baseline flag cleared. rows: (monitor_id, date, theatre, time, ts); fps: {date: fp}."""
+    now = int(time.time())
+    with conn:
+        conn.executemany("""INSERT INTO seen(monitor_id,date,theatre,time,first_seen_ts) VALUES(?,?,?,?,?)
+                            ON CONFLICT(monitor_id,date,theatre,time) DO NOTHING""", rows)
+        conn.executemany("""INSERT INTO fingerprints(monitor_id,date,fp,updated_at) VALUES(?,?,?,?)
+                            ON CONFLICT(monitor_id,date) DO UPDATE SET fp=excluded.fp, updated_at=excluded.updated_at""",
+                         [(mid, d, fp, now) for d, fp in fps.items()])
+        conn.execute("UPDATE monitors SET baseline=0, updated_at=? WHERE id=?", (now, mid))
+
+def get_fingerprints(conn, mid: str):
+    return {r["date"]: r["fp"] for r in conn.execute("SELECT date, fp FROM fingerprints WHERE monitor_id=?", (mid,))}
+
+def set_fingerprints(conn, mid: str, fps):
+    # fps: {date: fp}
+    if not fps: return
+    now = int(time.time())
+    conn.executemany("""INSERT INTO fingerprints(monitor_id,date,fp,updated_at) VALUES(?,?,?,?)
+                        ON CONFLICT(monitor_id,date) DO UPDATE SET fp=excluded.fp, updated_at=excluded.updated_at""",
+                     [(mid, d, fp, now) for d, fp in fps.items()])
+    conn.commit()
+
+# ---- Shared page cache (see pagecache.py) ----
+def get_cached_pages(conn, keys, min_ts: int, scrolled: bool=False):
+    """key -> (pairs_json, fetched_ts) for fresh rows; unscrolled rows only count when scrolled=False."""
+    if not keys: return {}
+    q = ",".join("?" * len(keys))
+    rows = conn.execute(f"SELECT key, pairs_json, fetched_ts FROM page_cache WHERE key IN ({q}) AND fetched_ts>=? AND scrolled>=?",
+                        (*keys, int(min_ts), 1 if scrolled else 0)).fetchall()
+    return {r["key"]: (r["pairs_json"], int(r["fetched_ts"])) for r in rows}
+
+def put_cached_pages(conn, rows):
+    # rows: list of (key, pairs_json, scrolled, fetched_ts)
+    if not rows: return
+    conn.executemany("""INSERT INTO page_cache(key,pairs_json,scrolled,fetched_ts) VALUES(?,?,?,?)
+                        ON CONFLICT(key) DO UPDATE SET pairs_json=excluded.pairs_json,
+                          scrolled=excluded.scrolled, fetched_ts=excluded.fetched_ts""", rows)
+    conn.commit()
+
+def prune_page_cache(conn, older_than: int, keep: int) -> int:
+    cur = conn.execute("DELETE FROM page_cache WHERE fetched_ts<? OR key NOT IN "
+                       "(SELECT key FROM page_cache ORDER BY fetched_ts DESC LIMIT ?)", (int(older_than), int(keep)))
+    conn.commit()
+    return cur.rowcount
+
+# ---- Job queue: leased (monitor, date) jobs shared by scheduler/worker processes ----
+def worker_id() -> str:
+    import socket
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def sync_jobs(conn, mid: str, dates, now: int):
+    """Make the monitor's job set match its effective dates; new dates are due immediately."""
+    dates = list(dates or [])
+    conn.executemany("INSERT INTO jobs(monitor_id,date,due_ts) VALUES(?,?,?) ON CONFLICT(monitor_id,date) DO NOTHING",
+                     [(mid, d, int(now)) for d in dates])
+    q = ",".join("?" * len(dates))
+    conn.execute("DELETE FROM jobs WHERE monitor_id=?" + (f" AND date NOT IN ({q})" if dates else ""), (mid, *dates))
+    conn.commit()
+
+def drop_jobs(conn, mid: str):
+    conn.execute("DELETE FROM jobs WHERE monitor_id=?", (mid,)); conn.commit()
+
+def claim_jobs(conn, owner: str, lease_sec: int, now: int, mid: str|None=None):
+    """Atomically lease every unleased job of one monitor: the earliest-due one, or `mid` regardless of due time.
+    All-or-nothing per monitor, so a monitor is never split across processes. Returns (mid, dates, run_id) or None."""
+    now = int(now)
+    _begin_immediate(conn, "claim")
+    try:
+        if mid is None:
+            r = conn.execute("""SELECT monitor_id FROM jobs j WHERE due_ts<=? AND NOT EXISTS
+                                  (SELECT 1 FROM jobs k WHERE k.monitor_id=j.monitor_id AND k.lease_until>=?)
+                                ORDER BY due_ts LIMIT 1""", (now, now)).fetchone()
+            if not r:
+                conn.execute("COMMIT"); return None
+            mid = r["monitor_id"]
+            where, args = "monitor_id=? AND due_ts<=?", (mid, now)
+        else:
+            if conn.execute("SELECT 1 FROM jobs WHERE monitor_id=? AND lease_until>=? AND lease_owner<>?",
+                            (mid, now, owner)).fetchone():
+                conn.execute("COMMIT"); return None
+            where, args = "monitor_id=?", (mid,)
+        rows = conn.execute(f"SELECT date, attempts FROM jobs WHERE {where} ORDER BY date", args).fetchall()
+        if not rows:
+            conn.execute("COMMIT"); return None
+        dates = [r["date"] for r in rows]
+        conn.execute(f"UPDATE jobs SET lease_owner=?, lease_until=?, attempts=attempts+1 WHERE {where}",
+                     (owner, now + int(lease_sec), *args))
+        # an earlier attempt still 'running' lost its lease (crashed or stalled process)
+        conn.execute("UPDATE runs SET status='lost', finished_ts=? WHERE monitor_id=? AND status='running'", (now, mid))
+        cur = conn.execute("INSERT INTO runs(monitor_id,started_ts,status,owner,dates,attempt) VALUES(?,?,?,?,?,?)",
+                           (mid, now, "running", owner, ",".join(dates), 1 + max(r["attempts"] for r in rows)))
+        conn.execute("COMMIT")
+        return mid, dates, cur.lastrowid
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+def renew_lease(conn, owner: str, mid: str, lease_sec: int) -> bool:
+    """Extend our lease on a monitor's jobs; False means it expired and was taken over."""
+    cur = conn.execute("UPDATE jobs SET lease_until=? WHERE monitor_id=? AND lease_owner=?",
+                       (int(time.time()) + int(lease_sec), mid, owner))
+    conn.commit()
+    return cur.rowcount > 0
+
+def finish_jobs(conn, owner: str, mid: str, run_id: int, next_due: int, error: str|None=None,
+                phases: dict|None=None):
+    """Release our lease and reschedule; failures back off exponentially by attempt count.
+    `phases` (phase -> ms, incl. "total") is kept on the run row for /stats."""
+    now = int(time.time())
+    if error:
+        conn.execute("""UPDATE jobs SET lease_owner=NULL, lease_until=NULL, last_error=?,
+                          due_ts=?+MIN(600, 30*(1<<MIN(attempts,5))) WHERE monitor_id=? AND lease_owner=?""",
+                     (error[:500], now, mid, owner))
+    else:
+        conn.execute("""UPDATE jobs SET lease_owner=NULL, lease_until=NULL, last_error=NULL, attempts=0, due_ts=?
+                        WHERE monitor_id=? AND lease_owner=?""", (int(next_due), mid, owner))
+    conn.execute("UPDATE runs SET finished_ts=?, status=?, error=?, phases=? WHERE id=?",
+                 (now, "error" if error else "ok", (error or None) and error[:500],
+                  json.dumps(phases, separators=(",", ":")) if phases else None, run_id))
+    conn.commit()
+
+def run_phases(conn, since: int, mid: str|None=None):
+    """Finished runs since `since` with their phase timings (optionally one monitor)."""
+    q = "SELECT monitor_id, status, phases FROM runs WHERE started_ts>=? AND finished_ts IS NOT NULL"
+    return conn.execute(q + (" AND monitor_id=?" if mid else ""), (int(since), mid) if mid else (int(since),)).fetchall()
+
+def prune_runs(conn, before: int):
+    conn.execute("DELETE FROM runs WHERE started_ts<? AND status<>'running'", (int(before),)); conn.commit()
+
+def job_backlog(conn, now: int) -> dict:
+    """Job counts for the queue-depth gauge: due and unleased vs currently leased."""
+    r = conn.execute("""SELECT SUM(due_ts<=? AND COALESCE(lease_until,0)<?) AS due,
+                               SUM(COALESCE(lease_until,0)>=?) AS leased FROM jobs""", (now, now, now)).fetchone()
+    return {"due": r["due"] or 0, "leased": r["leased"] or 0}
+
+def next_job_due(conn) -> int|None:
+    r = conn.execute("SELECT MIN(MAX(due_ts, COALESCE(lease_until+1, 0))) AS t FROM jobs").fetchone()
+    return None if r["t"] is None else int(r["t"])
+
+# ---- Shared token bucket (see ratelimit.py) ----
+def take_token(conn, name: str, rate: float, burst: int, now: float) -> float:
+    """Take one token from the named bucket; returns 0 on success, else seconds until one is available."""
+    _begin_immediate(conn, "rate")
+    try:
+        r = conn.execute("SELECT tokens, updated FROM rate_bucket WHERE name=?", (name,)).fetchone()
+        tokens = float(burst) if r is None else min(float(burst), r["tokens"] + max(0.0, now - r["updated"]) * rate)
+        wait = 0.0 if tokens >= 1 else (1 - tokens) / rate
+        if not wait: tokens -= 1
+        conn.execute("""INSERT INTO rate_bucket(name,tokens,updated) VALUES(?,?,?)
+                        ON CONFLICT(name) DO UPDATE SET tokens=excluded.tokens, updated=excluded.updated""", (name, tokens, now))
+        conn.execute("COMMIT")
+        return wait
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+metrics.gauge("bms_db_connections", lambda: len(_live), "Open pooled state.db connections in this process")
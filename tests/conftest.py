@@ -0,0 +1,14 @@
+import os, sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "bench")]
+
+import pytest
+import store
+
+@pytest.fixture
+def state_db(tmp_path, monkeypatch):
+    """A fresh state.db for the test; pooled connections are keyed by path, so nothing leaks between tests."""
+    path = str(tmp_path / "state.db")
+    monkeypatch.setattr(store, "STATE_DB", path)
+    return path
@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+
+import scheduler
+from common import adapt_interval
+from store import connect, get_monitor
+
+def _row(**kw):
+    r = {"interval_min": 5, "adaptive": 1, "ival_min": 2, "ival_max": 30, "cur_interval_sec": 600, "err_streak": 0}
+    r.update(kw)
+    return r
+
+# ---- adapt_interval ----
+def test_new_snaps_to_floor_and_changed_holds():
+    assert adapt_interval(_row(err_streak=3), "new") == (120, 0)
+    assert adapt_interval(_row(), "changed") == (600, 0)
+
+def test_same_relaxes_up_to_ceiling():
+    assert adapt_interval(_row(), "same") == (900, 0)
+    assert adapt_interval(_row(cur_interval_sec=1500), "same") == (1800, 0)
+
+def test_current_interval_is_clamped_into_bounds():
+    assert adapt_interval(_row(cur_interval_sec=5000), "changed") == (1800, 0)
+    assert adapt_interval(_row(cur_interval_sec=60), "changed") == (120, 0)
+    # no ceiling set: the floor is also the ceiling
+    assert adapt_interval(_row(ival_max=None), "same") == (120, 0)
+    # no floor set: interval_min is the floor
+    assert adapt_interval(_row(ival_min=None, cur_interval_sec=None), "new") == (300, 0)
+
+def test_errors_back_off_exponentially_to_ceiling():
+    r = _row(cur_interval_sec=120); seen = []
+    for _ in range(6):
+        ivl, errs = adapt_interval(r, "error")
+        seen.append(ivl); r = _row(cur_interval_sec=ivl, err_streak=errs)
+    assert seen == [240, 480, 960, 1800, 1800, 1800]
+    assert r["err_streak"] == 6
+    # a long interval is never shortened by an error
+    assert adapt_interval(_row(cur_interval_sec=1500), "error") == (1500, 1)
+
+# ---- no future dates ----
+def test_monitor_past_its_end_date_is_paused_without_adapting(state_db, monkeypatch):
+    sent = []
+    monkeypatch.setattr(scheduler, "tg_send", lambda chat, text: sent.append(text))
+    ended = (datetime.now() - timedelta(days=2)).strftime("%Y%m%d")
+    with connect() as conn:
+        conn.execute("""INSERT INTO monitors(id,url,dates,theatres,interval_min,baseline,state,owner_chat_id,mode,end_date,
+                                             adaptive,ival_min,ival_max)
+                        VALUES('m','https://in.bookmyshow.com/x','','',5,0,'RUNNING','1','UNTIL',?,1,2,30)""", (ended,))
+        conn.commit()
+        row = get_monitor(conn, "m")
+    scheduler._execute(None, row, {})
+    with connect() as conn:
+        row = get_monitor(conn, "m")
+    assert row["state"] == "PAUSED" and len(sent) == 1
+    assert row["cur_interval_sec"] is None and row["err_streak"] == 0
@@ -0,0 +1,66 @@
+import sqlite3, time
+
+import pytest
+
+import store
+from store import connect, claim_jobs
+
+NOW = int(time.time())
+
+def _jobs(conn, mid):
+    return {r["date"]: dict(r) for r in conn.execute("SELECT * FROM jobs WHERE monitor_id=?", (mid,))}
+
+# ---- connect(): migrations and pooling ----
+_LEGACY = """
+CREATE TABLE monitors(id TEXT PRIMARY KEY, url TEXT NOT NULL, dates TEXT NOT NULL, theatres TEXT NOT NULL,
+  interval_min INTEGER NOT NULL, baseline INTEGER NOT NULL, state TEXT NOT NULL, snooze_until INTEGER,
+  owner_chat_id TEXT, created_at INTEGER, updated_at INTEGER);
+CREATE TABLE runs(id INTEGER PRIMARY KEY AUTOINCREMENT, monitor_id TEXT NOT NULL, started_ts INTEGER,
+  finished_ts INTEGER, status TEXT, error TEXT);
+INSERT INTO monitors VALUES('old','https://x','20261020','[]',5,0,'RUNNING',NULL,'1',1,1);
+"""
+
+def _columns(conn, table):
+    return {r[1] for r in conn.execute(f"PRAGMA table_info({table})")}
+
+def test_fresh_db_is_migrated_to_latest(state_db):
+    conn = connect()
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == len(store.MIGRATIONS)
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert {"phases", "owner", "attempt"} <= _columns(conn, "runs")
+    assert "every_min" in _columns(conn, "daily")
+
+def test_pre_versioning_db_upgrades_in_place(state_db):
+    raw = sqlite3.connect(state_db); raw.executescript(_LEGACY); raw.close()
+    conn = connect()
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == len(store.MIGRATIONS)
+    assert {"mode", "next_due_ts", "err_streak"} <= _columns(conn, "monitors")
+    assert {"owner", "dates", "attempt", "phases"} <= _columns(conn, "runs")
+    row = store.get_monitor(conn, "old")
+    assert row["state"] == "RUNNING" and row["mode"] == "FIXED" and row["err_streak"] == 0
+    assert {r[1] for r in conn.execute("PRAGMA index_list(monitors)")} >= {"idx_monitors_due", "idx_monitors_updated"}
+
+def test_migrations_run_once_per_file(state_db, monkeypatch):
+    connect()
+    applied = store.db_stats()["migrations"]
+    monkeypatch.setattr(store, "_migrated", set())   # as if a second process opened the file
+    connect().close(); connect()
+    assert store.db_stats()["migrations"] == applied
+
+def test_connect_reuses_per_thread_and_spills_inside_a_transaction(state_db):
+    conn = connect()
+    assert connect() is conn
+    with connect() as w:
+        store.upsert_indexed_theatres(w, "m", "20261020", ["A"])   # caller commits
+        other = connect()
+        assert other is not w and store.get_indexed_theatres(other, "m") == []
+    assert store.get_indexed_theatres(connect(), "m") == ["A"]
+    assert connect() is conn
+
+def test_write_lock_refuses_to_commit_someone_elses_transaction(state_db):
+    conn = connect()
+    conn.execute("INSERT INTO jobs(monitor_id,date,due_ts) VALUES('x','20261020',1)")
+    with pytest.raises(sqlite3.ProgrammingError):
+        claim_jobs(conn, "w1", 60, NOW)
+    conn.rollback()
+    assert _jobs(conn, "x") == {}
@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta
+
+import digest
+from digest import next_digest_ts, heartbeat_group, send_due_digests
+from store import connect, set_digest, get_digest, enabled_digests
+
+def _at(day: datetime, hhmm: str) -> int:
+    h, m = map(int, hhmm.split(":"))
+    return int(day.replace(hour=h, minute=m, second=0, microsecond=0).timestamp())
+
+DAY = datetime(2026, 10, 20)
+
+# ---- next_digest_ts ----
+def test_cadence_digest_is_due_every_n_minutes():
+    now = _at(DAY, "12:00")
+    assert next_digest_ts({"last_sent_ts": None, "every_min": 30, "hhmm": ""}, now) == now
+    assert next_digest_ts({"last_sent_ts": now - 600, "every_min": 30, "hhmm": ""}, now) == now + 1200
+
+def test_daily_digest_is_next_hhmm_after_last_send():
+    cfg = {"last_sent_ts": None, "every_min": None, "hhmm": "09:30"}
+    assert next_digest_ts(cfg, _at(DAY, "08:00")) == _at(DAY, "09:30")
+    assert next_digest_ts(cfg, _at(DAY, "10:00")) == _at(DAY + timedelta(days=1), "09:30")
+    sent = dict(cfg, last_sent_ts=_at(DAY, "09:30"))
+    assert next_digest_ts(sent, _at(DAY, "09:31")) == _at(DAY + timedelta(days=1), "09:30")
+    assert next_digest_ts(dict(cfg, hhmm=""), 1000) == 1000 + 86400
+
+# ---- heartbeat_group ----
+def _mon(mid, chat="c1", hb=60):
+    return {"id": mid, "owner_chat_id": chat, "heartbeat_minutes": hb}
+
+def test_heartbeat_group_batches_nearly_due_monitors_of_the_chat():
+    now = 100_000
+    rows = {"a": _mon("a"), "b": _mon("b"), "c": _mon("c"), "x": _mon("x", chat="c2")}
+    book = {"a": now - 3600, "b": now - 2000, "c": now - 1000, "x": now - 3600}
+    # b is due in 1600s (<= half of 3600s), c in 2600s, x is another chat
+    assert [r["id"] for r in heartbeat_group(rows, "a", book, now)] == ["a", "b"]
+    assert heartbeat_group(rows, "c", book, now) == []
+
+# ---- send_due_digests ----
+def test_digest_is_claimed_once_across_processes(state_db, monkeypatch):
+    now = _at(DAY, "12:00")
+    with connect() as conn:
+        set_digest(conn, "c1", None, 30, True); set_digest(conn, "c2", "23:00", None, True)
+        set_digest(conn, "c3", None, 30, False)
+        conn.execute("""INSERT INTO monitors(id,url,dates,theatres,interval_min,baseline,state,owner_chat_id,created_at)
+                        VALUES('m','https://in.bookmyshow.com/x','','',5,0,'RUNNING','c1',1)""")
+        conn.commit()
+        stale = enabled_digests(conn)
+    sent = []
+    assert send_due_digests(lambda chat, text: sent.append(chat), now) == {"c1", "c2"}
+    assert sent == ["c1"]
+    with connect() as conn:
+        assert get_digest(conn, "c1")["last_sent_ts"] == now
+    # a second process that read the rows before the first one's claim loses the compare-and-set
+    monkeypatch.setattr(digest, "enabled_digests", lambda conn: stale)
+    send_due_digests(lambda chat, text: sent.append(chat), now + 5)
+    assert sent == ["c1"]
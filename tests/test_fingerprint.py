@@ -0,0 +1,62 @@
+import pytest
+
+import scheduler
+from common import page_fingerprint
+from store import connect, get_monitor, get_fingerprints
+
+PAGE = [("PVR: Nexus", ["10:00 AM", "01:00 PM"]), ("AMB Cinemas: Gachibowli", ["11:00 AM"])]
+
+# ---- page_fingerprint ----
+def test_fingerprint_ignores_order_and_duplicates():
+    shuffled = [("AMB Cinemas: Gachibowli", ["11:00 AM", "11:00 AM"]), ("PVR: Nexus", ["01:00 PM", "10:00 AM"])]
+    assert page_fingerprint(PAGE) == page_fingerprint(shuffled)
+    assert page_fingerprint(PAGE, ["b", "a"]) == page_fingerprint(PAGE, ["a", "b"])
+    assert page_fingerprint(None) == page_fingerprint([])
+
+def test_fingerprint_changes_with_showtimes_and_filter():
+    more = [("PVR: Nexus", ["10:00 AM", "01:00 PM", "04:00 PM"]), PAGE[1]]
+    assert page_fingerprint(more) != page_fingerprint(PAGE)
+    assert page_fingerprint(PAGE, ["PVR"]) != page_fingerprint(PAGE)
+    assert page_fingerprint([]) != page_fingerprint([("PVR: Nexus", [])])
+
+# ---- unchanged pages skip the diff ----
+class _Pages:
+    """Stands in for DriverManager: serves whatever pages the test sets."""
+    def __init__(self, pages): self.pages = pages
+    def theatres_by_date(self, row, dates, scroll=True): return {d: self.pages[d] for d in dates}
+    def reset(self, reason="error"): pass
+
+@pytest.fixture
+def monitor(state_db, monkeypatch):
+    sent = []
+    monkeypatch.setattr(scheduler, "tg_send", lambda chat, text: sent.append(text))
+    with connect() as conn:
+        conn.execute("""INSERT INTO monitors(id,url,dates,theatres,interval_min,baseline,state,owner_chat_id)
+                        VALUES('m','https://in.bookmyshow.com/x','20261020,20261021','',5,0,'RUNNING','1')""")
+        conn.commit()
+        return get_monitor(conn, "m"), sent
+
+def test_unchanged_page_skips_diff(monitor, monkeypatch):
+    row, sent = monitor
+    dm = _Pages({"20261020": PAGE, "20261021": []})
+    assert scheduler._run_monitor(dm, row, {}) == "new" and len(sent) == 1
+    with connect() as conn:
+        assert set(get_fingerprints(conn, "m")) == {"20261020", "20261021"}
+
+    before = scheduler.diff_stats()
+    def no_lookups(*a): raise AssertionError("diffed an unchanged page")
+    monkeypatch.setattr(scheduler, "is_seen", no_lookups)
+    assert scheduler._run_monitor(dm, row, {}) == "same" and len(sent) == 1
+    after = scheduler.diff_stats()
+    assert after["checked"] - before["checked"] == 2 and after["skipped"] - before["skipped"] == 2
+
+def test_changed_date_is_diffed_alone(monitor, monkeypatch):
+    row, sent = monitor
+    dm = _Pages({"20261020": PAGE, "20261021": []})
+    scheduler._run_monitor(dm, row, {})
+    looked = []
+    real = scheduler.is_seen
+    monkeypatch.setattr(scheduler, "is_seen", lambda conn, mid, d8, *a: looked.append(d8) or real(conn, mid, d8, *a))
+    dm.pages["20261021"] = [("PVR: Nexus", ["09:00 PM"])]
+    assert scheduler._run_monitor(dm, row, {}) == "new"
+    assert set(looked) == {"20261021"} and "09:00 PM" in sent[-1]
@@ -0,0 +1,76 @@
+import time
+
+from store import connect, sync_jobs, drop_jobs, claim_jobs, finish_jobs, renew_lease
+
+NOW = int(time.time())   # finish_jobs backs off from the wall clock
+
+def _jobs(conn, mid):
+    return {r["date"]: dict(r) for r in conn.execute("SELECT * FROM jobs WHERE monitor_id=?", (mid,))}
+
+def _runs(conn, mid):
+    return [dict(r) for r in conn.execute("SELECT * FROM runs WHERE monitor_id=? ORDER BY id", (mid,))]
+
+# ---- jobs: sync, lease, finish ----
+def test_sync_jobs_matches_effective_dates(state_db):
+    with connect() as conn:
+        sync_jobs(conn, "m", ["20261020", "20261021"], NOW)
+        sync_jobs(conn, "m", ["20261021", "20261022"], NOW + 60)
+        jobs = _jobs(conn, "m")
+    assert sorted(jobs) == ["20261021", "20261022"]
+    assert jobs["20261021"]["due_ts"] == NOW          # kept, not rescheduled
+    assert jobs["20261022"]["due_ts"] == NOW + 60
+    with connect() as conn:
+        sync_jobs(conn, "m", [], NOW)
+        assert _jobs(conn, "m") == {}
+
+def test_claim_is_all_or_nothing_per_monitor(state_db):
+    with connect() as conn:
+        sync_jobs(conn, "a", ["20261020", "20261021"], NOW)
+        sync_jobs(conn, "b", ["20261020"], NOW + 5)
+        mid, dates, run_id = claim_jobs(conn, "w1", 60, NOW + 10)
+        assert (mid, dates) == ("a", ["20261020", "20261021"])
+        # the earliest-due monitor is leased whole, so the next claimant gets the other one
+        assert claim_jobs(conn, "w2", 60, NOW + 10)[:2] == ("b", ["20261020"])
+        assert claim_jobs(conn, "w3", 60, NOW + 10) is None
+        assert _runs(conn, "a")[0]["status"] == "running" and _runs(conn, "a")[0]["id"] == run_id
+
+def test_claim_by_id_respects_other_owners_lease(state_db):
+    with connect() as conn:
+        sync_jobs(conn, "a", ["20261020"], NOW + 3600)     # not due yet
+        assert claim_jobs(conn, "w1", 60, NOW, mid="a")[:2] == ("a", ["20261020"])
+        assert claim_jobs(conn, "w2", 60, NOW + 30, mid="a") is None
+        assert renew_lease(conn, "w1", "a", 60)
+        assert not renew_lease(conn, "w2", "a", 60)
+
+def test_expired_lease_is_reclaimed_and_old_run_marked_lost(state_db):
+    with connect() as conn:
+        sync_jobs(conn, "a", ["20261020"], NOW)
+        first = claim_jobs(conn, "crashed", 60, NOW)
+        assert claim_jobs(conn, "w2", 60, NOW + 30) is None
+        second = claim_jobs(conn, "w2", 60, NOW + 61)
+        assert second[:2] == first[:2] and second[2] != first[2]
+        runs = _runs(conn, "a")
+    assert [r["status"] for r in runs] == ["lost", "running"]
+    assert runs[1]["attempt"] == 2 and runs[1]["owner"] == "w2"
+
+def test_finish_releases_and_backs_off_on_error(state_db):
+    with connect() as conn:
+        sync_jobs(conn, "a", ["20261020"], NOW)
+        _, _, run_id = claim_jobs(conn, "w1", 60, NOW)
+        finish_jobs(conn, "w1", "a", run_id, NOW + 300, error="boom", phases={"fetch": 12, "total": 20})
+        job = _jobs(conn, "a")["20261020"]
+        run = _runs(conn, "a")[0]
+    assert job["lease_owner"] is None and job["last_error"] == "boom"
+    assert job["due_ts"] >= NOW + 60 and job["attempts"] == 1   # 30s << attempts
+    assert run["status"] == "error" and run["phases"] == '{"fetch":12,"total":20}'
+    with connect() as conn:
+        _, _, run_id = claim_jobs(conn, "w1", 60, job["due_ts"], mid="a")
+        finish_jobs(conn, "w1", "a", run_id, NOW + 900)
+        job = _jobs(conn, "a")["20261020"]
+    assert (job["due_ts"], job["attempts"], job["last_error"]) == (NOW + 900, 0, None)
+
+def test_drop_jobs(state_db):
+    with connect() as conn:
+        sync_jobs(conn, "a", ["20261020"], NOW)
+        drop_jobs(conn, "a")
+        assert claim_jobs(conn, "w1", 60, NOW) is None
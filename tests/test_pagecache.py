@@ -0,0 +1,71 @@
+import pagecache
+from pagecache import PageCache, cache_key, theatres_for_dates
+from store import connect
+
+URL = "https://in.bookmyshow.com/hyderabad/movies/x/ET00001"
+PAGE = [("PVR: Nexus", ["10:00 AM"])]
+
+def _age(cache: PageCache, key: str, secs: int):
+    ts, scrolled, pairs = cache._mem[key]
+    cache._mem[key] = (ts - secs, scrolled, pairs)
+    with connect() as conn:
+        conn.execute("UPDATE page_cache SET fetched_ts=fetched_ts-? WHERE key=?", (secs, key)); conn.commit()
+
+def test_key_ignores_url_noise_but_not_date_or_mode():
+    k = cache_key(URL, "20261020", "http")
+    assert cache_key("HTTPS://IN.BookMyShow.com/hyderabad/movies/x/ET00001/?utm=1#top", "20261020", "http") == k
+    assert cache_key(URL, "20261021", "http") != k
+    assert cache_key(URL, "20261020", "browser") != k
+    assert cache_key(URL, "20261020", None) == cache_key(URL, "20261020", pagecache.normalize_fetch_mode(None))
+
+def test_memory_then_db_tier(state_db):
+    k = cache_key(URL, "20261020")
+    a = PageCache(ttl=60)
+    a.put_many({k: PAGE}, scroll=True)
+    assert a.get_many([k], scroll=True) == {k: PAGE} and a.stats["hit_mem"] == 1
+    b = PageCache(ttl=60)                       # another process: only the table is shared
+    assert b.get_many([k], scroll=True) == {k: PAGE} and b.stats["hit_db"] == 1
+    assert b.get_many([k], scroll=True) == {k: PAGE} and b.stats["hit_mem"] == 1
+
+def test_lru_eviction_falls_back_to_db(state_db):
+    c = PageCache(ttl=60, max_entries=2)
+    keys = [cache_key(URL, d) for d in ("20261020", "20261021", "20261022")]
+    c.put_many({k: PAGE for k in keys}, scroll=True)
+    assert c.stats["evicted"] == 1 and keys[0] not in c._mem
+    assert c.get_many(keys[:1], scroll=True) == {keys[0]: PAGE} and c.stats["hit_db"] == 1
+
+def test_unscrolled_page_does_not_satisfy_scrolled_request(state_db):
+    k = cache_key(URL, "20261020")
+    c = PageCache(ttl=60)
+    c.put_many({k: PAGE}, scroll=False)
+    assert c.get_many([k], scroll=True) == {} and c.stats["miss"] == 1
+    assert c.get_many([k], scroll=False) == {k: PAGE}
+
+def test_entries_expire_after_ttl(state_db):
+    k = cache_key(URL, "20261020")
+    c = PageCache(ttl=30)
+    c.put_many({k: PAGE}, scroll=True)
+    _age(c, k, 31)
+    assert c.get_many([k], scroll=True) == {} and c.stats["miss"] == 1
+    assert PageCache(ttl=0).get_many([k], scroll=True) == {}      # ttl 0 turns the cache off
+
+def test_empty_results_are_never_cached(state_db):
+    k = cache_key(URL, "20261020")
+    c = PageCache(ttl=60)
+    c.put_many({k: []}, scroll=True)
+    assert c.get_many([k], scroll=True) == {} and c.stats["stored"] == 0
+    with connect() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM page_cache").fetchone()[0] == 0
+
+def test_theatres_for_dates_fetches_only_misses(state_db, monkeypatch):
+    calls = []
+    def fetch(driver, urls, **kw):
+        calls.append(urls)
+        return driver, {u: PAGE if u.endswith("20261020") else [] for u in urls}
+    monkeypatch.setattr(pagecache, "fetch_theatres_many", fetch)
+    c = PageCache(ttl=60)
+    _, pages = theatres_for_dates(None, URL, ["20261020", "20261021"], mode="http", cache=c)
+    assert pages == {"20261020": PAGE, "20261021": []} and len(calls[0]) == 2
+    _, pages = theatres_for_dates(None, URL, ["20261020", "20261021"], mode="http", cache=c)
+    assert pages == {"20261020": PAGE, "20261021": []}
+    assert calls[1] == [URL + "/20261021"]       # the empty date is fetched again
@@ -0,0 +1,64 @@
+import json, threading
+
+import pytest
+
+from bench import load_pages, synthetic_dom, synthetic_json
+from scraper import _parse_venues_from_json, _parse_venues_from_dom, parse_html
+
+def _bounded(fn, *args, timeout=5.0):
+    """Run fn on a daemon thread so a parser that loops forever fails the test instead of hanging it."""
+    out = {}
+    t = threading.Thread(target=lambda: out.setdefault("v", fn(*args)), daemon=True)
+    t.start(); t.join(timeout)
+    assert not t.is_alive(), f"{fn.__name__} did not finish in {timeout}s"
+    return out["v"]
+
+def _js(v) -> str:
+    return json.dumps(v, separators=(",", ":"))   # payloads on the page are compact
+
+def _page(body: str) -> str:
+    return f"<!DOCTYPE html><html><head><title>Buy</title></head><body>{body}</body></html>"
+
+@pytest.mark.parametrize("name,html,expected", [p for p in load_pages() if p[2] is not None], ids=lambda v: v if isinstance(v, str) and len(v) < 40 else "")
+def test_corpus_pages(name, html, expected):
+    assert _bounded(parse_html, html) == expected
+
+def test_card_with_type_after_nested_object_in_js_literal():
+    # not JSON (unquoted keys), so the salvage path runs; the old brace scanner never returned on this shape
+    card = lambda i: ('{"additionalData":{"venueName":"Cinema %d: Mall","tags":[{"k":"v"}]},'
+                      '"type":"venue-card","showtimes":[{"title":"10:0%d AM"}]}' % (i, i))
+    html = _page("<script>window.__S = {widgets: [%s]};</script>" % ",".join(card(i) for i in range(5)))
+    assert _bounded(_parse_venues_from_json, html) == [(f"Cinema {i}: Mall", [f"10:0{i} AM"]) for i in range(5)]
+
+def test_cards_split_across_payloads_keep_document_order():
+    a = {"type": "venue-card", "additionalData": {"venueName": "First Cinema"}, "showtimes": [{"title": "09:00 AM"}]}
+    b = {"type": "venue-card", "additionalData": {"venueName": "Second Cinema"}, "showtimes": [{"title": "Sold out"}, {"title": "01:00 PM"}]}
+    html = _page(f"<script>var a = {_js({'x': [a]})};</script><script>b = {_js([b])}</script>")
+    assert _parse_venues_from_json(html) == [("First Cinema", ["09:00 AM"]), ("Second Cinema", ["01:00 PM"])]
+
+def test_json_venue_without_times_is_filled_from_dom():
+    card = {"type": "venue-card", "additionalData": {"venueName": "Asian Cinemas: Uppal"}, "showtimes": []}
+    html = _page(f"<script>s = {_js([card])}</script>"
+                 "<div class='row'><h4>Asian Cinemas: Uppal</h4><div><a>07:30 PM</a></div></div>")
+    assert parse_html(html) == [("Asian Cinemas: Uppal", ["07:30 PM"])]
+
+def test_dom_keeps_names_containing_am_pm_letters():
+    html = _page("<div class='row'><a>AMB Cinemas: Gachibowli</a><div><a>11:00 AM</a></div></div>")
+    assert _parse_venues_from_dom(html) == [("AMB Cinemas: Gachibowli", ["11:00 AM"])]
+
+def test_dom_ignores_script_and_style_text():
+    html = _page("<script>var t = '10:00 AM'</script><style>/* 11:00 PM */</style>"
+                 "<div class='row'><h3>Sudarshan 35MM: RTC X Roads</h3><div><span>06:15 PM</span></div></div>")
+    assert _parse_venues_from_dom(html) == [("Sudarshan 35MM: RTC X Roads", ["06:15 PM"])]
+
+def test_deeply_nested_page_emits_each_row_once():
+    got = _bounded(_parse_venues_from_dom, synthetic_dom(200, depth=30))
+    assert len(got) == 200
+    assert [n for n, _ in got] == [f"Cinema {i}: Mall {i}, Hyderabad" for i in range(200)]
+    assert all(len(ts) == 6 for _, ts in got)
+
+def test_large_json_page():
+    html = synthetic_json(300, pad=20000)
+    assert len(html) > 1_000_000
+    got = _bounded(parse_html, html)
+    assert len(got) == 300 and all(len(ts) == 6 for _, ts in got)
@@ -0,0 +1,57 @@
+import time
+
+import pytest
+
+from registry import MonitorRegistry
+from store import connect, private_connection
+
+NOW = int(time.time())
+
+@pytest.fixture
+def dbs(state_db):
+    """(watch, other): the registry's pooled connection and a second writer, as another process would be."""
+    watch = connect(); other = private_connection()
+    for mid, state in (("a", "RUNNING"), ("b", "RUNNING"), ("c", "PAUSED")):
+        other.execute("""INSERT INTO monitors(id,url,dates,theatres,interval_min,baseline,state,owner_chat_id,updated_at)
+                         VALUES(?,'https://in.bookmyshow.com/x','20261020','["PVR"]',5,0,?,'1',?)""", (mid, state, NOW - 100))
+    other.commit()
+    yield watch, other
+    other.close()
+
+def _ids(cfgs): return sorted(c.id for c in cfgs)
+
+def test_poll_is_free_until_another_connection_commits(dbs):
+    watch, other = dbs
+    reg = MonitorRegistry()
+    assert _ids(reg.load_active(watch)) == ["a", "b"]
+    assert reg.poll(watch) == [] and reg.stats["polls"] == 0
+    other.execute("UPDATE monitors SET interval_min=10, updated_at=? WHERE id='b'", (NOW + 5,)); other.commit()
+    got = reg.poll(watch)
+    assert _ids(got) == ["b"] and got[0]["interval_min"] == 10 and reg.get("b") is got[0]
+    assert reg.stats["polls"] == 1 and reg.stats["reads"] == 1 and reg.since == NOW + 5
+
+def test_commit_without_updated_at_is_not_an_edit(dbs):
+    watch, other = dbs
+    reg = MonitorRegistry(); reg.load_active(watch)
+    # run bookkeeping (last_run_ts/next_due_ts) leaves the watermark alone, so nothing is re-read
+    other.execute("UPDATE monitors SET last_run_ts=?, next_due_ts=? WHERE id='a'", (NOW, NOW + 300)); other.commit()
+    assert reg.poll(watch) == [] and reg.stats["reads"] == 0
+    cfg = reg.refresh(watch, "a")
+    assert cfg["last_run_ts"] == NOW and reg.get("a") is cfg
+
+def test_unchanged_rows_at_the_watermark_keep_their_config(dbs):
+    watch, other = dbs
+    reg = MonitorRegistry(); reg.load_active(watch)
+    other.execute("UPDATE monitors SET state='RUNNING', updated_at=? WHERE id='c'", (NOW + 5,)); other.commit()
+    c = reg.poll(watch)[0]
+    other.execute("INSERT INTO seen(monitor_id,date,theatre,time) VALUES('a','20261020','PVR','10:00 AM')"); other.commit()
+    assert reg.poll(watch) == []                  # c is re-read (updated_at == since) but identical
+    assert reg.stats["unchanged"] == 1 and reg.get("c") is c
+    compiled = reg.stats["compiled"]
+    assert _ids(reg.poll(watch, full=True)) == [] and reg.stats["compiled"] == compiled
+
+def test_refresh_drops_deleted_monitor(dbs):
+    watch, other = dbs
+    reg = MonitorRegistry(); reg.load_active(watch)
+    other.execute("DELETE FROM monitors WHERE id='b'"); other.commit()
+    assert reg.refresh(watch, "b") is None and reg.get("b") is None
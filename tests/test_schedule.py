@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta
+
+from common import next_window_open
+from scheduler import DueQueue, _run_due_ts
+
+NOW = 1_800_000_000
+
+def _row(mid="m", **kw):
+    r = {"id": mid, "state": "RUNNING", "interval_min": 5, "adaptive": 0, "cur_interval_sec": None,
+         "last_run_ts": NOW, "snooze_until": None, "time_start": None, "time_end": None,
+         "heartbeat_minutes": 180, "next_due_ts": None}
+    r.update(kw)
+    return r
+
+def _local(day: datetime, hhmm: str) -> int:
+    h, m = map(int, hhmm.split(":"))
+    return int(day.replace(hour=h, minute=m, second=0, microsecond=0).timestamp())
+
+# ---- next_window_open ----
+def test_window_open_inside_and_without_window():
+    day = datetime(2026, 10, 20)
+    assert next_window_open(_local(day, "12:00"), "09:00", "21:00") == _local(day, "12:00")
+    assert next_window_open(_local(day, "03:00"), None, None) == _local(day, "03:00")
+
+def test_window_open_before_start_is_today_after_end_is_tomorrow():
+    day = datetime(2026, 10, 20)
+    assert next_window_open(_local(day, "07:30"), "09:00", "21:00") == _local(day, "09:00")
+    assert next_window_open(_local(day, "22:15"), "09:00", "21:00") == _local(day + timedelta(days=1), "09:00")
+
+# ---- _run_due_ts ----
+def test_due_is_interval_after_last_run():
+    assert _run_due_ts(_row(), NOW) == NOW + 300
+    assert _run_due_ts(_row(last_run_ts=None), NOW) == 300     # never run: overdue
+    assert _run_due_ts(_row(state="DISCOVER"), NOW) == NOW + 30
+    assert _run_due_ts(_row(state="PAUSED"), NOW) is None
+
+def test_due_respects_snooze_and_adaptive_interval():
+    assert _run_due_ts(_row(snooze_until=NOW + 3600), NOW) == NOW + 3600
+    assert _run_due_ts(_row(adaptive=1, cur_interval_sec=900), NOW) == NOW + 900
+
+def test_due_outside_window_moves_to_next_opening():
+    day = datetime(2026, 10, 20)
+    inside = _row(last_run_ts=_local(day, "20:00"), time_start="09:00", time_end="21:00")
+    assert _run_due_ts(inside, _local(day, "20:00")) == _local(day, "20:05")
+    late = _row(last_run_ts=_local(day, "21:30"), time_start="09:00", time_end="21:00")
+    assert _run_due_ts(late, _local(day, "21:30")) == _local(day + timedelta(days=1), "09:00")
+
+# ---- DueQueue ----
+def test_queue_pops_runs_in_due_order():
+    q = DueQueue()
+    for mid, last in (("c", NOW + 20), ("a", NOW), ("b", NOW + 10)):
+        q.put(_row(mid, last_run_ts=last), NOW, {})
+    assert q.pop(NOW + 299, "run") is None
+    assert [q.pop(NOW + 10**6, "run")[1] for _ in range(3)] == ["a", "b", "c"]
+    assert q.pop(NOW + 10**6, "run") is None
+
+def test_queue_rekey_and_drop_discard_stale_entries():
+    q = DueQueue()
+    q.put(_row("a"), NOW, {}); q.put(_row("b", last_run_ts=NOW + 60), NOW, {})
+    q.put(_row("a", last_run_ts=NOW + 600), NOW, {})          # ran elsewhere: re-keyed later
+    assert q.top("run") == (NOW + 360, "b", "run")
+    q.drop("b")
+    assert q.top("run") == (NOW + 900, "a", "run") and len(q) == 1
+    assert q.dirty["a"] == NOW + 900                             # persisted on the next flush
+    q.put(_row("a", state="PAUSED"), NOW, {})
+    assert q.top("run") is None and q.peek() is None
+
+def test_heartbeat_due_behind_a_run_is_not_starved():
+    q = DueQueue(); book = {"a": NOW, "b": NOW}
+    q.put(_row("a", last_run_ts=0), NOW, book)                 # run long overdue (no free driver, say)
+    q.put(_row("b", heartbeat_minutes=1), NOW, book)
+    assert q.top("run")[1] == "a"
+    assert q.pop(NOW + 60, "hb") == (NOW + 60, "b", "hb")       # the run stays queued
+    assert q.top("run")[1] == "a" and q.peek("hb") == NOW + 180 * 60
+    assert q.peek() == 300                                      # earliest of either kind
@@ -1,15 +1,24 @@
 #!/usr/bin/env python3
 from __future__ import annotations
-import os, re, time, json
+import os, re, time, threading
 from typing import List, Set, Optional
-from datetime import datetime, timedelta
 
 import requests
 from bs4 import BeautifulSoup
 
-from store import connect, get_monitor, set_state, set_reload, upsert_indexed_theatre
-from common import ensure_date_in_url, fuzzy, roll_dates, to_bms_date, within_time_window
-from scraper import set_trace as set_scr_trace, get_driver, open_and_prepare_resilient, parse_theatres
+from store import (
+    connect, get_monitor, set_state, set_reload, upsert_indexed_theatres,
+    worker_id, sync_jobs, drop_jobs, claim_jobs, renew_lease, finish_jobs, next_job_due, record_interval, job_backlog, db_stats, private_connection
+)
+from common import compile_targets, fuzzy_match, page_fingerprint, interval_sec, adapt_interval
+from scraper import (
+    set_trace as set_scr_trace, set_artifact_scope, driver_factory, quit_driver, LifecyclePolicy,
+    fetch_stats, normalize_fetch_mode, phase, start_phases, take_phases, FETCH_MODES, DEFAULT_TABS,
+    RECYCLE_NAVS, MAX_RSS_MB, PARK_IDLE_SEC
+)
+from pagecache import theatres_for_dates, page_cache_stats
+from registry import MonitorRegistry, as_config
+import ratelimit, metrics, profiler
 
 BOT_TOKEN = os.environ.get("TELEGRAM_BOT_TOKEN","")
 FALLBACK_CHAT = os.environ.get("TELEGRAM_CHAT_ID","")
@@ -22,45 +31,46 @@ def tg_send(chat_id: str, text: str):
     api=f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
     for chunk in [text[i:i+4000] for i in range(0,len(text),4000)] or [text]:
         try:
-            r=requests.post(api, data={"chat_id": chat_id,"text": chunk}, timeout=20)
+            with phase("telegram"):
+                r=requests.post(api, data={"chat_id": chat_id,"text": chunk}, timeout=20)
+            metrics.inc("bms_telegram_sends_total", result="ok" if r.status_code<300 else "error")
             if r.status_code>=300: print("[telegram] error:", r.status_code, r.text)
         except Exception as e:
+            metrics.inc("bms_telegram_sends_total", result="exception")
             print("[telegram] exception:", e)
 
 def _fmt_date(d8: str)->str: return f"{d8[:4]}-{d8[4:6]}-{d8[6:]}"
 def _now_i(): return int(time.time())
 
 def _effective_dates(row)->List[str]:
-    mode=(row["mode"] or "FIXED").upper()
-    if mode=="ROLLING":
-        days=max(1,int(row["rolling_days"] or 1))
-        return roll_dates(days)
-    if mode=="UNTIL":
-        end=to_bms_date(row["end_date"] or "")
-        if not end: return [x for x in (row["dates"] or "").split(",") if x]
-        today=int(datetime.now().strftime("%Y%m%d"))
-        endi=int(end)
-        if today>endi: return []
-        span=[]; cur=datetime.now()
-        while int(cur.strftime("%Y%m%d"))<=endi:
-            span.append(cur.strftime("%Y%m%d"))
-            cur=cur+timedelta(days=1)
-        return span
-    return [x for x in (row["dates"] or "").split(",") if x]
+    return as_config(row).effective_dates()
 
 def _should_run_now(row)->bool:
-    if row["state"] not in ("RUNNING","DISCOVER"): return False
-    if row["snooze_until"] and _now_i() < int(row["snooze_until"]): return False
-    if not within_time_window(_now_i(), row["time_start"], row["time_end"]): return False
-    return True
+    return as_config(row).should_run(_now_i())
 
 def run_one(monitor_id: Optional[str], url: Optional[str], dates: Optional[List[str]],
             theatres_wanted: Optional[List[str]], interval: int, monitor: bool,
-            baseline: bool, debug: bool, trace: bool, artifacts_dir: str):
+            baseline: bool, debug: bool, trace: bool, artifacts_dir: str, fetch_mode: Optional[str]=None,
+            tabs: int=DEFAULT_TABS, standby: bool=False, policy: Optional[LifecyclePolicy]=None):
     set_scr_trace(trace, artifacts_dir)
-    d=get_driver(debug=debug)
-    if not d:
-        print("Failed to start browser."); return
+    set_artifact_scope(monitor_id or "adhoc")
+    run_mode = normalize_fetch_mode(fetch_mode)
+    factory = driver_factory(debug)
+    factory.standby = factory.standby or standby
+    policy = policy or LifecyclePolicy()
+    owner = worker_id(); lease_sec = int(os.environ.get("BMS_LEASE_SEC") or 120)
+    d = None
+    if run_mode == "browser":
+        d=factory.acquire()
+        if not d:
+            print("Failed to start browser."); return
+
+    def load_dates(target_url: str, dates_: List[str], r=None, scroll: bool=True):
+        nonlocal d
+        mode = normalize_fetch_mode((r and r["fetch_mode"]) or run_mode)
+        d, pages = theatres_for_dates(d, target_url, dates_, mode=mode, debug=debug, tabs=tabs, scroll=scroll)
+        return list(pages.items())
+
     try:
         with connect() as conn:
             row=get_monitor(conn, monitor_id) if monitor_id else None
@@ -69,56 +79,55 @@ def run_one(monitor_id: Optional[str], url: Optional[str], dates: Optional[List[
                 tg_send(chat, f"▶️ Monitor [{row['id']}] started\nURL: {row['url']}\nMode: {row['mode'] or 'FIXED'} | Interval: {row['interval_min']}m")
 
         seen: Set[str]=set()
+        fps: dict = {}   # d8 -> fingerprint of the last processed page
         last_heartbeat=_now_i()
         heartbeat=int((row and row["heartbeat_minutes"]) or 180)
 
-        if baseline:
-            eff_dates = dates or (row and _effective_dates(row)) or []
-            target_url = url or (row and row["url"])
-            if target_url:
-                for d8 in eff_dates:
-                    t = ensure_date_in_url(target_url, d8)
-                    d = open_and_prepare_resilient(d, t, debug=debug)
-                    for name, shows in parse_theatres(d):
-                        if not theatres_wanted or fuzzy(name, theatres_wanted):
-                            for st in shows: seen.add(f"{name}|{d8}|{st}")
+        seeding = bool(baseline)   # --baseline: the first pass only fills `seen`
 
         def one_pass():
-            nonlocal d
+            nonlocal seeding
             with connect() as conn:
                 r = get_monitor(conn, monitor_id) if monitor_id else None
             target_url = (r and r["url"]) or url
             eff_dates = (r and _effective_dates(r)) or dates or []
             if not eff_dates or not target_url:
-                time.sleep(3); return False
-            found=[]
-            for d8 in eff_dates:
-                turl=ensure_date_in_url(target_url, d8)
-                d = open_and_prepare_resilient(d, turl, debug=debug)
-                try:
-                    for _ in range(2): d.execute_script("window.scrollTo(0, document.body.scrollHeight);"); time.sleep(0.5)
-                except Exception: pass
-                pairs = parse_theatres(d)
-                if monitor_id:
-                    with connect() as conn:
-                        for nm,_ in pairs: upsert_indexed_theatre(conn, monitor_id, d8, nm)
-                twanted = (r and json.loads(r["theatres"])) if (r and r["theatres"]) else (theatres_wanted or [])
-                for nm, shows in pairs:
-                    if not twanted or fuzzy(nm, twanted):
-                        for st in shows:
-                            key=f"{nm}|{d8}|{st}"
-                            if key not in seen:
-                                found.append((nm,d8,st))
+                time.sleep(3); return None
+            found=[]; changed={}
+            twanted = as_config(r).targets if r else (theatres_wanted or [])
+            match = compile_targets(twanted)
+            with phase("fetch"):
+                pages = load_dates(target_url, eff_dates, r)
+            with phase("diff"):
+                for d8, pairs in pages:
+                    fp = page_fingerprint(pairs, twanted)
+                    if fps.get(d8) == fp: continue
+                    changed[d8] = fp
+                    if monitor_id:
+                        with phase("db"), connect() as conn:
+                            upsert_indexed_theatres(conn, monitor_id, d8, [nm for nm,_ in pairs])
+                    for nm, shows in pairs:
+                        if not twanted or fuzzy_match(nm, match):
+                            for st in shows:
+                                key=f"{nm}|{d8}|{st}"
+                                if key not in seen:
+                                    found.append((nm,d8,st))
+            if seeding:
+                seeding = False
+                seen.update(f"{n}|{d8}|{t}" for n,d8,t in found); fps.update(changed)
+                print(f"[baseline] {len(found)} showtime(s) across {len(eff_dates)} date(s) marked seen", flush=True)
+                return "changed"
             if found:
-                with connect() as conn:
+                with phase("db"), connect() as conn:
                     if monitor_id:
                         conn.execute("UPDATE monitors SET last_alert_ts=?, updated_at=? WHERE id=?", (_now_i(), _now_i(), monitor_id)); conn.commit()
+                metrics.inc("bms_new_shows_total", len(found), monitor=monitor_id or "adhoc")
                 body="\n".join([f"{n} | {_fmt_date(d8)} | {t}" for n,d8,t in sorted(found)])
                 chat=str((r and r["owner_chat_id"]) or os.environ.get("TELEGRAM_CHAT_ID",""))
                 tg_send(chat, f"🎟️ New shows:\n{body}")
                 for n,d8,t in found: seen.add(f"{n}|{d8}|{t}")
-                return True
-            return False
+            fps.update(changed)
+            return "new" if found else ("changed" if changed else "same")
 
         if not monitor:
             one_pass(); return
@@ -130,10 +139,9 @@ def run_one(monitor_id: Optional[str], url: Optional[str], dates: Optional[List[
                     conn.execute("UPDATE monitors SET last_run_ts=?, updated_at=? WHERE id=?", (_now_i(),_now_i(),monitor_id)); conn.commit()
                     if int(r["reload"] or 0)==1:
                         conn.execute("UPDATE monitors SET reload=0 WHERE id=?", (monitor_id,)); conn.commit()
-                        try: d.quit()
-                        except Exception: pass
-                        d=get_driver(debug=debug)
-                        if not d:
+                        quit_driver(d)
+                        d=factory.acquire() if run_mode=="browser" else None
+                        if run_mode=="browser" and not d:
                             tg_send(str(r["owner_chat_id"] or ""), f"❌ [{monitor_id}] could not restart driver.")
                             return
                         tg_send(str(r["owner_chat_id"] or ""), f"🔄 [{monitor_id}] driver restarted.")
@@ -143,7 +151,37 @@ def run_one(monitor_id: Optional[str], url: Optional[str], dates: Optional[List[
             if r and not _should_run_now(r):
                 time.sleep(10); continue
 
-            alerted = one_pass()
+            claim = None
+            if r and r["state"] == "RUNNING":
+                # share the job lease with the scheduler / --queue workers so nobody else scrapes this monitor meanwhile
+                with connect() as conn:
+                    sync_jobs(conn, monitor_id, _effective_dates(r), _now_i())
+                    claim = claim_jobs(conn, owner, lease_sec, _now_i(), mid=monitor_id)
+                if claim is None and _effective_dates(r):
+                    print(f"[{monitor_id}] leased by another process; skipping this pass", flush=True)
+                    time.sleep(interval_sec(r, interval)); continue
+            err = None; outcome = None
+            start_phases(); t0 = time.perf_counter()
+            try:
+                with profiler.cycle(monitor_id or "adhoc"):
+                    outcome = one_pass()
+            except Exception as e:
+                err = str(e) or type(e).__name__; outcome = "error"; raise
+            finally:
+                ivl = interval_sec(r, interval)
+                if r and outcome and int(r["adaptive"] or 0):
+                    ivl, errs = adapt_interval(r, outcome)
+                    with connect() as conn: record_interval(conn, monitor_id, ivl, errs)
+                phases = take_phases(); phases["total"] = int((time.perf_counter() - t0) * 1000)
+                metrics.inc("bms_checks_total", monitor=monitor_id or "adhoc", outcome=outcome or "error")
+                if claim:
+                    with connect() as conn:
+                        finish_jobs(conn, owner, monitor_id, claim[2], _now_i() + ivl, err, phases)
+            if trace:
+                print("[fetch] " + " ".join(f"{k}={v}" for k,v in sorted(fetch_stats().items())), flush=True)
+                print("[cache] " + " ".join(f"{k}={v}" for k,v in sorted(page_cache_stats().items())), flush=True)
+                print("[rate] " + " ".join(f"{k}={v}" for k,v in sorted(ratelimit.rate_stats().items())), flush=True)
+                print("[db] " + " ".join(f"{k}={v}" for k,v in sorted(db_stats().items())), flush=True)
 
             if r and (r["mode"] or "FIXED")=="UNTIL":
                 eff=_effective_dates(r)
@@ -155,16 +193,111 @@ def run_one(monitor_id: Optional[str], url: Optional[str], dates: Optional[List[
 
             if _now_i()-last_heartbeat > (heartbeat*60):
                 with connect() as conn: rr=get_monitor(conn, monitor_id) if monitor_id else None
-                eta = (int(rr["last_run_ts"]) + int(rr["interval_min"])*60 - _now_i()) if rr and rr["last_run_ts"] else 0
+                eta = (int(rr["last_run_ts"]) + interval_sec(rr, interval) - _now_i()) if rr and rr["last_run_ts"] else 0
                 eta = max(0,eta)
                 msg = f"💓 Heartbeat [{monitor_id or 'ad-hoc'}]\nState: {(rr and rr['state']) or 'RUNNING'}\nInterval: {(rr and rr['interval_min']) or interval}m\nNext in ~ {eta//60}m {eta%60}s"
                 tg_send(str((rr and rr["owner_chat_id"]) or os.environ.get("TELEGRAM_CHAT_ID","")), msg)
                 last_heartbeat=_now_i()
 
-            time.sleep(max(60, int((r and r["interval_min"]) or interval)*60))
+            wait = ivl
+            reason = policy.recycle_reason(d) if d else None
+            if reason:
+                print(f"[driver] recycling ({reason})", flush=True)
+                quit_driver(d); d = None
+            if d and policy.should_park(wait):
+                # park Chrome over the idle gap and bring it back just before the next pass
+                print(f"[driver] parking for {wait}s", flush=True)
+                quit_driver(d); d = None; factory.close()
+                time.sleep(max(0, wait - policy.prewarm_sec))
+                d = factory.acquire()
+                time.sleep(min(wait, policy.prewarm_sec))
+            else:
+                time.sleep(wait)
     finally:
-        try: d.quit()
-        except Exception: pass
+        quit_driver(d)
+        factory.close()
+
+def run_queue(debug: bool, trace: bool, artifacts_dir: str, fetch_mode: Optional[str]=None, tabs: int=DEFAULT_TABS,
+              standby: bool=False, policy: Optional[LifecyclePolicy]=None, lease_sec: int=120, poll_sec: float=2):
+    """Pull leased (monitor, date) jobs from state.db until killed. Any number of these (and the scheduler)
+    can share one DB: a monitor's jobs are claimed all-or-nothing, leases are renewed while a run is in
+    flight, and a crashed process's jobs become claimable again once its lease lapses."""
+    from scheduler import DriverManager, _run_monitor, _run_due_ts
+    owner = worker_id()
+    dm = DriverManager(debug=debug, trace=trace, artifacts_dir=artifacts_dir, fetch_mode=fetch_mode, tabs=tabs,
+                       standby=standby, policy=policy)
+    book: dict = {}
+    watch = connect(); reg = MonitorRegistry(); full_at = 0
+    jobs_db = private_connection()
+    metrics.gauge("bms_jobs", lambda: job_backlog(jobs_db, _now_i()), "Jobs due and unleased vs leased in state.db", label="state")
+    metrics.gauge("bms_rate_queued", lambda: ratelimit.rate_stats().get("queued", 0), "Requests waiting on the rate limiter")
+    print(f"[queue] {owner} pulling jobs (lease {lease_sec}s)", flush=True)
+    while True:
+        try:
+            now = _now_i()
+            # keep job rows in step with monitors (a full pass every 10 min picks up rolling dates)
+            full = now - full_at >= 600
+            if full: full_at = now
+            rows = list(reg.by_id.values()) if full else []
+            rows += reg.poll(watch, full=full)
+            if rows:
+                with connect() as conn:
+                    for r in {r.id: r for r in rows}.values():
+                        if r.state == "RUNNING": sync_jobs(conn, r.id, r.effective_dates(), now)
+                        else: drop_jobs(conn, r.id)
+
+            with connect() as conn:
+                claim = claim_jobs(conn, owner, lease_sec, now)
+                if claim is None:
+                    nxt = next_job_due(conn)
+            if claim is None:
+                dm.maintain(None if nxt is None else max(0, nxt - now))
+                if dm.parked: dm.factory.close()   # the only driver in this process, so its standby can go too
+                time.sleep(max(0.2, min(poll_sec, (nxt - time.time()) if nxt is not None else poll_sec)))
+                continue
+
+            mid, dates_, run_id = claim
+            with connect() as conn:
+                r = get_monitor(conn, mid)
+            if r is None or r["state"] != "RUNNING" or not _should_run_now(r):
+                with connect() as conn:
+                    if r is None or r["state"] != "RUNNING": drop_jobs(conn, mid)
+                    else: finish_jobs(conn, owner, mid, run_id, max(_run_due_ts(r, now) or 0, now + 60))
+                continue
+            ivl = interval_sec(r)
+            with connect() as conn:
+                conn.execute("UPDATE monitors SET last_run_ts=?, next_due_ts=? WHERE id=?", (now, now + ivl, mid)); conn.commit()
+
+            stop = threading.Event()
+            def renew(mid=mid):
+                while not stop.wait(lease_sec / 3):
+                    with connect() as c:
+                        if not renew_lease(c, owner, mid, lease_sec):
+                            print(f"[queue] [{mid}] lease lost", flush=True); return
+            threading.Thread(target=renew, name="bms-lease", daemon=True).start()
+            err = None; outcome = None
+            start_phases(); t0 = time.perf_counter()
+            try:
+                with profiler.cycle(mid):
+                    outcome = _run_monitor(dm, r, book, dates=dates_)
+            except Exception as e:
+                err = str(e) or type(e).__name__; outcome = "error"
+                dm.reset("error")
+                print(f"[queue] [{mid}] error:", e, flush=True)
+            finally:
+                stop.set()
+                if outcome and int(r["adaptive"] or 0):
+                    ivl, errs = adapt_interval(r, outcome)
+                    with connect() as conn: record_interval(conn, mid, ivl, errs)
+                phases = take_phases(); phases["total"] = int((time.perf_counter() - t0) * 1000)
+                metrics.inc("bms_checks_total", monitor=mid, outcome=outcome or "error")
+                with connect() as conn:
+                    finish_jobs(conn, owner, mid, run_id, _now_i() + ivl, err, phases)
+            if trace:
+                print("[fetch] " + " ".join(f"{k}={v}" for k,v in sorted(fetch_stats().items())), flush=True)
+        except Exception as outer:
+            print("[queue] loop error:", outer, flush=True)
+            time.sleep(3)
 
 def _parse_args(argv=None):
     import argparse
@@ -175,10 +308,36 @@ def _parse_args(argv=None):
     p.add_argument("--theatres", nargs="*", help="Theatres (use 'any' for all) (if no monitor-id)")
     p.add_argument("--interval", type=int, default=5)
     p.add_argument("--monitor", action="store_true")
+    p.add_argument("--queue", action="store_true",
+                   help="Pull due monitors from the shared job queue in state.db instead of running one monitor")
+    p.add_argument("--lease-sec", type=int, default=int(os.environ.get("BMS_LEASE_SEC") or 120),
+                   help="Job lease length; renewed every third of it while a run is in flight. Env: BMS_LEASE_SEC")
     p.add_argument("--baseline", action="store_true")
     p.add_argument("--debug", action="store_true")
     p.add_argument("--trace", action="store_true")
     p.add_argument("--artifacts-dir", default="./artifacts")
+    p.add_argument("--fetch-mode", choices=FETCH_MODES, default=None,
+                   help="Page fetch path (per-monitor fetch_mode overrides). Env: BMS_FETCH_MODE")
+    p.add_argument("--tabs", type=int, default=DEFAULT_TABS,
+                   help="Dates loaded concurrently (browser tabs / HTTP requests). Env: BMS_TABS")
+    p.add_argument("--standby", action="store_true",
+                   help="Keep one pre-launched Chrome ready for driver restarts. Env: BMS_STANDBY=1")
+    p.add_argument("--recycle-navs", type=int, default=RECYCLE_NAVS,
+                   help="Restart Chrome after this many navigations (0=never). Env: BMS_RECYCLE_NAVS")
+    p.add_argument("--max-rss-mb", type=int, default=MAX_RSS_MB,
+                   help="Restart Chrome when its process tree exceeds this RSS (0=never). Env: BMS_MAX_RSS_MB")
+    p.add_argument("--park-idle-sec", type=int, default=PARK_IDLE_SEC,
+                   help="Shut Chrome down between passes longer than this (0=never). Env: BMS_PARK_IDLE_SEC")
+    p.add_argument("--profile", type=int, default=profiler.PROFILE_FIRST, metavar="N",
+                   help="cProfile the first N runs into <artifacts-dir>/profiles (+ report.txt). Env: BMS_PROFILE")
+    p.add_argument("--profile-every", type=int, default=profiler.PROFILE_EVERY, metavar="K",
+                   help="cProfile one run in every K (0=off); a PROFILE file in the profiles dir toggles this live. Env: BMS_PROFILE_EVERY")
+    p.add_argument("--metrics-port", type=int, default=metrics.METRICS_PORT,
+                   help="Serve Prometheus metrics on this port at /metrics (0=off). Env: BMS_METRICS_PORT")
+    p.add_argument("--rate-per-min", type=float, default=ratelimit.RATE_PER_MIN,
+                   help="Global cap on requests to BMS, shared by all processes on state.db (default 0=off). Env: BMS_RATE_PER_MIN")
+    p.add_argument("--rate-burst", type=int, default=ratelimit.RATE_BURST,
+                   help="Requests allowed back-to-back before the cap applies. Env: BMS_RATE_BURST")
     return p.parse_args(argv)
 
 def main(argv=None):
@@ -188,7 +347,14 @@ def main(argv=None):
         parts=[x.strip() for x in re.split(r"[,\s]+", a.dates) if x.strip()]
         from common import to_bms_date
         dates=[to_bms_date(x) or x for x in parts]
-    run_one(a.monitor_id, a.url, dates, a.theatres, a.interval, a.monitor, a.baseline, a.debug, a.trace, a.artifacts_dir)
+    policy = LifecyclePolicy(recycle_navs=a.recycle_navs, max_rss_mb=a.max_rss_mb, park_idle_sec=a.park_idle_sec)
+    ratelimit.install(a.rate_per_min, a.rate_burst)
+    metrics.serve(a.metrics_port)
+    profiler.configure(a.artifacts_dir, a.profile, a.profile_every)
+    if a.queue:
+        run_queue(a.debug, a.trace, a.artifacts_dir, a.fetch_mode, a.tabs, a.standby, policy, a.lease_sec); return
+    run_one(a.monitor_id, a.url, dates, a.theatres, a.interval, a.monitor, a.baseline, a.debug, a.trace, a.artifacts_dir, a.fetch_mode, a.tabs, a.standby,
+            policy)
 
 if __name__=="__main__":
     main()